@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from Storage import hash_values
+
+BUILD_WORKERS = 8
+
+
+class BuildGraph:
+    """Small make-like build graph keyed by content hashes instead of timestamps.
+
+    Each node builds one output file from input files. Nodes belong to stages
+    that run in the order they were added. The manifest records, per output,
+    the hash of its stage, parameters and input contents; a node reruns only
+    when that hash changes or its output is missing. A batch stage gets all
+    its stale nodes in one call (so OCR and translation keep their request
+    batching); other stages run their stale nodes in parallel, one call each.
+    A node is recorded only if its action rewrote the output (by size and
+    mtime), so a failed rebuild leaves an older output stale, not current.
+    Stages added with adopt=True take over outputs that exist without a
+    manifest record (texts from before the manifest, or from a crash); all
+    other outputs without a record are rebuilt.
+    """
+
+    def __init__(self, manifest_path, max_workers=BUILD_WORKERS):
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+        self.stages = {}
+        self.nodes = {}
+        self.manifest = {"outputs": {}, "files": {}}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            except Exception as e:
+                print(f"Ignoring unreadable build manifest {manifest_path}: {e}")
+
+    def add_stage(self, name, action, batch=False, params=None, adopt=False):
+        """Register a stage; action(nodes) for batch stages, action(node) otherwise."""
+        self.stages[name] = {"action": action, "batch": batch, "params": params or {}, "adopt": adopt}
+        self.nodes.setdefault(name, [])
+
+    def add(self, stage, output, inputs=(), params=None):
+        """Add a node building output from input files; params also feed its hash."""
+        node = {"stage": stage, "output": output, "inputs": list(inputs), "params": params}
+        self.nodes[stage].append(node)
+        return node
+
+    def file_hash(self, path):
+        """Content hash of a file, reusing the cached value while size and mtime match."""
+        stat = os.stat(path)
+        cached = self.manifest["files"].get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        self.manifest["files"][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def node_hash(self, node):
+        inputs = [self.file_hash(path) if os.path.exists(path) else None for path in node["inputs"]]
+        stage = self.stages[node["stage"]]
+        return hash_values(node["stage"], stage["params"], node["params"], inputs)
+
+    def is_stale(self, node):
+        output = node["output"]
+        recorded = self.manifest["outputs"].get(output)
+        if not os.path.exists(output):
+            return True
+        if recorded is None:
+            if not self.stages[node["stage"]]["adopt"]:
+                return True
+            # Outputs built before the manifest existed (or before a crash) are adopted
+            self.manifest["outputs"][output] = self.node_hash(node)
+            return False
+        return recorded != self.node_hash(node)
+
+    @staticmethod
+    def output_stamp(path):
+        """Size and mtime of an output, or None if it is missing."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def save(self):
+        temp_file = f"{self.manifest_path}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(temp_file, self.manifest_path)  # Atomic write
+
+    def run(self, stages=None):
+        """Run the stale nodes of the given stages (all by default) and return what ran."""
+        ran = {}
+        for name in stages or list(self.stages):
+            stage = self.stages[name]
+            stale = [node for node in self.nodes[name] if self.is_stale(node)]
+            before = {node["output"]: self.output_stamp(node["output"]) for node in stale}
+            if stale:
+                if stage["batch"]:
+                    stage["action"](stale)
+                else:
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                        list(executor.map(stage["action"], stale))
+            ran[name] = []
+            for node in stale:
+                # Nodes whose action failed to (re)write their output stay stale,
+                # even when an output from an earlier build is still there
+                stamp = self.output_stamp(node["output"])
+                if stamp is not None and stamp != before[node["output"]]:
+                    self.manifest["outputs"][node["output"]] = self.node_hash(node)
+                    ran[name].append(node["output"])
+            self.save()
+        return ran
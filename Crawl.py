@@ -0,0 +1,428 @@
+import html
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from Storage import SqliteStore, hash_values
+
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "10"))
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "30"))
+# Connection errors, timeouts and these statuses are retried, waiting
+# RETRY_BACKOFF seconds and twice as long after every further failure
+CRAWL_RETRIES = int(os.getenv("CRAWL_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "1.0"))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+CRAWL_CACHE_FILE = os.getenv("CRAWL_CACHE_FILE", os.path.join(os.getcwd(), "crawl_cache.sqlite"))
+# How long the fields of cacheable pages are reused; 0 turns the page cache off
+CRAWL_CACHE_HOURS = float(os.getenv("CRAWL_CACHE_HOURS", "0"))
+
+# Selectors of the form tag, tag[attr] or [attr*=value] are matched on the raw
+# HTML with regexes, without building a DOM
+SIMPLE_SELECTOR_RE = re.compile(
+    r"""^(?P<tag>[a-z][a-z0-9]*)?(?:\[(?P<attr>[\w-]+)(?:\*=(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\]"']*)))?\])?$""",
+    re.I,
+)
+TAG_RE = re.compile(r"<([a-z][a-z0-9]*)\b[^>]*>", re.I)
+BACKGROUND_URL_RE = re.compile(r'url\(["\']?(//[^"\')\s]+)["\']?\)')
+attribute_res = {}
+
+
+class HostRateLimiter:
+    """Spaces out requests to each host by at least interval seconds, across threads."""
+
+    def __init__(self, interval=0.0):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def new_session(max_workers=CRAWL_WORKERS):
+    """Session whose connection pool is large enough for max_workers concurrent requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def resolve(fields, settings):
+    """Fill the {placeholders} of a page's "contains" filters from settings."""
+    resolved = {}
+    for name, specs in fields.items():
+        one = isinstance(specs, dict)
+        specs = [specs] if one else specs
+        specs = [
+            {**spec, "contains": [value.format(**settings) for value in spec["contains"]]} if "contains" in spec else spec
+            for spec in specs
+        ]
+        resolved[name] = specs[0] if one else specs
+    return resolved
+
+
+def simple_selector(spec):
+    """(tag, attribute, substring) of a spec that can be matched without a DOM, else None."""
+    if "text" in spec or "within" in spec or "from" in spec or spec.get("get", "text") in ("text", "content"):
+        return None
+    match = SIMPLE_SELECTOR_RE.match(spec["css"])
+    if match is None:
+        return None
+    value = next((match.group(g) for g in ("dq", "sq", "bare") if match.group(g) is not None), None)
+    return match.group("tag"), match.group("attr"), value
+
+
+def attribute(tag_html, name):
+    """Unescaped value of a tag's attribute, from its raw HTML."""
+    pattern = attribute_res.get(name)
+    if pattern is None:
+        pattern = attribute_res[name] = re.compile(
+            rf"""\s{re.escape(name)}\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I
+        )
+    match = pattern.search(tag_html)
+    if match is None:
+        return None
+    return html.unescape(next(g for g in match.groups() if g is not None))
+
+
+def get_value(spec, element):
+    if "from" in spec:
+        element = element.select_one(spec["from"])
+        if element is None:
+            return None
+    get = spec.get("get", "text")
+    if get == "text":
+        return element.get_text(strip=True)
+    if get == "content":
+        return element.get_text(separator=" ", strip=True)
+    if get == "background-image":
+        match = BACKGROUND_URL_RE.search(element.get("style", ""))
+        return match.group(1) if match else None
+    if element.get(get) is None and "from" not in spec:
+        element = element.find(attrs={get: True})
+    return element.get(get) if element is not None else None
+
+
+def pick(spec, values):
+    if "contains" in spec:
+        values = [v for v in values if v is not None and any(s in v for s in spec["contains"])]
+    how = spec.get("pick", "first")
+    if how == "all":
+        return values
+    if not values:
+        return None
+    return values[-1] if how == "last" else values[0]
+
+
+def select_dom(soup, spec):
+    if "within" in spec:
+        soup = soup.select_one(spec["within"])
+        if soup is None:
+            return pick(spec, [])
+    elements = soup.select(spec["css"])
+    if "text" in spec:
+        elements = [element for element in elements if element.string == spec["text"]]
+    return pick(spec, [get_value(spec, element) for element in elements])
+
+
+def select_raw(tags, spec, selector):
+    tag, attr, substring = selector
+    get = spec.get("get", "text")
+    values = []
+    for name, tag_html in tags:
+        if tag and name != tag:
+            continue
+        if attr:
+            value = attribute(tag_html, attr)
+            if value is None or (substring is not None and substring not in value):
+                continue
+        if get == "background-image":
+            match = BACKGROUND_URL_RE.search(attribute(tag_html, "style") or "")
+            values.append(match.group(1) if match else None)
+        else:
+            values.append(attribute(tag_html, get))
+    return pick(spec, values)
+
+
+def extract(page_source, fields, dom=False):
+    """Apply a page kind's field specs to HTML; returns {field: value}.
+
+    When every spec is a simple selector the tags are scanned with regexes,
+    which gives the same values as the DOM for them at a fraction of the
+    cost; dom=True always parses the page with BeautifulSoup.
+    """
+    specs = [(name, spec) for name, value in fields.items() for spec in (value if isinstance(value, list) else [value])]
+    selectors = None if dom else [simple_selector(spec) for _, spec in specs]
+    if selectors is None or None in selectors:
+        soup = BeautifulSoup(page_source, "html.parser")
+        values = [select_dom(soup, spec) for _, spec in specs]
+    else:
+        tags = [(match.group(1).lower(), match.group(0)) for match in TAG_RE.finditer(page_source)]
+        values = [select_raw(tags, spec, selector) for (_, spec), selector in zip(specs, selectors)]
+
+    result = {}
+    for (name, spec), value in zip(specs, values):
+        if isinstance(fields[name], list):
+            result.setdefault(name, []).extend(value or [])
+        else:
+            result[name] = value
+    return result
+
+
+class PageCache(SqliteStore):
+    """SQLite cache of the fields extracted from pages, keyed by URL and the selectors used."""
+
+    def __init__(self, path=CRAWL_CACHE_FILE, max_age=CRAWL_CACHE_HOURS * 3600):
+        super().__init__(path)
+        self.max_age = max_age
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    cache_key TEXT PRIMARY KEY,
+                    fields BLOB NOT NULL,
+                    fetched REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("DELETE FROM pages WHERE fetched < ?", (time.time() - max_age,))
+
+    def get(self, cache_key):
+        row = self.connect().execute(
+            "SELECT fields FROM pages WHERE cache_key = ? AND fetched >= ?",
+            (cache_key, time.time() - self.max_age),
+        ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def put(self, cache_key, fields):
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (cache_key, fields, fetched) VALUES (?, ?, ?)",
+                (cache_key, zlib.compress(json.dumps(fields).encode("utf-8")), time.time()),
+            )
+
+
+class Crawler:
+    """Fetches and parses the pages of one site adapter (see SiteAdapters).
+
+    Requests share a pooled session, are spaced per host by the rate limiter
+    and retried on connection errors and RETRY_STATUS with exponential
+    backoff. Pages of the adapter's cacheable kinds are served from the page
+    cache when one is given.
+    """
+
+    def __init__(
+        self, adapter, settings=None, session=None, limiter=None, interval=0.0,
+        retries=CRAWL_RETRIES, backoff=RETRY_BACKOFF, timeout=CRAWL_TIMEOUT, cache=None, workers=CRAWL_WORKERS,
+    ):
+        self.pages = {kind: resolve(fields, settings or {}) for kind, fields in adapter["pages"].items()}
+        self.selector_hashes = {kind: hash_values(fields) for kind, fields in self.pages.items()}
+        self.missing_status = set(adapter.get("missing_status", [404]))
+        self.cacheable = set(adapter.get("cache", []))
+        self.session = session or new_session(workers)
+        self.limiter = limiter or HostRateLimiter(interval)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0}
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def fetch(self, url):
+        """Return a page's HTML, or None if the site says it does not exist.
+
+        Raises requests.RequestException once the retries are used up.
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            self.count("requests")
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code in self.missing_status:
+                    return None
+                if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                    response.raise_for_status()
+                    return response.text
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            self.count("retries")
+            time.sleep(delay)
+
+    def page(self, kind, url, dom=False):
+        """Fields of a page of the given kind, or None if the page does not exist."""
+        cache_key = None
+        if self.cache is not None and kind in self.cacheable:
+            cache_key = hash_values(url, self.selector_hashes[kind])
+            fields = self.cache.get(cache_key)
+            if fields is not None:
+                self.count("cache_hits")
+                return fields
+        page_source = self.fetch(url)
+        if page_source is None:
+            return None
+        fields = extract(page_source, self.pages[kind], dom)
+        if cache_key is not None:
+            self.cache.put(cache_key, fields)
+        return fields
+
+
+def schedule(tasks, work, on_done, workers=CRAWL_WORKERS, max_in_flight=None):
+    """Run work(task) on a thread pool for a stream of tasks, at most max_in_flight at once.
+
+    tasks may be any iterable, such as lines read from a file; it is only
+    read as slots free up. on_done(task, future) runs on the calling thread
+    as each task finishes and may return follow-up tasks (the next listing
+    page, say), which run before more are taken from tasks.
+    """
+    max_in_flight = max_in_flight or workers
+    tasks = iter(tasks)
+    follow_ups = deque()
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(in_flight) < max_in_flight:
+                if follow_ups:
+                    task = follow_ups.popleft()
+                else:
+                    task = next(tasks, StopIteration)
+                    if task is StopIteration:
+                        break
+                in_flight[executor.submit(work, task)] = task
+            if not in_flight:
+                return
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                follow_ups.extend(on_done(in_flight.pop(future), future) or ())
+
+
+class KeyIndex(SqliteStore):
+    """A set of keys held in a temporary SQLite database instead of in memory.
+
+    SQLite keeps a database opened with an empty path in a private file it
+    deletes on close, so memory stays bounded by its page cache however many
+    keys there are. The database is private to its connection too, so an
+    index is only used from the thread that built it.
+    """
+
+    def __init__(self, keys=()):
+        super().__init__("")
+        conn = self.connect()
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("CREATE TABLE keys (key TEXT PRIMARY KEY)")
+        self.update(keys)
+
+    def add(self, key):
+        """Add key; returns False if it was already there."""
+        return self.connect().execute("INSERT OR IGNORE INTO keys (key) VALUES (?)", (key,)).rowcount == 1
+
+    def update(self, keys):
+        self.connect().executemany("INSERT OR IGNORE INTO keys (key) VALUES (?)", ((key,) for key in keys))
+
+    def __contains__(self, key):
+        return self.connect().execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone() is not None
+
+
+class Checkpoint:
+    """Crawl results saved as they finish, so an interrupted run resumes where it stopped.
+
+    Each result is a dict identified by its `key` field. Results are appended
+    to a JSON-lines log; compact() folds the log into a JSON array file with
+    one result per line, which iter_file() reads back streamed.
+    """
+
+    def __init__(self, path, log_path, key):
+        self.path = path
+        self.log_path = log_path
+        self.key = key
+
+    def save(self, results):
+        """Write results (any iterable) to the array file atomically."""
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, "w") as f:
+            f.write("[\n")
+            for i, result in enumerate(results):
+                f.write(("," if i else "") + json.dumps(result) + "\n")
+            f.write("]\n")
+        os.replace(temp_file, self.path)  # Atomic write
+
+    def append(self, result):
+        """Add one finished result to the log without rewriting the array file."""
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+    def iter_file(self):
+        """Yield the array file's results, streaming it when it was written by save()."""
+        if not os.path.exists(self.path):
+            return
+        yielded = 0
+        with open(self.path, "r") as f:
+            if f.readline().strip() == "[":
+                try:
+                    for line in f:
+                        line = line.strip().lstrip(",")
+                        if line and line != "]":
+                            yield json.loads(line)
+                            yielded += 1
+                    return
+                except json.JSONDecodeError:
+                    if yielded:
+                        raise
+        # Older, indented files have to be parsed in one go
+        with open(self.path, "r") as f:
+            yield from json.load(f)
+
+    def __iter__(self):
+        """Yield every saved result: the array file, then the log."""
+        yield from self.iter_file()
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def keys(self):
+        """The keys that already have results, as a KeyIndex."""
+        return KeyIndex(result[self.key] for result in self)
+
+    def compact(self):
+        """Fold the log into the array file, keeping the first result for each key."""
+        if not os.path.exists(self.log_path):
+            return
+        seen = KeyIndex()
+
+        def unique_results():
+            for result in self:
+                if seen.add(result[self.key]):
+                    yield result
+
+        self.save(unique_results())
+        os.remove(self.log_path)
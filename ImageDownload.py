@@ -1,18 +1,25 @@
+import hashlib
 import json
-import time
-import requests
-import re
+import threading
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import os
 from PIL import Image
 from io import BytesIO
+from Crawl import Crawler, HostRateLimiter, extract, new_session, resolve, schedule
+from ImageIndex import ImageIndex, link_file
+from PageIndex import load_page_table
+from SiteAdapters import load_adapter
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -25,18 +32,24 @@ content_url = os.getenv("CONTENT_URL")
 website = os.getenv("WEBSITE_IMG")
 
 
-def getLengthOfImages(path):
-    count = 0
-    # Get total number of images in the folder
-    for _, _, files in os.walk(path):
-        count += len(files)
-    return count
-
-
 start = 57
 dir_path = "Gao Wu, Swallowed Star CG"
 end = 887
 image_prefix = os.getenv("IMAGE_PREFIX")
+TILE_WORKERS = 8  # Tiles of one page downloaded at the same time
+BROWSER_WORKERS = int(os.getenv("BROWSER_WORKERS", "4"))  # Chrome instances loading pages
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))  # Pages downloaded and stitched at once
+# Minimum seconds between page loads on one host, shared by all browsers
+PAGE_INTERVAL = float(os.getenv("PAGE_INTERVAL", "1.0"))
+# Reuse known tiles and pages across runs and chapters through ImageIndex
+USE_IMAGE_INDEX = os.getenv("IMAGE_INDEX", "1") == "1"
+# Read image URLs from the plain HTML first and only render pages that need it
+FAST_PATH = os.getenv("FAST_PATH", "1") == "1"
+# Name of a SiteAdapters entry, or a JSON adapter file, with the selectors of the image pages
+SITE_ADAPTER = os.getenv("IMAGE_SITE_ADAPTER", "comic")
+site_adapter = load_adapter(SITE_ADAPTER)
+# Write stitched pages row by row instead of building the whole canvas in memory
+STITCH_STRIPS = os.getenv("STITCH_STRIPS", "0") == "1"
 
 
 def load_cookies(cookies_file):
@@ -66,6 +79,11 @@ def load_cookies(cookies_file):
         return []
 
 
+def image_page_fields():
+    """The adapter's selectors for image pages, with IMAGE_PREFIX and WEBSITE_IMG filled in."""
+    return resolve(site_adapter["pages"]["image"], {"image_prefix": image_prefix, "website": website})
+
+
 def fetch_image_url(driver, url):
     """Fetch the image URL from the given webpage."""
     try:
@@ -77,50 +95,193 @@ def fetch_image_url(driver, url):
             EC.presence_of_all_elements_located((By.TAG_NAME, "img"))
         )
 
-        # Get the page source after images have loaded
-        page_source = driver.page_source
-
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(page_source, "html.parser")
-        
-        # Extract from img tags
-        images = soup.find_all("img")
-        img_txt = [
-            img["src"]
-            for img in images
-            if "src" in img.attrs and image_prefix in img["src"]
-        ]
-        
-        # Extract from background-image in style attributes
-        divs_with_style = soup.find_all(style=re.compile(r'background-image'))
-        for div in divs_with_style:
-            style = div.get('style', '')
-            # Extract URL from background-image: url("...") or url(&quot;...&quot;)
-            match = re.search(r'url\(["\']?(//[^"\')\s]+)["\']?\)', style)
-            if match:
-                bg_url = match.group(1)
-                if image_prefix in bg_url or website in bg_url:
-                    img_txt.append(bg_url)
-        
-        return_image = (img_txt, None)
-
-        # Extract the first matching image URL
-        for img in images:
-            if "src" in img.attrs and website in img["src"]:
-                return_image = (return_image[0], img["src"])
-
-        if len(return_image[0]) == 0:
+        # Parse the page source after images have loaded
+        found = extract(driver.page_source, image_page_fields(), dom=True)
+        if len(found["images"]) == 0:
             print(f"No matching image found on {url}")
 
-        return return_image
+        return found["images"], found["cover"]
 
     except Exception as e:
         print(f"An error occurred while fetching image from {url}: {e}")
         return None
 
 
-def download_and_combine_images(image_urls, output_name, session=None):
-    """Download images from URLs and combine them into one image."""
+def extract_image_urls(page_source):
+    """Pick the page images out of raw HTML without building a DOM.
+
+    Gives what fetch_image_url finds in the rendered page: (the page images,
+    then the cover image or None), with the adapter's simple selectors
+    matched by Crawl.extract's regexes.
+    """
+    found = extract(page_source, image_page_fields())
+    return found["images"], found["cover"]
+
+
+def image_crawler(session, limiter=None):
+    """Crawler for image pages that shares the download session and its cookies."""
+    return Crawler(
+        site_adapter,
+        {"image_prefix": image_prefix, "website": website},
+        session=session,
+        limiter=limiter or HostRateLimiter(0.0),
+    )
+
+
+def fetch_image_url_fast(session, url, crawler=None):
+    """Fetch the image URLs with a plain HTTP request instead of a browser.
+
+    Returns None when the static HTML has no page images (they are added by
+    scripts, or the cookies were refused), so the caller falls back to Selenium.
+    """
+    crawler = crawler or image_crawler(session)
+    try:
+        found = crawler.page("image", url)
+    except Exception as e:
+        print(f"Fast fetch failed for {url}, falling back to the browser: {e}")
+        return None
+    if found is None or not found["images"]:
+        return None
+    return found["images"], found["cover"]
+
+
+def new_download_session(max_workers=TILE_WORKERS):
+    """Session whose connection pool is large enough for concurrent tile downloads."""
+    return new_session(max_workers)
+
+
+def download_tile(session, url, path, index=None):
+    """Stream one tile to disk so its bytes are never held in memory.
+
+    With an index, a tile already seen at this URL is revalidated with its
+    ETag and, when unchanged, linked from the store instead of downloaded.
+    Returns the tile's content hash.
+    """
+    if not url.startswith("http"):
+        url = "https:" + url
+    known = index.lookup_url(url) if index else None
+    headers = {"If-None-Match": known[0]} if known and known[0] else {}
+
+    with session.get(url, stream=True, headers=headers) as response:
+        if known and response.status_code == 304:
+            link_file(index.blob_path(known[1]), path)
+            return known[1]
+        response.raise_for_status()
+        digest = hashlib.sha256()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                digest.update(chunk)
+                f.write(chunk)
+        etag = response.headers.get("ETag")
+
+    content_hash = digest.hexdigest()
+    if index:
+        index.store_tile(url, etag, content_hash, path)
+    return content_hash
+
+
+def download_tiles(image_urls, tile_dir, session, max_workers=TILE_WORKERS, index=None):
+    """Download the tiles of a page concurrently; returns their paths and content hashes in order."""
+    paths = [os.path.join(tile_dir, f"tile_{i}") for i in range(len(image_urls))]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        hashes = list(executor.map(lambda args: download_tile(session, *args, index), zip(image_urls, paths)))
+    return paths, hashes
+
+
+def png_chunk(chunk_type, data):
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+    )
+
+
+def filtered_rows(image):
+    """The image's PNG scanlines with Pillow's filters applied, each led by its filter byte."""
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", compress_level=0)
+    data, position = buffer.getvalue(), 8
+    idat = []
+    while position < len(data):
+        (length,) = struct.unpack(">I", data[position : position + 4])
+        if data[position + 4 : position + 8] == b"IDAT":
+            idat.append(data[position + 8 : position + 8 + length])
+        position += 12 + length
+    return zlib.decompress(b"".join(idat))
+
+
+def write_png_strips(tile_paths, output_name, width, height):
+    """Stitch tiles into an RGB PNG one tile at a time, streaming the rows to disk.
+
+    Only one decoded tile is in memory at once. Each tile is filtered by
+    Pillow on its own; the first row of every tile is stored unfiltered,
+    since the row above it belongs to the previous tile.
+    """
+    row_bytes = width * 3
+    compressor = zlib.compressobj(6)
+    temp_file = f"{output_name}.tmp"
+    with open(temp_file, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        for path in tile_paths:
+            with Image.open(path) as tile:
+                strip = tile.convert("RGB")
+            if strip.width != width:
+                # Narrower tiles sit on black, as they did on the full canvas
+                padded = Image.new("RGB", (width, strip.height))
+                padded.paste(strip, (0, 0))
+                strip = padded
+            rows = filtered_rows(strip)
+            first_row = b"\x00" + strip.crop((0, 0, width, 1)).tobytes()
+            del strip
+            data = compressor.compress(first_row) + compressor.compress(memoryview(rows)[row_bytes + 1 :])
+            del rows
+            if data:
+                f.write(png_chunk(b"IDAT", data))
+        f.write(png_chunk(b"IDAT", compressor.flush()))
+        f.write(png_chunk(b"IEND", b""))
+    os.replace(temp_file, output_name)  # Atomic write
+
+
+def stitch_tiles(tile_paths, output_name, strips=STITCH_STRIPS):
+    """Combine tile files vertically, decoding and releasing one tile at a time."""
+    # Opening an image only reads its header, which is enough for the layout
+    sizes = []
+    for path in tile_paths:
+        with Image.open(path) as tile:
+            sizes.append(tile.size)
+    max_width = max(w for w, _ in sizes)
+    total_height = sum(h for _, h in sizes)
+
+    if strips:
+        write_png_strips(tile_paths, output_name, max_width, total_height)
+        return
+
+    combined_image = Image.new("RGB", (max_width, total_height))
+
+    # Paste images vertically
+    y_offset = 0
+    for path, (_, height) in zip(tile_paths, sizes):
+        with Image.open(path) as tile:
+            combined_image.paste(tile, (0, y_offset))
+        y_offset += height
+
+    combined_image.save(output_name, quality=95, format="PNG")
+
+
+def download_and_combine_images(
+    image_urls, output_name, session=None, strips=STITCH_STRIPS, index=None, shared=False
+):
+    """Download images from URLs and combine them into one image.
+
+    Tiles are downloaded concurrently into a temporary directory and stitched
+    from there, so neither their bytes nor their pixels pile up in memory.
+    With an index, a page made of the same tiles as one saved before is
+    hard-linked from it, and pages showing the same picture re-encoded are
+    reported. shared marks images that legitimately repeat, such as covers,
+    which are linked but never reported.
+    """
     try:
         if not image_urls:
             print("No URLs provided.")
@@ -128,56 +289,46 @@ def download_and_combine_images(image_urls, output_name, session=None):
 
         # Use provided session or create a new one
         if session is None:
-            session = requests.Session()
-
-        # Download images into a list
-        images = []
-        for url in image_urls:
-            if not url.startswith("http"):
-                url = "https:" + url
-            response = session.get(url, stream=True)
-            response.raise_for_status()
-            img = Image.open(BytesIO(response.content))
-            images.append(img)
-
-        # Check if there's only one image
-        if len(images) == 1:
-            images[0].save(output_name, quality=95, format="PNG")
-            print(f"Single image saved as {output_name}.")
-            return
-
-        # Combine images vertically
-        widths = [img.width for img in images]
-        heights = [img.height for img in images]
-
-        max_width = max(widths)
-        total_height = sum(heights)
-
-        combined_image = Image.new("RGB", (max_width, total_height))
-
-        # Paste images vertically
-        y_offset = 0
-        for img in images:
-            combined_image.paste(img, (0, y_offset))
-            y_offset += img.height
+            session = new_download_session()
 
-        combined_image.save(output_name, quality=95, format="PNG")
-        print(f"Combined image saved as {output_name}.")
+        tile_dir = tempfile.mkdtemp(prefix="tiles_")
+        try:
+            tile_paths, tile_hashes = download_tiles(image_urls, tile_dir, session, index=index)
+            page_key = hashlib.sha256(" ".join(tile_hashes).encode("ascii")).hexdigest()
+            existing = index.find_page(page_key, exclude=output_name) if index else None
+
+            if existing:
+                link_file(existing, output_name)
+                print(f"Identical page already saved, linked {existing} to {output_name}.")
+            elif len(tile_paths) == 1:
+                # Check if there's only one image
+                with Image.open(tile_paths[0]) as img:
+                    img.save(output_name, quality=95, format="PNG")
+                print(f"Single image saved as {output_name}.")
+            else:
+                stitch_tiles(tile_paths, output_name, strips)
+                print(f"Combined image saved as {output_name}.")
+
+            if index:
+                for duplicate in index.record_page(output_name, page_key, tile_hashes, shared):
+                    print(f"Duplicate page: {output_name} shows the same picture as {duplicate}")
+        finally:
+            shutil.rmtree(tile_dir, ignore_errors=True)
 
     except Exception as e:
         print(f"Error: {e}")
 
 
-def get_all_images(start, end):
-    """Fetch and save images from the webpage."""
-    # Set up the Selenium WebDriver
+def new_driver():
+    """Start a headless Chrome; the chromedriver download is cached by webdriver_manager."""
     options = webdriver.ChromeOptions()
-    options.headless = True
+    options.add_argument("--headless=new")
     service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    return webdriver.Chrome(service=service, options=options)
 
-    # Load cookies into the driver
-    cookies_list = load_cookies(cookies_file)
+
+def add_cookies(driver, cookies_list):
+    """Open the base domain and load the cookies into a driver."""
     driver.get(os.getenv("BASE_URL"))  # Open the base domain to apply cookies
     for cookie in cookies_list:
         try:
@@ -185,33 +336,109 @@ def get_all_images(start, end):
         except Exception as e:
             print(f"Error adding cookie {cookie}: {e}")
 
+
+def get_all_images(
+    start,
+    end,
+    browsers=BROWSER_WORKERS,
+    download_workers=DOWNLOAD_WORKERS,
+    limiter=None,
+    driver_factory=new_driver,
+    fast_path=FAST_PATH,
+    index=None,
+):
+    """Fetch and save images from the webpage.
+
+    Pages are scheduled on a pool of workers by Crawl.schedule. With
+    fast_path each page is first read with a plain cookie-carrying HTTP
+    request (retried by the crawler); a worker starts its browser (with the
+    loaded cookies) only for the first page whose images are not in the
+    static HTML. Page loads on one host are spaced by the rate limiter, and
+    found images are handed to a separate download pool so the workers move
+    on to the next page right away. The
+    image index (on unless IMAGE_INDEX=0) lets renumbered or re-run chapters
+    reuse tiles and pages that were downloaded before.
+    """
+    limiter = limiter or HostRateLimiter(PAGE_INTERVAL)
+    if index is None and USE_IMAGE_INDEX:
+        index = ImageIndex()
+    image_dir = os.path.join(dir_path, "Images GIF")
+    os.makedirs(image_dir, exist_ok=True)
+
+    # Pages already saved, from one directory scan instead of a stat per page
+    saved = {page["number"] for page in load_page_table(image_dir, image_prefix)["pages"] if page["image"]}
+    pages = []
+    for i in range(start, end + 1):
+        image_name = os.path.join(image_dir, f"{image_prefix} ({i - start}).gif")
+        if i - start in saved:
+            print(f"Image already exists: {image_name}")
+            continue
+        pages.append(i)
+    if not pages:
+        return
+
+    cookies_list = load_cookies(cookies_file)
+
     # Create a requests session with cookies for downloading images
-    download_session = requests.Session()
+    download_session = new_download_session(download_workers * TILE_WORKERS)
     for cookie in cookies_list:
         download_session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"])
+    crawler = image_crawler(download_session, limiter)
 
-    # Iterate through the pages
-    for i in range(start, end + 1):
+    browser = threading.local()  # Each page worker starts at most one browser
+    drivers = []
+    drivers_lock = threading.Lock()
+
+    def find_images(i):
         url = content_url.format(i)
         print(f"Fetching image from: {url}")
-        image_dir = os.path.join(dir_path, "Images GIF")
-        os.makedirs(image_dir, exist_ok=True)
+        found = None
+        if fast_path:
+            found = fetch_image_url_fast(download_session, url, crawler)
+        if found is None:
+            driver = getattr(browser, "driver", None)
+            if driver is None:
+                try:
+                    driver = driver_factory()
+                except Exception as e:
+                    print(f"Error starting browser: {e}")
+                    return None
+                with drivers_lock:
+                    drivers.append(driver)
+                add_cookies(driver, cookies_list)
+                browser.driver = driver
+            limiter.wait(url)
+            found = fetch_image_url(driver, url)
+        return found
+
+    downloads = []
+
+    def download_page(i, future):
+        found = future.result()
+        if found is None:
+            return
+        image_urls, image_url = found
         image_name = os.path.join(image_dir, f"{image_prefix} ({i - start}).gif")
         image_name2 = os.path.join(image_dir, f"{image_prefix} ({i - start})_1.gif")
-
-        if os.path.exists(image_name):
-            print(f"Image already exists: {image_name}")
-            continue
-        time.sleep(1)
-        image_urls, image_url = fetch_image_url(driver, url)
-
         if len(image_urls) > 0:
-            download_and_combine_images(image_urls, image_name, download_session)
+            downloads.append(
+                executor.submit(download_and_combine_images, image_urls, image_name, download_session, index=index)
+            )
         if image_url is not None:
-            download_and_combine_images([image_url], image_name2, download_session)
+            downloads.append(
+                executor.submit(
+                    download_and_combine_images, [image_url], image_name2, download_session, index=index, shared=True
+                )
+            )
 
-    # Close the driver
-    driver.quit()
+    with ThreadPoolExecutor(max_workers=download_workers) as executor:
+        try:
+            schedule(pages, find_images, download_page, workers=browsers)
+        finally:
+            # Close the browsers
+            for driver in drivers:
+                driver.quit()
+        wait(downloads)
 
 
 if __name__ == "__main__":
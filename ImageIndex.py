@@ -0,0 +1,197 @@
+import json
+import os
+import shutil
+
+from PIL import Image
+
+from Storage import SqliteStore
+
+IMAGE_INDEX_FILE = os.getenv("IMAGE_INDEX_FILE", os.path.join(os.getcwd(), "image_index.sqlite"))
+# Content-addressed copies of downloaded tiles, shared by every chapter
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(os.getcwd(), ".image_store"))
+# Largest dHash distance per tile for two pages to count as the same picture. Pages
+# are matched on 8-bit bands of their first tile's hash, which finds every pair
+# within 7 bits
+NEAR_DUPLICATE_DISTANCE = 6
+BANDS = 8
+
+
+def link_file(source, destination):
+    """Hard-link source to destination, copying when links are not possible."""
+    temp_file = f"{destination}.tmp"
+    if os.path.exists(temp_file):
+        os.remove(temp_file)
+    try:
+        os.link(source, temp_file)
+    except OSError:
+        shutil.copyfile(source, temp_file)
+    os.replace(temp_file, destination)  # Atomic write
+
+
+def dhash(path, size=8):
+    """64-bit difference hash of an image: survives re-encoding and small edits."""
+    with Image.open(path) as image:
+        image.draft("L", (size * 8, size * 8))  # JPEG decodes at reduced size
+        small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+class ImageIndex(SqliteStore):
+    """Persistent index of downloaded tiles and stitched pages.
+
+    tiles maps a source URL to its ETag and content hash, so a known tile is
+    revalidated with If-None-Match instead of downloaded again. blobs maps a
+    content hash to a copy in IMAGE_STORE_DIR and to its dHash. pages maps a
+    saved page to the content hashes of its tiles, so the same page under a
+    new name or in another chapter is hard-linked instead of stitched, and
+    to its tile dHashes, so re-encoded copies are flagged as duplicates.
+    Shared pages (covers and other images that legitimately repeat) are
+    linked the same way but never flagged or matched as duplicates.
+    """
+
+    def __init__(self, path=IMAGE_INDEX_FILE, store_dir=IMAGE_STORE_DIR):
+        super().__init__(path)
+        self.store_dir = store_dir
+        conn = self.connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tiles (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    content_hash TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    content_hash TEXT PRIMARY KEY,
+                    dhash INTEGER
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    path TEXT PRIMARY KEY,
+                    page_key TEXT NOT NULL,
+                    dhashes TEXT NOT NULL,
+                    shared INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Indexes written before shared pages existed
+            if "shared" not in [row[1] for row in conn.execute("PRAGMA table_info(pages)")]:
+                conn.execute("ALTER TABLE pages ADD COLUMN shared INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_by_key ON pages (page_key)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS page_bands (
+                    band INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    path TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS page_bands_by_value ON page_bands (band, value)")
+
+    def blob_path(self, content_hash):
+        return os.path.join(self.store_dir, content_hash[:2], content_hash)
+
+    def lookup_url(self, url):
+        """Return (etag, stored copy) for a known tile URL whose copy still exists, else None."""
+        row = self.connect().execute(
+            "SELECT etag, content_hash FROM tiles WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None or not os.path.exists(self.blob_path(row[1])):
+            return None
+        return row[0], row[1]
+
+    def store_tile(self, url, etag, content_hash, path):
+        """Record a downloaded tile and keep a copy of it in the store."""
+        blob = self.blob_path(content_hash)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            link_file(path, blob)
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tiles (url, etag, content_hash) VALUES (?, ?, ?)",
+                (url, etag, content_hash),
+            )
+
+    def tile_dhash(self, content_hash):
+        """dHash of a stored tile, computed once per distinct tile."""
+        conn = self.connect()
+        row = conn.execute("SELECT dhash FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row is not None:
+            return row[0]
+        value = dhash(self.blob_path(content_hash))
+        # SQLite integers are signed 64-bit
+        signed = value - (1 << 64) if value >= 1 << 63 else value
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO blobs (content_hash, dhash) VALUES (?, ?)", (content_hash, signed))
+        return signed
+
+    def find_page(self, page_key, exclude=None):
+        """Path of an existing saved page built from exactly these tiles, or None."""
+        rows = self.connect().execute("SELECT path FROM pages WHERE page_key = ?", (page_key,))
+        for (path,) in rows.fetchall():
+            if path != exclude and os.path.exists(path):
+                return path
+        return None
+
+    def record_page(self, path, page_key, tile_hashes, shared=False):
+        """Save a page's record and return the other pages that show the same picture re-encoded.
+
+        Exact copies (same tiles) are not returned: they are hard-linked by
+        find_page and reported as such. A shared page is recorded for
+        find_page only, and is never compared with other pages.
+        """
+        conn = self.connect()
+        if shared:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (path, page_key, dhashes, shared) VALUES (?, ?, '[]', 1)",
+                    (path, page_key),
+                )
+                conn.execute("DELETE FROM page_bands WHERE path = ?", (path,))
+            return []
+
+        dhashes = [self.tile_dhash(h) for h in tile_hashes]
+        bands = [(band, (dhashes[0] >> (8 * band)) & 0xFF) for band in range(BANDS)]
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (path, page_key, dhashes, shared) VALUES (?, ?, ?, 0)",
+                (path, page_key, json.dumps(dhashes)),
+            )
+            conn.execute("DELETE FROM page_bands WHERE path = ?", (path,))
+            conn.executemany(
+                "INSERT INTO page_bands (band, value, path) VALUES (?, ?, ?)",
+                [(band, value, path) for band, value in bands],
+            )
+
+        # Re-encoded copies share a band of the first tile's hash
+        candidates = conn.execute(
+            "SELECT path, dhashes FROM pages WHERE path != ? AND page_key != ? AND shared = 0 AND path IN"
+            f" (SELECT path FROM page_bands WHERE {' OR '.join(['(band = ? AND value = ?)'] * BANDS)})",
+            [path, page_key, *[v for band in bands for v in band]],
+        ).fetchall()
+        duplicates = []
+        for other, other_dhashes in candidates:
+            other_dhashes = json.loads(other_dhashes)
+            if len(other_dhashes) == len(dhashes) and all(
+                bin((a ^ b) & ((1 << 64) - 1)).count("1") <= NEAR_DUPLICATE_DISTANCE
+                for a, b in zip(dhashes, other_dhashes)
+            ):
+                duplicates.append(other)
+        return duplicates
@@ -1,23 +1,59 @@
 import os
+import base64
+import gzip
+import hashlib
+import html
+import json
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from google.cloud import vision, storage
 from google.cloud import translate_v3 as translate
 import vertexai
 from vertexai.generative_models import GenerativeModel
 from PIL import Image
 from dotenv import load_dotenv
+from TranslationMemory import TranslationMemory
+from BuildGraph import BuildGraph
+from ImageVariants import VARIANTS_DIR, load_variants
+from PageIndex import load_page_table, report_gaps
 
 # Load environment variables from .env file
 load_dotenv()
 
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
 image_prefix = os.getenv("IMAGE_PREFIX")
-missing_num = 0
 dir_path = "Gao Wu, Swallowed Star CG"
-
-def batch_extract_text_from_images(image_uris):
+UPLOAD_WORKERS = 8
+# Files above this size are sent as chunked resumable uploads that retry per chunk
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024
+OCR_BATCH_SIZE = 16  # Cloud Vision API has a limit of 16 images per request
+OCR_IN_FLIGHT = 4  # Batch requests sent to Cloud Vision at the same time
+OCR_BACKEND = os.getenv("OCR_BACKEND", "vision")  # "vision" or "tesseract"
+# Tesseract language packs joined with "+", e.g. "chi_sim+chi_tra" for mixed pages
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "chi_sim")
+OCR_PROCESSES = int(os.getenv("OCR_PROCESSES", str(os.cpu_count() or 1)))
+# Cloud Translation v3 limits per translate_text request
+TRANSLATE_MAX_SEGMENTS = 1024
+TRANSLATE_MAX_CHARS = 30000
+TRANSLATE_IN_FLIGHT = 4
+FORMAT_WITH_GEMINI = False  # Adds a Gemini formatting stage after translation
+VIEWER_CHUNK_SIZE = 100  # Pages per manifest chunk fetched by the viewer
+VIEWER_PREFETCH = 3  # Pages the viewer loads ahead of and behind the current one
+VIEWER_CACHE_PAGES = 24  # Pages the viewer keeps in memory
+VIEWER_PAGE_OFFSET = 346  # Number shown for the first page
+VIEWER_DEFAULT_PAGE = 515  # Page opened when nothing is saved in localStorage
+VIEWER_IMAGE_SCALE = 0.5  # Page images are shown at half the text column
+BUILD_STATIC_SITE = False  # Also pre-render the pages into static HTML under SITE_DIR
+SITE_DIR = "site"
+STATIC_CHUNK_SIZE = 20  # Pages per pre-rendered HTML file
+# Part of the hash of every viewer and site output: bump it when the code that
+# writes them changes, so existing outputs are rebuilt
+VIEWER_VERSION = 1
+
+def batch_extract_text_from_images(image_uris, client=None):
     """Extract text from multiple images using Google Cloud Vision API."""
-    # Initialize Vision API client
-    client = vision.ImageAnnotatorClient()
+    # Initialize Vision API client unless a shared one is passed in
+    client = client or vision.ImageAnnotatorClient()
 
     # Create Vision API image objects using GCS URIs
     requests = [
@@ -40,48 +76,229 @@ def batch_extract_text_from_images(image_uris):
     return results
 
 
-def upload_to_gcs(bucket_name, image_paths):
-    """Upload files to Google Cloud Storage."""
+def file_checksums(path):
+    """Return the base64 MD5 and CRC32C of a file, in the format GCS reports them."""
+    import google_crc32c
+
+    md5 = hashlib.md5()
+    crc = google_crc32c.Checksum()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+            crc.update(chunk)
+    return (
+        base64.b64encode(md5.digest()).decode("ascii"),
+        base64.b64encode(crc.digest()).decode("ascii"),
+    )
+
+
+def is_same_file(path, blob):
+    """Check whether an existing blob already holds the same bytes as the local file."""
+    if blob.size is not None and blob.size != os.path.getsize(path):
+        return False
+    md5, crc32c = file_checksums(path)
+    # Composite objects have no MD5, but every object has a CRC32C
+    if blob.md5_hash:
+        return blob.md5_hash == md5
+    return blob.crc32c == crc32c
+
 
-    client = storage.Client()
+def upload_file(bucket, image, blob_name):
+    """Upload one file, using a resumable chunked upload for large files."""
+    size = os.path.getsize(image)
+    chunk_size = RESUMABLE_THRESHOLD if size > RESUMABLE_THRESHOLD else None
+    blob = bucket.blob(blob_name, chunk_size=chunk_size)
+    blob.upload_from_filename(image)
+    return size
+
+
+def gcs_bucket_name(path=dir_path):
+    """Name of the bucket holding a chapter directory's page images."""
+    return f"{path.lower().replace(', ', '-').replace(' ','-')}-images-gif"
+
+
+def vision_ocr(image_paths, client=None, max_in_flight=OCR_IN_FLIGHT, bucket_name=None):
+    """OCR backend using Cloud Vision. Yields (position, text) as batches complete.
+
+    Local files are uploaded to GCS first; gs:// URIs are used as they are. Several
+    16-image batches are in flight at once on one shared client.
+    """
+    local = [i for i, path in enumerate(image_paths) if not path.startswith("gs://")]
+    image_uris = list(image_paths)
+    if local:
+        uploaded = upload_to_gcs(
+            bucket_name or gcs_bucket_name(), [image_paths[i] for i in local]
+        )
+        for i, uri in zip(local, uploaded):
+            image_uris[i] = uri
+
+    client = client or vision.ImageAnnotatorClient()
+    batches = [
+        list(range(i, min(i + OCR_BATCH_SIZE, len(image_uris))))
+        for i in range(0, len(image_uris), OCR_BATCH_SIZE)
+    ]
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = {
+            executor.submit(
+                batch_extract_text_from_images, [image_uris[i] for i in batch], client
+            ): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                texts = future.result()
+            except Exception as e:
+                print(f"Error extracting text from {image_paths[batch[0]]} to {image_paths[batch[-1]]}: {e}")
+                continue
+            yield from zip(batch, texts)
+
+
+def tesseract_extract_text(image_path, languages=OCR_LANGUAGES):
+    """Extract text from one local image with Tesseract."""
+    import pytesseract
+
+    with Image.open(image_path) as image:
+        text = pytesseract.image_to_string(image.convert("RGB"), lang=languages)
+    return text.strip() or None
+
+
+def tesseract_ocr(image_paths, languages=OCR_LANGUAGES, processes=OCR_PROCESSES):
+    """OCR backend using a local Tesseract install across a process pool.
+
+    Reads the images straight from disk, so nothing is uploaded. Yields
+    (position, text) as pages complete.
+    """
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(tesseract_extract_text, path, languages): i
+            for i, path in enumerate(image_paths)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                yield i, future.result()
+            except Exception as e:
+                print(f"Error extracting text from {image_paths[i]}: {e}")
+
+
+OCR_BACKENDS = {
+    "vision": vision_ocr,
+    "tesseract": tesseract_ocr,
+}
+
+
+def upload_to_gcs(bucket_name, image_paths, client=None, max_workers=UPLOAD_WORKERS):
+    """Upload files to Google Cloud Storage concurrently, skipping identical blobs."""
+
+    client = client or storage.Client()
     bucket = client.bucket(bucket_name)
     if not bucket.exists():
         bucket = client.create_bucket(bucket_name)
+
+    # One listing instead of an exists() round trip per image
+    existing = {blob.name: blob for blob in client.list_blobs(bucket_name)}
     link_gs = []
+    to_upload = []
 
     for image in image_paths:
         blob_name = os.path.split(image)[1]
-        blob = bucket.blob(blob_name)
         link_gs.append(f"gs://{bucket_name}/{blob_name}")
-        if blob.exists():
+        if blob_name in existing and is_same_file(image, existing[blob_name]):
             print(f"Skipping {image}, already exists in {bucket_name}/{blob_name}")
             continue
-        blob.upload_from_filename(image)
-        print(f"File {image} uploaded to {bucket_name}/{blob_name}.")
+        to_upload.append((image, blob_name))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(upload_file, bucket, image, blob_name): image
+            for image, blob_name in to_upload
+        }
+        for future in as_completed(futures):
+            image = futures[future]
+            try:
+                future.result()
+                print(f"File {image} uploaded to {bucket_name}.")
+            except Exception as e:
+                print(f"Error uploading {image}: {e}")
 
     return link_gs
 
 
+def pack_segments(segments, max_segments=TRANSLATE_MAX_SEGMENTS, max_chars=TRANSLATE_MAX_CHARS):
+    """Group segments into requests that stay under the per-request limits."""
+    requests, current, size = [], [], 0
+    for segment in segments:
+        if current and (len(current) >= max_segments or size + len(segment) > max_chars):
+            requests.append(current)
+            current, size = [], 0
+        current.append(segment)
+        size += len(segment)
+    if current:
+        requests.append(current)
+    return requests
+
+
+def translate_segments(client, segments, target_language):
+    """Translate one packed request of segments and return {source: translation}."""
+    parent = f"projects/{PROJECT_ID}/locations/global"
+    response = client.translate_text(
+        contents=segments,
+        target_language_code=target_language,
+        parent=parent,
+    )
+    return {
+        source: translation.translated_text
+        for source, translation in zip(segments, response.translations)
+    }
+
+
+def translate_pages(texts, target_language="en", client=None, memory=None):
+    """Translate many pages at once, line by line.
+
+    Lines from all pages are deduplicated, looked up in the translation memory,
+    and only unseen lines are sent, packed into as few requests as the API
+    limits allow. Returns one translation per text, or None for pages with a
+    line that could not be translated.
+    """
+    if memory is None:
+        memory = TranslationMemory()
+    pages = [text.split("\n") for text in texts]
+    # Blank lines translate to themselves and are never sent
+    unique = {line for lines in pages for line in lines if line.strip()}
+    translated = memory.lookup(unique, target_language)
+    pending = sorted(unique - translated.keys())
+
+    if pending:
+        client = client or translate.TranslationServiceClient()
+        with ThreadPoolExecutor(max_workers=TRANSLATE_IN_FLIGHT) as executor:
+            futures = [
+                executor.submit(translate_segments, client, request, target_language)
+                for request in pack_segments(pending)
+            ]
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error translating text: {e}")
+                    continue
+                memory.store(result, target_language)
+                translated.update(result)
+
+    results = []
+    for lines in pages:
+        if all(line in translated for line in lines if line.strip()):
+            results.append(
+                "\n".join(translated[line] if line.strip() else line for line in lines)
+            )
+        else:
+            results.append(None)
+    return results
+
+
 def translate_text(text, target_language="en"):
     """Translate text using Google Cloud Translation API."""
-    try:
-        client = translate.TranslationServiceClient()
-        parent = f"projects/{PROJECT_ID}/locations/global"
-        lines = text.split("\n")
-        translated_lines = client.translate_text(
-            contents=[line for line in lines],
-            target_language_code=target_language,
-            parent=parent,
-        )
-        return "\n".join(
-            [
-                translation.translated_text
-                for translation in translated_lines.translations
-            ]
-        )
-    except Exception as e:
-        print(f"Error translating text: {e}")
-        return None
+    return translate_pages([text], target_language)[0]
 
 
 def save_text_to_file(text, output_path):
@@ -94,15 +311,86 @@ def save_text_to_file(text, output_path):
         print(f"Error saving text to file: {e}")
 
 
-def generate_dynamic_html(file_paths, output_dir):
-    """Generate an HTML file to dynamically display one text file at a time."""
-    html_path = os.path.join(output_dir, "index.html")
-    try:
-        with open(html_path, "w", encoding="utf-8") as html_file:
-            html_file.write("<html><head><title>Novel Viewer</title>")
-            html_file.write("<style>")
-            html_file.write(
-                """
+def site_path(path):
+    """Path as a URL relative to the site root, with forward slashes."""
+    return path.replace("\\", "/")
+
+
+def viewer_nodes(file_paths, output_dir, chunk_size=VIEWER_CHUNK_SIZE, bundle=False):
+    """The files of the viewer, as build nodes (see VIEWER_STAGES).
+
+    The page list goes to a small manifest.json holding the page count and
+    chunk URLs, and manifest-K.json files holding the [text, image, variants]
+    entries of chunk_size pages, where variants maps a format to [url, width]
+    pairs (see ImageVariants). With bundle=True the texts of each chunk are
+    also packed into one gzip file so a chunk costs one request. index.html
+    only needs the manifest URL, so it is the same for every page count.
+    """
+    pages, text_paths = [], []
+    for entry in file_paths:
+        text_path, image, variants = (list(entry) + [None, None])[:3] if isinstance(entry, (list, tuple)) else (entry, None, None)
+        if variants:
+            variants = {f: [[site_path(url), width] for url, width in v] for f, v in variants.items()}
+        pages.append([site_path(text_path), site_path(image) if image else None, variants])
+        text_paths.append(text_path)
+
+    nodes = []
+    manifest = {"count": len(pages), "chunk_size": chunk_size, "chunks": [], "bundles": [] if bundle else None}
+    for k, start in enumerate(range(0, len(pages), chunk_size)):
+        chunk_path = os.path.join(output_dir, f"manifest-{k}.json")
+        nodes.append({
+            "stage": "viewer_chunks",
+            "output": chunk_path,
+            "inputs": [],
+            "params": {"start": start, "pages": pages[start : start + chunk_size]},
+        })
+        manifest["chunks"].append(site_path(chunk_path))
+        if bundle:
+            bundle_path = os.path.join(output_dir, f"bundle-{k}.json.gz")
+            nodes.append({
+                "stage": "viewer_bundles",
+                "output": bundle_path,
+                "inputs": text_paths[start : start + chunk_size],
+                "params": None,
+            })
+            manifest["bundles"].append(site_path(bundle_path))
+
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    nodes.append({"stage": "viewer_manifest", "output": manifest_path, "inputs": [], "params": manifest})
+    viewer_config = {
+        "manifest": site_path(manifest_path),
+        "prefetch": VIEWER_PREFETCH,
+        "cachePages": max(VIEWER_CACHE_PAGES, 2 * VIEWER_PREFETCH + 1),
+        "pageOffset": VIEWER_PAGE_OFFSET,
+        "defaultPage": VIEWER_DEFAULT_PAGE,
+        "imageScale": VIEWER_IMAGE_SCALE,
+    }
+    nodes.append({
+        "stage": "html",
+        "output": os.path.join(output_dir, "index.html"),
+        "inputs": [],
+        "params": {"config": viewer_config, "css": VIEWER_CSS, "script": VIEWER_SCRIPT},
+    })
+    return nodes
+
+
+def write_viewer_chunk(node):
+    with open(node["output"], "w", encoding="utf-8") as f:
+        json.dump(node["params"], f, separators=(",", ":"))
+
+
+def write_viewer_bundle(node):
+    texts = [read_text_file(text_path) or "" for text_path in node["inputs"]]
+    with gzip.open(node["output"], "wt", encoding="utf-8") as f:
+        json.dump(texts, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_viewer_manifest(node):
+    with open(node["output"], "w", encoding="utf-8") as f:
+        json.dump(node["params"], f, separators=(",", ":"))
+
+
+VIEWER_CSS = """
                 body {
                     font-family: Roboto, Arial, sans-serif;
                     margin: 2em auto;
@@ -131,126 +419,442 @@ def generate_dynamic_html(file_paths, output_dir):
                     line-height: 2;
                 }
             """
-            )
-            html_file.write("</style>")
-            html_file.write("<script src='config.js'></script>")
-            html_file.write("<script>")
-            html_file.write(
-                f"""
-                let files = {file_paths};
-                let currentIndex = 0;
-                let tempIndex = 346;
-                let defaultIndex = 515;
-
-                function getImagePrefix() {{
-                    return window.env.IMAGE_PREFIX;
-                }}
-
-                files.forEach((file) => {{
-                    if (Array.isArray(file) && file[1]) {{
-                        let lastSlashIndex = file[1].lastIndexOf("\\\\");
-                        let filePath = file[1];
-                        let directoryPath = filePath.substring(0, lastSlashIndex);
-                        let imageName = filePath.substring(lastSlashIndex + 1);
-                        let imageSuffix = imageName.split(" ")[1];
-                        file[1] = directoryPath + "/" + getImagePrefix() + " " + imageSuffix;
-                    }}
-                }});
-
-                function loadFile(index) {{
-                    if (index < 0 || index >= files.length) return;
-
-                    // Clear the existing content
-                    document.getElementById('content').innerHTML = '';
-
-                    if (Array.isArray(files[index]) && files[index]?.[1]) {{
-                        // Display the image
-                        fetch(files[index][1])
-                        .then(response => {{
-                            if (!response.ok) {{
-                                throw new Error('Failed to fetch image');
-                            }}
-                            return response.blob(); // Convert the response to a blob
-                        }})
-                        .then(blob => {{
-                            const imageURL = URL.createObjectURL(blob);
-                            const imageElement = document.createElement('img');
-                            imageElement.src = imageURL;
-                            imageElement.alt = 'Image';
-                            imageElement.style.maxWidth = '50%';
-                            document.getElementById('content').appendChild(imageElement);
-                        }})
-                        .catch(err => {{
-                            console.error('Failed to load image:', err);
-                        }});
-                    }}
-
-                    fetch(Array.isArray(files[index]) ? files[index][0] : files[index])
-                        .then(response => response.text())
-                        .then(data => {{
-                            const formattedData = data.replace(/\\n\\n/g, '<br><br>').replace(/\\n/g, '<br>');
-                            const textElement = document.createElement('div');
-                            textElement.innerHTML = formattedData;
-                            document.getElementById('content').appendChild(textElement);
-                            currentIndex = index;
-                            document.getElementById('pageNumber').innerText = 'Page ' + (tempIndex + index);
-                            document.getElementById('pageNumber2').innerText = 'Page ' + (tempIndex + index);
-                            localStorage.setItem('currentIndex', currentIndex);
-                        }})
-                        .catch(err => {{
-                            console.error('Failed to load file:', err);
-                        }});
-                }}
-
-                function nextPage() {{
-                    if (currentIndex < files.length - 1) {{
-                        loadFile(currentIndex + 1);
-                        window.scrollTo(0, 0);
-                    }}
-                }}
-
-                function prevPage() {{
-                    if (currentIndex > 0) {{
-                        loadFile(currentIndex - 1);
-                        window.scrollTo(0, 0);
-                    }}
-                }}
-
-                window.onload = () => {{
-                    const savedIndex = localStorage.getItem('currentIndex');
-                    if (savedIndex !== null) {{
-                        loadFile(parseInt(savedIndex, 10));
-                    }} else {{
-                        loadFile(defaultIndex - tempIndex); // Default page
-                    }}
-
-                    window.addEventListener("keydown", (event) => {{
-                        if (event.key === "ArrowLeft") {{
-                            prevPage();
-                        }} else if (event.key === "ArrowRight") {{
-                            nextPage();
-                        }}
-                    }});
-                }};
+
+
+STATIC_CSS = VIEWER_CSS + """
+                .navigation a {
+                    padding: 0.5em 1em;
+                    background-color: #007BFF;
+                    color: white;
+                    border-radius: 5px;
+                    text-decoration: none;
+                }
+                section {
+                    margin-bottom: 3em;
+                }
+                .content {
+                    white-space: pre-wrap;
+                    line-height: 2;
+                }
             """
-            )
-            html_file.write("</script>")
-            html_file.write("</head><body>")
-            html_file.write("<h1>Novel Viewer</h1>")
-            html_file.write("<span id='pageNumber'></span>")
-            html_file.write("<div id='content'></div>")
-            html_file.write("<div class='navigation'>")
-            html_file.write("<button onclick='prevPage()'>Previous</button>")
-            html_file.write("<span id='pageNumber2'></span>")
-            html_file.write("<button onclick='nextPage()'>Next</button>")
-            html_file.write("</div>")
-            html_file.write("</body></html>")
-        return html_path
+
+
+VIEWER_SCRIPT = r"""
+let manifest = null;
+let currentIndex = 0;
+const chunks = new Map();  // chunk number -> promise of its [text, image] paths
+const bundles = new Map();  // chunk number -> promise of its page texts
+const cache = new Map();  // page index -> promise of {text, image}, least recent first
+const imageFormats = detectImageFormats();
+
+function getImagePrefix() {
+    return window.env.IMAGE_PREFIX;
+}
+
+function fetchOk(url) {
+    return fetch(url).then(response => {
+        if (!response.ok) {
+            throw new Error('Failed to fetch ' + url);
+        }
+        return response;
+    });
+}
+
+function getChunk(n) {
+    if (!chunks.has(n)) {
+        chunks.set(n, fetchOk(manifest.chunks[n]).then(r => r.json()).then(c => c.pages));
+    }
+    return chunks.get(n);
+}
+
+function detectImageFormats() {
+    // Formats the browser can decode, tested with tiny sample images
+    const samples = {
+        avif: 'data:image/avif;base64,AAAAIGZ0eXBhdmlmAAAAAGF2aWZtaWYxbWlhZk1BMUIAAADrbWV0YQAAAAAAAAAhaGRscgAAAAAAAAAAcGljdAAAAAAAAAAAAAAAAAAAAAAOcGl0bQAAAAAAAQAAAB5pbG9jAAAAAEQAAAEAAQAAAAEAAAETAAAAIQAAAChpaW5mAAAAAAABAAAAGmluZmUCAAAAAAEAAGF2MDFDb2xvcgAAAABqaXBycAAAAEtpcGNvAAAAFGlzcGUAAAAAAAAAAQAAAAEAAAAQcGl4aQAAAAADCAgIAAAADGF2MUOBAAwAAAAAE2NvbHJuY2x4AAEADQAGgAAAABdpcG1hAAAAAAAAAAEAAQQBAoMEAAAAKW1kYXQSAAoIGAAGiAhoNCAyExlHh4Yhh5555oAAAJBAyRxgimo=',
+        webp: 'data:image/webp;base64,UklGRiIAAABXRUJQVlA4IBYAAAAwAQCdASoBAAEADsD+JaQAA3AAAAAA',
+    };
+    return Promise.all(Object.entries(samples).map(([format, uri]) => new Promise(resolve => {
+        const img = new Image();
+        img.onload = () => resolve(img.width > 0 ? format : null);
+        img.onerror = () => resolve(null);
+        img.src = uri;
+    }))).then(formats => formats.filter(Boolean));
+}
+
+async function pickImage(imagePath, variants) {
+    // The narrowest variant that fills the image box, in the first supported format
+    if (variants) {
+        const wanted = Math.min(window.innerWidth, 800) * VIEWER.imageScale * (window.devicePixelRatio || 1);
+        for (const format of await imageFormats) {
+            const sizes = variants[format];
+            if (sizes && sizes.length) {
+                const fit = sizes.find(([, width]) => width >= wanted) || sizes[sizes.length - 1];
+                return fit[0];
+            }
+        }
+    }
+    return imagePath;
+}
+
+async function gunzipJSON(response) {
+    const data = await response.arrayBuffer();
+    try {
+        const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream('gzip'));
+        return JSON.parse(await new Response(stream).text());
+    } catch (err) {
+        // The server already decoded it if it sent the file with Content-Encoding: gzip
+        return JSON.parse(new TextDecoder().decode(data));
+    }
+}
+
+function getBundle(n) {
+    if (!bundles.has(n)) {
+        bundles.set(n, fetchOk(manifest.bundles[n]).then(gunzipJSON));
+    }
+    return bundles.get(n);
+}
+
+async function fetchPage(index) {
+    const n = Math.floor(index / manifest.chunk_size);
+    const offset = index - n * manifest.chunk_size;
+    const [textPath, imagePath, variants] = (await getChunk(n))[offset];
+    const imageUrl = await pickImage(imagePath, variants);
+
+    const textPromise = manifest.bundles && 'DecompressionStream' in window
+        ? getBundle(n).then(texts => texts[offset])
+        : fetchOk(textPath).then(response => response.text());
+
+    const imagePromise = imageUrl
+        ? fetchOk(imageUrl.replace('${getImagePrefix()}', getImagePrefix()))
+            .then(response => response.blob())
+            .then(blob => URL.createObjectURL(blob))
+            .catch(err => {
+                console.error('Failed to load image:', err);
+                return null;
+            })
+        : Promise.resolve(null);
+
+    const [text, image] = await Promise.all([textPromise, imagePromise]);
+    return { text, image };
+}
+
+function getPage(index) {
+    let page = cache.get(index);
+    if (page) {
+        cache.delete(index);  // Re-inserted below as the most recently used
+    } else {
+        page = fetchPage(index);
+        page.catch(() => cache.delete(index));
+    }
+    cache.set(index, page);
+
+    // Evict the least recently used pages beyond the cache size
+    while (cache.size > VIEWER.cachePages) {
+        const [oldest, evicted] = cache.entries().next().value;
+        cache.delete(oldest);
+        evicted.then(p => p.image && URL.revokeObjectURL(p.image)).catch(() => {});
+    }
+    return page;
+}
+
+function prefetch(index) {
+    for (let d = 1; d <= VIEWER.prefetch; d++) {
+        for (const i of [index + d, index - d]) {
+            if (i >= 0 && i < manifest.count) {
+                getPage(i).catch(() => {});
+            }
+        }
+    }
+    getPage(index);  // Keep the current page the most recently used
+}
+
+async function loadFile(index) {
+    if (!manifest || index < 0 || index >= manifest.count) return;
+    currentIndex = index;
+
+    let page;
+    try {
+        page = await getPage(index);
+    } catch (err) {
+        console.error('Failed to load file:', err);
+        return;
+    }
+    if (index !== currentIndex) return;  // A later page turn already replaced this one
+
+    // Clear the existing content
+    const content = document.getElementById('content');
+    content.innerHTML = '';
+
+    if (page.image) {
+        const imageElement = document.createElement('img');
+        imageElement.src = page.image;
+        imageElement.alt = 'Image';
+        imageElement.style.maxWidth = (VIEWER.imageScale * 100) + '%';
+        content.appendChild(imageElement);
+    }
+
+    const formattedData = page.text.replace(/\n\n/g, '<br><br>').replace(/\n/g, '<br>');
+    const textElement = document.createElement('div');
+    textElement.innerHTML = formattedData;
+    content.appendChild(textElement);
+
+    document.getElementById('pageNumber').innerText = 'Page ' + (VIEWER.pageOffset + index);
+    document.getElementById('pageNumber2').innerText = 'Page ' + (VIEWER.pageOffset + index);
+    localStorage.setItem('currentIndex', currentIndex);
+    prefetch(index);
+}
+
+function nextPage() {
+    if (manifest && currentIndex < manifest.count - 1) {
+        loadFile(currentIndex + 1);
+        window.scrollTo(0, 0);
+    }
+}
+
+function prevPage() {
+    if (currentIndex > 0) {
+        loadFile(currentIndex - 1);
+        window.scrollTo(0, 0);
+    }
+}
+
+window.onload = () => {
+    fetchOk(VIEWER.manifest)
+        .then(response => response.json())
+        .then(data => {
+            manifest = data;
+            const savedIndex = localStorage.getItem('currentIndex');
+            if (savedIndex !== null) {
+                loadFile(parseInt(savedIndex, 10));
+            } else {
+                loadFile(VIEWER.defaultPage - VIEWER.pageOffset); // Default page
+            }
+        })
+        .catch(err => {
+            console.error('Failed to load manifest:', err);
+        });
+
+    window.addEventListener("keydown", (event) => {
+        if (event.key === "ArrowLeft") {
+            prevPage();
+        } else if (event.key === "ArrowRight") {
+            nextPage();
+        }
+    });
+};
+"""
+
+
+def write_viewer_html(node):
+    """Write the viewer page, which loads the pages listed in the manifest."""
+    params = node["params"]
+    with open(node["output"], "w", encoding="utf-8") as html_file:
+        html_file.write("<html><head><title>Novel Viewer</title>")
+        html_file.write("<style>")
+        html_file.write(params["css"])
+        html_file.write("</style>")
+        html_file.write("<script src='config.js'></script>")
+        html_file.write("<script>")
+        html_file.write(f"\nconst VIEWER = {json.dumps(params['config'])};\n")
+        html_file.write(params["script"])
+        html_file.write("</script>")
+        html_file.write("</head><body>")
+        html_file.write("<h1>Novel Viewer</h1>")
+        html_file.write("<span id='pageNumber'></span>")
+        html_file.write("<div id='content'></div>")
+        html_file.write("<div class='navigation'>")
+        html_file.write("<button onclick='prevPage()'>Previous</button>")
+        html_file.write("<span id='pageNumber2'></span>")
+        html_file.write("<button onclick='nextPage()'>Next</button>")
+        html_file.write("</div>")
+        html_file.write("</body></html>")
+
+
+# Stages are run in this order, so index.html is written after what it loads
+VIEWER_STAGES = {
+    "viewer_chunks": write_viewer_chunk,
+    "viewer_bundles": write_viewer_bundle,
+    "viewer_manifest": write_viewer_manifest,
+    "html": write_viewer_html,
+}
+
+
+def add_viewer_nodes(graph, file_paths, output_dir, chunk_size=VIEWER_CHUNK_SIZE, bundle=False):
+    """Add the viewer's files to a build graph, one node each; returns the stage names."""
+    for name, action in VIEWER_STAGES.items():
+        graph.add_stage(name, action, params={"version": VIEWER_VERSION})
+    for node in viewer_nodes(file_paths, output_dir, chunk_size, bundle):
+        graph.add(node["stage"], node["output"], node["inputs"], node["params"])
+    return list(VIEWER_STAGES)
+
+
+def generate_dynamic_html(file_paths, output_dir, chunk_size=VIEWER_CHUNK_SIZE, bundle=False):
+    """Generate an HTML file to dynamically display one text file at a time.
+
+    The page list goes to a chunked JSON manifest instead of being inlined, and
+    the viewer prefetches neighbouring pages into a bounded in-browser cache.
+    Every file is written; process_images_to_texts adds the same files to its
+    build graph instead, so only the ones that changed are rewritten.
+    """
+    try:
+        nodes = viewer_nodes(file_paths, output_dir, chunk_size, bundle)
+        for node in nodes:
+            VIEWER_STAGES[node["stage"]](node)
+        return nodes[-1]["output"]
     except Exception as e:
         print(f"Error generating dynamic HTML navigation: {e}")
         return None
 
 
+def precompress(path, data):
+    """Write gzip (and brotli, if installed) variants next to path for static serving."""
+    with open(f"{path}.gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(f"{path}.br", "wb") as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def write_static_file(path, content):
+    """Write a site file together with its precompressed variants."""
+    data = content.encode("utf-8")
+    temp_file = f"{path}.tmp"
+    with open(temp_file, "wb") as f:
+        f.write(data)
+    precompress(path, data)
+    os.replace(temp_file, path)  # Written last, so a crash leaves it stale
+
+
+def site_url(path, site_dir):
+    """URL of a file relative to the static site's pages."""
+    return quote(os.path.relpath(path, site_dir).replace("\\", "/"))
+
+
+def static_chunk_name(k):
+    return f"pages-{k}.html"
+
+
+def render_static_chunk(node, site_dir):
+    """Pre-render one chunk of pages, with the <br> formatting already applied."""
+    params = node["params"]
+    start, k = params["start"], params["start"] // params["chunk_size"]
+    sections = []
+    for i, (text_path, image, variants) in enumerate(zip(node["inputs"], params["images"], params["variants"])):
+        number = VIEWER_PAGE_OFFSET + start + i
+        text = html.escape(read_text_file(text_path) or "").replace("\n", "<br>")
+        image_tag = ""
+        if image:
+            image_tag = (
+                f"<img src='{site_url(image, site_dir)}' alt='Image' loading='lazy'"
+                f" style='max-width: {VIEWER_IMAGE_SCALE:.0%}'>"
+            )
+        if image and variants:
+            # The browser picks the first format it decodes and the width that fits
+            sources = "".join(
+                f"<source type='image/{image_format}' sizes='{VIEWER_IMAGE_SCALE * 800:.0f}px'"
+                f" srcset='{', '.join(f'{site_url(url, site_dir)} {width}w' for url, width in sizes)}'>"
+                for image_format, sizes in variants.items()
+            )
+            image_tag = f"<picture>{sources}{image_tag}</picture>"
+        sections.append(
+            f"<section id='page-{number}'><span class='pageNumber'>Page {number}</span>"
+            f"{image_tag}<div class='content'>{text}</div></section>"
+        )
+
+    links = ["<a href='index.html'>Index</a>"]
+    if k > 0:
+        links.insert(0, f"<a href='{static_chunk_name(k - 1)}' rel='prev'>Previous</a>")
+    if params["has_next"]:
+        links.append(f"<a href='{static_chunk_name(k + 1)}' rel='next'>Next</a>")
+    navigation = f"<div class='navigation'>{''.join(links)}</div>"
+
+    write_static_file(
+        node["output"],
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>Novel Viewer, page {VIEWER_PAGE_OFFSET + start}</title>"
+        "<link rel='stylesheet' href='site.css'></head><body>"
+        f"{navigation}{''.join(sections)}{navigation}</body></html>",
+    )
+
+
+def render_static_index(node):
+    """Jump-to-page index: a form for direct jumps and a link per chunk."""
+    params = node["params"]
+    count, chunk_size = params["count"], params["chunk_size"]
+    first, last = VIEWER_PAGE_OFFSET, VIEWER_PAGE_OFFSET + count - 1
+    links = "".join(
+        f"<li><a href='{static_chunk_name(start // chunk_size)}'>Pages"
+        f" {first + start} to {first + min(start + chunk_size, count) - 1}</a></li>"
+        for start in range(0, count, chunk_size)
+    )
+    write_static_file(
+        node["output"],
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Novel Viewer</title>"
+        "<link rel='stylesheet' href='site.css'></head><body><h1>Novel Viewer</h1>"
+        "<form onsubmit='jump(event)'>"
+        f"<input id='page' type='number' min='{first}' max='{last}' value='{first}'>"
+        "<button>Go to page</button></form>"
+        "<script>function jump(event) {"
+        " event.preventDefault();"
+        f" const n = Math.min(Math.max(parseInt(document.getElementById('page').value, 10), {first}), {last});"
+        f" location.href = 'pages-' + Math.floor((n - {first}) / {chunk_size}) + '.html#page-' + n;"
+        " }</script>"
+        f"<ul>{links}</ul></body></html>",
+    )
+
+
+def build_static_site(file_paths, output_dir, chunk_size=STATIC_CHUNK_SIZE):
+    """Pre-render the translated pages into chunked static HTML under output_dir/SITE_DIR.
+
+    Each pages-K.html holds chunk_size pages and is rebuilt only when one of
+    its texts, images or neighbours changes. Every file gets .gz (and .br when
+    the brotli module is installed) variants for servers that send
+    precompressed files. Returns the outputs that were rebuilt, per stage.
+    """
+    site_dir = os.path.join(output_dir, SITE_DIR)
+    os.makedirs(site_dir, exist_ok=True)
+    graph = BuildGraph(os.path.join(site_dir, "build_manifest.json"))
+    params = {"version": VIEWER_VERSION}
+    graph.add_stage("site_css", lambda node: write_static_file(node["output"], node["params"]), params=params)
+    graph.add_stage("site_pages", lambda node: render_static_chunk(node, site_dir), params=params)
+    graph.add_stage("site_index", render_static_index, params=params)
+
+    # Static pages are served as they are, so image names are resolved now
+    def resolve(path):
+        return path.replace("${getImagePrefix()}", image_prefix or "")
+
+    pages = []
+    for text_path, image, variants in ((list(entry) + [None, None])[:3] for entry in file_paths):
+        if variants:
+            variants = {f: [[resolve(url), width] for url, width in v] for f, v in variants.items()}
+        pages.append([text_path, resolve(image) if image else None, variants])
+    graph.add("site_css", os.path.join(site_dir, "site.css"), params=STATIC_CSS)
+    for start in range(0, len(pages), chunk_size):
+        chunk = pages[start : start + chunk_size]
+        graph.add(
+            "site_pages",
+            os.path.join(site_dir, static_chunk_name(start // chunk_size)),
+            [text_path for text_path, _, _ in chunk],
+            params={
+                "start": start,
+                "chunk_size": chunk_size,
+                "has_next": start + chunk_size < len(pages),
+                "images": [image for _, image, _ in chunk],
+                "variants": [variants for _, _, variants in chunk],
+                "offset": VIEWER_PAGE_OFFSET,
+            },
+        )
+    graph.add(
+        "site_index",
+        os.path.join(site_dir, "index.html"),
+        params={"count": len(pages), "chunk_size": chunk_size, "offset": VIEWER_PAGE_OFFSET},
+    )
+    return graph.run()
+
+
 def format_text_with_gemini(translated_text):
     """Formats translated text using the Gemini API."""
 
@@ -276,94 +880,143 @@ def format_text_with_gemini(translated_text):
     return response.text
 
 
-def process_images_to_texts(image_paths, output_dir):
-    """Process multiple images, save extracted text, and create navigation."""
+def read_text_file(path):
+    """Return the contents of a text file, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def process_images_to_texts(
+    image_paths, output_dir, backend=OCR_BACKEND, ocr_options=None, translate_client=None,
+    cover_paths=None, ocr_client=None,
+):
+    """Process multiple local images, save extracted text, and create navigation.
+
+    The work is a build graph of image -> OCR text -> translation -> (formatted
+    text) -> HTML. Every output records the hash of its inputs, so only pages
+    whose image or upstream text changed are redone. Returns the outputs that
+    were rebuilt, per stage.
+
+    cover_paths lists the "_1.gif" image shown with each page (None where a
+    page has none), as read from the page table; without it the names are
+    derived from the page positions. ocr_client is passed to backends that
+    take one (Cloud Vision); unlike ocr_options it is not part of the hash.
+    """
+    raw_dir = os.path.join(output_dir, "RawTexts")
     text_dir = os.path.join(output_dir, "ExtractedTexts")
-    os.makedirs(text_dir, exist_ok=True)
-    raw_dir = "RawTexts"
-
-    saved_files = []
-
-    raw_dirs = [
-        os.path.join(dir_path, raw_dir, f"Page_{i + 1}.txt")
-        for i in range(0, image_dir_len)
-    ]
-
-    os.makedirs(os.path.join(dir_path, raw_dir), exist_ok=True)
-
-    # Check if all the raw text files exists
-    if not all([os.path.exists(file) for file in raw_dirs]):
-        # Cloud Vision API has a limit of 16 images per request
-        extracted_texts = []
-        for i in range(0, len(image_paths), 16):
-            temp = batch_extract_text_from_images(image_paths[i : i + 16])
-            extracted_texts.extend(temp)
-
-        for j, extracted_text in enumerate(extracted_texts):
-            save_text_to_file(
-                extracted_text, os.path.join(dir_path, raw_dir, f"Page_{j + 1}.txt")
-            )
-    
-    else:
-        extracted_texts = [open(file, "r", encoding="utf-8").read() for file in raw_dirs]
+    format_dir = os.path.join(output_dir, "FormattedTexts")
+    for directory in (raw_dir, text_dir) + ((format_dir,) if FORMAT_WITH_GEMINI else ()):
+        os.makedirs(directory, exist_ok=True)
+
+    graph = BuildGraph(os.path.join(output_dir, "build_manifest.json"))
+
+    def ocr_stage(nodes):
+        images = [node["inputs"][0] for node in nodes]
+        options = dict(ocr_options or {}, **({"client": ocr_client} if ocr_client else {}))
+        for position, text in OCR_BACKENDS[backend](images, **options):
+            # Pages without text are saved empty so they are not OCRed again
+            save_text_to_file(text or "", nodes[position]["output"])
+
+    def translate_stage(nodes):
+        pending = []
+        for node in nodes:
+            extracted_text = read_text_file(node["inputs"][0])
+            if not extracted_text:
+                print(f"No text extracted from {node['params']}.")
+                # Saved empty so the page is done; the viewer leaves it out
+                save_text_to_file("", node["output"])
+                continue
+            pending.append((node, extracted_text))
+
+        translations = translate_pages(
+            [text for _, text in pending], "en", translate_client
+        )
+        for (node, _), translated_text in zip(pending, translations):
+            if not translated_text:
+                print(f"Translation failed for text from {node['params']}.")
+                continue
+            save_text_to_file(translated_text, node["output"])
+
+    def format_stage(node):
+        translated_text = read_text_file(node["inputs"][0])
+        formatted_text = format_text_with_gemini(translated_text) if translated_text else ""
+        save_text_to_file(formatted_text, node["output"])
+
+    # Texts from before the manifest are kept; they cost API calls to redo
+    graph.add_stage(
+        "ocr", ocr_stage, batch=True, params={"backend": backend, "options": ocr_options}, adopt=True
+    )
+    graph.add_stage("translate", translate_stage, batch=True, params={"target": "en"}, adopt=True)
+    if FORMAT_WITH_GEMINI:
+        graph.add_stage("format", format_stage, params={"model": "gemini-1.5-pro-002"}, adopt=True)
 
+    page_outputs = []
     for i, image_path in enumerate(image_paths):
+        raw_path = os.path.join(raw_dir, f"Page_{i + 1}.txt")
         output_path = os.path.join(text_dir, f"Page_{i + 1}.txt")
-        image_gif = os.path.join(dir_path, "Images GIF", f"{image_prefix} ({i})_1.gif")
-
-        # Check if the text has already been extracted
-        if os.path.exists(output_path):
-            saved_files.append([output_path, image_gif.replace(image_prefix, "${getImagePrefix()}")])
-            continue
-
-        # Extract text
-        extracted_text = extracted_texts[i]
-        if not extracted_text:
-            print(f"No text extracted from {image_path}.")
+        graph.add("ocr", raw_path, [image_path])
+        graph.add("translate", output_path, [raw_path], params=image_path)
+        if FORMAT_WITH_GEMINI:
+            formatted_path = os.path.join(format_dir, f"Page_{i + 1}.txt")
+            graph.add("format", formatted_path, [output_path])
+            output_path = formatted_path
+        page_outputs.append(output_path)
+
+    rebuilt = graph.run()
+
+    # Smaller WebP/AVIF copies written by ImageVariants, if it has been run
+    variants_dir = os.path.join(dir_path, VARIANTS_DIR)
+    image_variants = load_variants(variants_dir)
+
+    if cover_paths is None:
+        cover_paths = [
+            os.path.join(dir_path, "Images GIF", f"{image_prefix} ({i})_1.gif")
+            for i in range(len(page_outputs))
+        ]
+    # One scan per output directory instead of a lookup per page; empty texts
+    # are pages without text, which the viewer leaves out
+    written = {}
+    saved_files = []
+    for output_path, image_gif in zip(page_outputs, cover_paths):
+        directory, file_name = os.path.split(output_path)
+        if directory not in written:
+            written[directory] = {entry.name for entry in os.scandir(directory) if entry.stat().st_size}
+        if file_name not in written[directory]:
             continue
-
-        # Translate text
-        translated_text = translate_text(extracted_text, target_language="en")
-        if not translated_text:
-            print(f"Translation failed for text from {image_path}.")
+        if image_gif is None:
+            saved_files.append([output_path, None])
             continue
-
-        # Format the translated text using Gemini
-        # formatted_text = format_text_with_gemini(translated_text)
-
-        # Save the formatted text
-        save_text_to_file(translated_text, output_path)
-        saved_files.append([output_path, image_gif.replace(image_prefix, "${getImagePrefix()}")])
-
+        image_name = os.path.basename(image_gif)
+        entry = [output_path, image_gif.replace(image_prefix, "${getImagePrefix()}")]
+        if image_name in image_variants:
+            entry.append({
+                image_format: [
+                    [os.path.join(variants_dir, name).replace(image_prefix, "${getImagePrefix()}"), width]
+                    for name, width in sizes
+                ]
+                for image_format, sizes in image_variants[image_name]["variants"].items()
+            })
+        saved_files.append(entry)
+
+    # The viewer fetches page texts at runtime; each of its files is a node, so a
+    # changed page rewrites only its chunk of the manifest
     if saved_files:
-        navigation_html = generate_dynamic_html(saved_files, output_dir)
-
+        rebuilt.update(graph.run(add_viewer_nodes(graph, saved_files, output_dir)))
+        if BUILD_STATIC_SITE:
+            rebuilt.update(build_static_site(saved_files, output_dir))
+    return rebuilt
 
-def getLengthOfImages(path):
-    count = 0
-    # Get total number of images in the folder
-    for _, _, files in os.walk(path):
-        for file in files:
-            if not file.endswith("1.gif"):
-                count += 1
-    return count
-
-
-image_dir_len = getLengthOfImages(os.path.join(dir_path, "Images GIF"))
 
 if __name__ == "__main__":
-
-    image_paths = [
-        os.path.join(dir_path, "Images GIF", f"{image_prefix} ({i}).gif")
-        for i in range(0, image_dir_len + missing_num)
-        if os.path.exists(
-            os.path.join(dir_path, "Images GIF", f"{image_prefix} ({i}).gif")
-        )
-    ]
-
-    image_paths = upload_to_gcs(
-        f"{dir_path.lower().replace(', ', '-').replace(' ','-')}-images-gif",
-        image_paths,
-    )
-
-    process_images_to_texts(image_paths, dir_path)
+    image_dir = os.path.join(dir_path, "Images GIF")
+    # One directory scan, reused until the directory changes
+    page_table = load_page_table(image_dir, image_prefix)
+    report_gaps(page_table)
+    pages = [page for page in page_table["pages"] if page["image"]]
+    image_paths = [os.path.join(image_dir, page["image"]) for page in pages]
+    cover_paths = [page["cover"] and os.path.join(image_dir, page["cover"]) for page in pages]
+
+    # The Cloud Vision backend uploads the pages it still needs to OCR by itself
+    process_images_to_texts(image_paths, dir_path, OCR_BACKEND, cover_paths=cover_paths)
@@ -1,18 +1,16 @@
 import requests
-from bs4 import BeautifulSoup
 import time
 from dotenv import load_dotenv
 import os
 import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import vertexai
-from vertexai.generative_models import (
-    GenerativeModel,
-    HarmCategory,
-    HarmBlockThreshold,
-    SafetySetting,
-)
+import textwrap
 import threading
+import argparse
+from Crawl import CRAWL_CACHE_HOURS, Checkpoint, Crawler, KeyIndex, PageCache, schedule
+from Progress import ProgressTracker, start_reporter, start_status_server
+from SiteAdapters import load_adapter
+from WorkQueue import QUEUE_FILE, Heartbeat, WorkQueue, default_worker_id
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -23,60 +21,83 @@ promptQuestion = os.getenv("PROMPT_QUESTION")
 NOVEL_LINKS_FILE = os.path.join(os.getcwd(), "novel_links.txt")
 OUTPUT_FILE = os.path.join(os.getcwd(), "final.json")
 PROGRESS_FILE = os.path.join(os.getcwd(), "results.json")
+# Completed novels are appended here one JSON object per line, then compacted
+PROGRESS_LOG_FILE = os.path.join(os.getcwd(), "results.jsonl")
 CHAPTER_LIMIT = 5
 SEARCH_TERMS = os.getenv("KEYWORDS").split(",")
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "/home/viranshshah/cloudAPIKey.json"
+exclude_keywords = {
+    s.strip() for s in os.getenv("EXCLUDE_KEYWORDS", "").split(",") if s.strip()
+}
+# Minimum seconds between requests to the site, across all threads
+REQUEST_DELAY = float(os.getenv("REQUEST_DELAY", "0.5"))
+# Name of a SiteAdapters entry, or a JSON adapter file for another site
+SITE_ADAPTER = os.getenv("NOVEL_SITE_ADAPTER", "novel")
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "20"))  # Novels submitted but not finished
+CREDENTIALS_FILE = "/home/viranshshah/cloudAPIKey.json"
+MODEL_NAME = "gemini-1.5-pro-002"
+USE_LLM = True  # Set by --no-llm to trust keyword matches without asking Gemini
 
 lock = threading.Lock()
-vertexai.init(project=PROJECT_ID, location="us-central1")
+tracker = ProgressTracker("NovelChapterCheck")
+crawler = Crawler(
+    load_adapter(SITE_ADAPTER),
+    interval=REQUEST_DELAY,
+    cache=PageCache() if CRAWL_CACHE_HOURS else None,
+)
+checkpoint = Checkpoint(PROGRESS_FILE, PROGRESS_LOG_FILE, "novel_url")
+
+# Created on first use by get_model() so start-up never pays for the Vertex AI SDK
+model = None
+safety_config = None
+
+
+def get_model():
+    """Initialise Vertex AI and create the Gemini model on first use."""
+    global model, safety_config
+    if model is None:
+        # Imported here because the SDK alone takes seconds to import
+        import vertexai
+        from vertexai.generative_models import (
+            GenerativeModel,
+            HarmCategory,
+            HarmBlockThreshold,
+            SafetySetting,
+        )
+
+        os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", CREDENTIALS_FILE)
+        vertexai.init(project=PROJECT_ID, location="us-central1")
+
+        # Safety config: Set BLOCK_NONE for only specific harm categories
+        safety_config = [
+            SafetySetting(category=category, threshold=HarmBlockThreshold.BLOCK_NONE)
+            for category in (
+                HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+                HarmCategory.HARM_CATEGORY_HARASSMENT,
+                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+                HarmCategory.HARM_CATEGORY_CIVIC_INTEGRITY,
+            )
+        ]
+        model = GenerativeModel(MODEL_NAME)
+    return model
 
 
-def get_soup(url):
-    """Fetch the content of a URL and return a BeautifulSoup object."""
-    with lock:
-        try:
-            time.sleep(0.5)  # Add a delay to avoid overloading the server
-            response = requests.get(url)
-            if response.status_code in [403, 404]:
-                return None
-            response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching {url}: {e}")
-            os._exit(1)  # Exit immediately on any network error
+def get_page(kind, url):
+    """Fetch a page and return the fields the site adapter defines for its kind, or None if missing."""
+    try:
+        return crawler.page(kind, url)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        os._exit(1)  # Exit immediately on any network error once retries are used up
 
 
 def gemini_response(text):
     """Formats translated text using the Gemini API."""
     with lock:
         try:
-            time.sleep(0.5)  # Artificial delay before API call
-            # Create generative model
-            model = GenerativeModel("gemini-1.5-pro-002")
-
-            # Safety config: Set BLOCK_NONE for only specific harm categories
-            safety_config = [
-                SafetySetting(
-                    category=HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                    threshold=HarmBlockThreshold.BLOCK_NONE,
-                ),
-                SafetySetting(
-                    category=HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                    threshold=HarmBlockThreshold.BLOCK_NONE,
-                ),
-                SafetySetting(
-                    category=HarmCategory.HARM_CATEGORY_HARASSMENT,
-                    threshold=HarmBlockThreshold.BLOCK_NONE,
-                ),
-                SafetySetting(
-                    category=HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                    threshold=HarmBlockThreshold.BLOCK_NONE,
-                ),
-                SafetySetting(
-                    category=HarmCategory.HARM_CATEGORY_CIVIC_INTEGRITY,
-                    threshold=HarmBlockThreshold.BLOCK_NONE,
-                ),
-            ]
+            time.sleep(REQUEST_DELAY)  # Artificial delay before API call
+            tracker.incr("llm_calls")
+            model = get_model()
 
             # Generate content using the model with the given safety settings
             response = model.generate_content(
@@ -105,85 +126,42 @@ def gemini_response(text):
 
 def extract_chapter_links(novel_url):
     """Extract the links to the first CHAPTER_LIMIT chapters from the novel's page."""
-    chapter_links = []
-    chapter_lim = CHAPTER_LIMIT
-    soup = get_soup(novel_url)
-    title, categories, tags = "", [], []
-    if soup is None:
-        return chapter_links, title, categories, tags
+    page = get_page("novel", novel_url)
+    if page is None:
+        return [], "", [], []
 
-    title, categories, tags = get_novel_categories_tags(soup)
+    title, categories, tags = get_novel_categories_tags(page)
 
     if exclude_keywords & {s.strip() for s in categories} or exclude_keywords & {
         s.strip() for s in tags
     }:
-        return chapter_links, "", [], []
-
-    # Extract chapter links from the unordered list in the '#chpagedlist' section
-    ul_tag = soup.select_one("#chpagedlist ul.chapter-list")
-    if not ul_tag:
-        return chapter_links, title, categories, tags
-
-    # Ensure CHAPTER_LIMIT does not exceed the number of available <li> tags
-    li_tags = ul_tag.find_all("li")
-    if chapter_lim > len(li_tags):
-        chapter_lim = len(li_tags)
-
-    for li_tag in li_tags[:chapter_lim]:
-        a_tag = li_tag.find("a")
-        if a_tag:
-            href = a_tag.get("href")
-            if href:
-                chapter_links.append(BASE_URL + href)
+        return [], "", [], []
+
+    # One entry per chapter list item; None for items without a link
+    chapter_links = [BASE_URL + href for href in page["chapters"][:CHAPTER_LIMIT] if href]
     return chapter_links, title, categories, tags
 
 
 def get_novel_categories_tags(novel_url):
-    """Get the categories and tags of the novel."""
-    categories = []
-    tags = []
-    title = ""
-    soup = (
-        get_soup(novel_url) if not isinstance(novel_url, BeautifulSoup) else novel_url
-    )
-    if soup is None:
-        return title, categories, tags
-
-    # Get categories
-    ul_tag_cat = soup.select("div.categories ul")
-    if ul_tag_cat:
-        for ul in ul_tag_cat:
-            li_tags = ul.find_all("li")
-            for li_tag in li_tags:
-                categories.append(li_tag.get_text(strip=True))
-
-    # Get tags
-    ul_tag_tag = soup.select("div.tags ul.content")
-    if ul_tag_tag:
-        for ul in ul_tag_tag:
-            li_tags = ul.find_all("li")
-            for li_tag in li_tags:
-                tags.append(li_tag.get_text(strip=True))
-
-    # Get title
-    title = soup.select_one("h1.novel-title.text2row")
-    title = title.get_text(strip=True) if title else ""
-
-    return title, categories, tags
+    """Get the title, categories and tags of the novel, from its URL or its fetched page."""
+    page = get_page("novel", novel_url) if not isinstance(novel_url, dict) else novel_url
+    if page is None:
+        return "", [], []
+    return page["title"] or "", page["categories"], page["tags"]
 
 
 def search_terms_in_chapter(chapter_url):
     """Search for specific terms in a chapter's content."""
     chapter_url = chapter_url.replace("?", "")  # Remove any query parameters
-    soup = get_soup(chapter_url)
-    if soup is None:
+    page = get_page("chapter", chapter_url)
+    tracker.incr("chapters")
+    if page is None:
         return {term: False for term in SEARCH_TERMS}
-    text_content = soup.find("div", class_="chapter-content")
-    text_content = (
-        text_content.get_text(separator=" ", strip=True) if text_content else ""
-    )
+    text_content = page["content"] or ""
 
     if text_content != "" and any(term in text_content for term in SEARCH_TERMS):
+        if not USE_LLM:
+            return {term: term in text_content for term in SEARCH_TERMS}
         response = gemini_response(text_content)
         if "prohibited" in response:
             print(f"Prohibited content found in {chapter_url}")
@@ -195,6 +173,7 @@ def search_terms_in_chapter(chapter_url):
 
 def process_novel(novel_url):
     """Process each novel by visiting its chapters and searching for terms."""
+    tracker.start(novel_url)
     chapter_links, title, categories, tags = extract_chapter_links(novel_url)
     novel_results = []
 
@@ -219,27 +198,49 @@ def process_novel(novel_url):
 
 
 def save_progress(results):
-    """Save progress to a JSON file."""
+    """Save progress to the results file, one result per line so it can be read back streamed."""
     try:
-        temp_file = f"{PROGRESS_FILE}.tmp"
-        with open(temp_file, "w") as f:
-            json.dump(results, f, indent=4)
-        os.replace(temp_file, PROGRESS_FILE)  # Atomic write
+        checkpoint.save(results)
     except Exception as e:
         print(f"Error saving progress: {e}")
         os._exit(1)  # Exit if progress cannot be saved
 
 
+def append_progress(result):
+    """Append one completed novel to the progress log without rewriting the results file."""
+    try:
+        checkpoint.append(result)
+    except Exception as e:
+        print(f"Error saving progress: {e}")
+        os._exit(1)  # Exit if progress cannot be saved
+
+
+def iter_progress():
+    """Yield every saved result: the compacted results file, then the progress log."""
+    try:
+        yield from checkpoint
+    except Exception as e:
+        print(f"Error loading progress: {e}")
+        os._exit(1)  # Exit if progress cannot be loaded
+
+
 def load_progress():
-    """Load progress from a JSON file."""
-    if os.path.exists(PROGRESS_FILE):
-        try:
-            with open(PROGRESS_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading progress: {e}")
-            os._exit(1)  # Exit if progress cannot be loaded
-    return []
+    """Load progress from the results file and progress log."""
+    return list(iter_progress())
+
+
+def load_completed_novels():
+    """Return the novel URLs that already have results, indexed on disk (see Crawl.KeyIndex)."""
+    return KeyIndex(result["novel_url"] for result in iter_progress())
+
+
+def compact_progress():
+    """Fold the progress log into PROGRESS_FILE, dropping duplicate novels."""
+    try:
+        checkpoint.compact()
+    except Exception as e:
+        print(f"Error saving progress: {e}")
+        os._exit(1)  # Exit if progress cannot be saved
 
 
 def process_result(result):
@@ -267,18 +268,153 @@ def process_result(result):
     return result
 
 
-def main():
-    """Main function to process all novel links and search for terms in their chapters."""
+def iter_novel_links():
+    """Yield the novel URLs to process from NOVEL_LINKS_FILE, one line at a time."""
     try:
         with open(NOVEL_LINKS_FILE, "r") as file:
-            novel_links = [line.strip() for line in file.readlines()]
+            for line in file:
+                if line.strip():
+                    yield line.strip()
     except Exception as e:
         print(f"Error reading novel links file: {e}")
         os._exit(1)  # Exit if the novel links file can't be read
 
-    all_results = load_progress()
-    completed_novels = {result["novel_url"] for result in all_results}
-    remaining_novels = [url for url in novel_links if url not in completed_novels]
+
+def novel_result(novel_url):
+    """Process a novel and return its entry for the results file."""
+    novel_results, title, categories, tags = process_novel(novel_url)
+    return {
+        "novel_url": novel_url,
+        "results": novel_results,
+        "title": title,
+        "categories": ", ".join(categories),
+        "tags": ", ".join(tags),
+    }
+
+
+def save_final_results(all_results):
+    """Filter the chapters where terms were found and save them to OUTPUT_FILE.
+
+    all_results may be any iterable, so results are streamed to disk as they are read.
+    """
+    with open(OUTPUT_FILE, "w") as f:
+        f.write("[")
+        count = 0
+        for result in all_results:
+            for chapter in result["results"]:
+                if not any(chapter["found_terms"].values()):
+                    continue
+                filtered_result = {
+                    "novel_url": result["novel_url"],
+                    "chapter_url": chapter["chapter_url"],
+                    "found_terms": {
+                        term: found
+                        for term, found in chapter["found_terms"].items()
+                        if found
+                    },
+                }
+                f.write(",\n" if count else "\n")
+                f.write(textwrap.indent(json.dumps(filtered_result, indent=4), "    "))
+                count += 1
+        f.write("\n]" if count else "]")
+
+    print(f"\nSearch complete. Results saved in {OUTPUT_FILE}")
+
+
+def enqueue_novels(queue):
+    """Load novel links that are not already in the results file into the work queue."""
+    completed_novels = load_completed_novels()
+    added = queue.enqueue(
+        url for url in iter_novel_links() if url not in completed_novels
+    )
+    print(f"Queued {added} novels, queue status: {queue.counts()}")
+
+
+def run_worker(queue, num_threads=10, worker=None):
+    """Claim novels from the work queue and store their results until the queue is drained."""
+    worker = worker or default_worker_id()
+    heartbeat = Heartbeat(queue, worker).start()
+    counts = queue.counts()
+    tracker.set_total(sum(counts.values()), done=counts["done"])
+    start_status_server(tracker)
+    reporter = start_reporter(tracker)
+
+    def work():
+        while True:
+            novel_url = queue.claim(worker)
+            if novel_url is None:
+                counts = queue.counts()
+                if counts["pending"] == 0 and counts["leased"] == 0:
+                    return
+                time.sleep(1)  # Other workers hold leases that may still expire
+                continue
+            heartbeat.add(novel_url)
+            try:
+                if queue.complete(worker, novel_url, novel_result(novel_url)):
+                    tracker.item_done()
+                else:
+                    print(f"Lost lease on {novel_url}, result dropped; another worker will redo it")
+            except Exception as exc:
+                print(f"Error processing novel {novel_url}: {exc}")
+                queue.release(worker, novel_url)
+                os._exit(1)  # Stop everything on any error
+            finally:
+                heartbeat.remove(novel_url)
+
+    print(f"Worker {worker} processing queue {queue.path}...")
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        for future in [executor.submit(work) for _ in range(num_threads)]:
+            future.result()
+
+    heartbeat.stop()
+    reporter.set()
+    print(tracker.summary())
+
+
+def merge_results(queue):
+    """Merge the queue's results into the results file and write the final output."""
+    completed_novels = load_completed_novels()
+    for result in queue.iter_results():
+        if result["novel_url"] not in completed_novels:
+            append_progress(result)
+            completed_novels.add(result["novel_url"])
+    compact_progress()
+    counts = queue.counts()
+    if counts["pending"] or counts["leased"]:
+        print(f"Warning: queue not drained yet: {counts}")
+    save_final_results(iter_progress())
+
+
+def dry_run(queue=None):
+    """Report what a run would process without fetching pages or calling Gemini."""
+    completed_novels = load_completed_novels()
+    total = remaining = 0
+    for url in iter_novel_links():
+        total += 1
+        remaining += url not in completed_novels
+    print(
+        f"{total} novel links, {total - remaining} already done,"
+        f" {remaining} to process (up to {CHAPTER_LIMIT} chapters each)"
+    )
+    if queue is not None:
+        print(f"Queue status: {queue.counts()}")
+
+
+def main(max_in_flight=MAX_IN_FLIGHT):
+    """Main function to process all novel links and search for terms in their chapters.
+
+    Links are streamed from the file and at most max_in_flight novels are submitted
+    at once; each finished novel is appended to the progress log straight away.
+    Finished novels are looked up in an on-disk index rather than a set, so
+    memory does not grow with the number of links or results either.
+    """
+    # Fold any log left by an interrupted run into the results file
+    compact_progress()
+    completed_novels = load_completed_novels()
+    total_novels = remaining_novels = 0
+    for url in iter_novel_links():
+        total_novels += 1
+        remaining_novels += url not in completed_novels
 
     # print("Getting categories")
 
@@ -313,55 +449,86 @@ def main():
     # all_results = list(all_results_dict.values())  # Convert back to list
     # save_progress(all_results)
 
-    print(f"\nProcessing {len(remaining_novels)} novels...")
+    print(f"\nProcessing {remaining_novels} novels...")
+    tracker.set_total(total_novels, done=total_novels - remaining_novels)
+    start_status_server(tracker)
+    reporter = start_reporter(tracker)
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_novel = {
-            executor.submit(process_novel, novel_url): novel_url
-            for novel_url in remaining_novels
-        }
+    def save_finished(novel_url, future):
+        try:
+            append_progress(future.result())
+            tracker.item_done()
+        except Exception as exc:
+            print(f"Error processing novel {novel_url}: {exc}")
+            os._exit(1)  # Stop everything on any error
+
+    # Only max_in_flight novels are submitted, and held in memory, at once
+    schedule(
+        (novel_url for novel_url in iter_novel_links() if novel_url not in completed_novels),
+        novel_result, save_finished, workers=10, max_in_flight=max_in_flight,
+    )
 
-        for future in as_completed(future_to_novel):
-            try:
-                novel_url = future_to_novel[future]
-                novel_results, title, categories, tags = future.result()
-                all_results.append(
-                    {
-                        "novel_url": novel_url,
-                        "results": novel_results,
-                        "title": title,
-                        "categories": ", ".join(categories),
-                        "tags": ", ".join(tags),
-                    }
-                )
-                save_progress(all_results)
-            except Exception as exc:
-                print(f"Error processing novel {novel_url}: {exc}")
-                os._exit(1)  # Stop everything on any error
+    reporter.set()
+    print(tracker.summary())
+    compact_progress()
 
     # Filter and save the final results
-    filtered_results = [
-        {
-            "novel_url": result["novel_url"],
-            "chapter_url": chapter["chapter_url"],
-            "found_terms": {
-                term: found for term, found in chapter["found_terms"].items() if found
-            },
-        }
-        for result in all_results
-        for chapter in result["results"]
-        if any(chapter["found_terms"].values())
-    ]
+    save_final_results(iter_progress())
 
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(filtered_results, f, indent=4)
 
-    print(f"\nSearch complete. Results saved in {OUTPUT_FILE}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Search novel chapters for keywords.")
+    parser.add_argument(
+        "--queue",
+        nargs="?",
+        const=QUEUE_FILE,
+        help="Use a shared SQLite work queue (default file: %(const)s)",
+    )
+    parser.add_argument(
+        "--enqueue", action="store_true", help="Load novel links into the queue"
+    )
+    parser.add_argument(
+        "--worker", action="store_true", help="Process novels claimed from the queue"
+    )
+    parser.add_argument(
+        "--merge", action="store_true", help="Merge queue results into the output files"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=10, help="Worker threads per process"
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=MAX_IN_FLIGHT,
+        help="Novels submitted at once in the single-process run",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report pending work and exit"
+    )
+    parser.add_argument(
+        "--no-llm",
+        action="store_true",
+        help="Record keyword matches without confirming them with Gemini",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
     try:
-        main()
+        args = parse_args()
+        USE_LLM = not args.no_llm
+        if args.dry_run:
+            dry_run(WorkQueue(args.queue) if args.queue else None)
+        elif args.queue:
+            queue = WorkQueue(args.queue)
+            if args.enqueue:
+                enqueue_novels(queue)
+            if args.worker:
+                run_worker(queue, args.threads)
+            if args.merge:
+                merge_results(queue)
+        else:
+            main(args.max_in_flight)
     except KeyboardInterrupt:
         print("\nManual interruption. Exiting...")
         os._exit(1)
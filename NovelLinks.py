@@ -1,10 +1,10 @@
 import requests
-from bs4 import BeautifulSoup
-import time
 from dotenv import load_dotenv
 import os
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from Crawl import Checkpoint, Crawler, schedule
+from Progress import ProgressTracker, start_reporter, start_status_server
+from SiteAdapters import load_adapter
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -12,101 +12,111 @@ load_dotenv()
 BASE_URL = os.getenv("CRAWL_URL")
 START_URL = f'{BASE_URL}{os.getenv("START_PAGE")}'
 OUTPUT_FILE = "novel_links.txt"
+# Each listing page read is a record {"url", "novels", "next_page"}: appended to the
+# log as it finishes and compacted into the progress file (see Crawl.Checkpoint)
 PROGRESS_FILE = "progress.json"
+PROGRESS_LOG_FILE = "progress.jsonl"
 NUM_WORKERS = 5
+# Name of a SiteAdapters entry, or a JSON adapter file for another site
+SITE_ADAPTER = os.getenv("NOVEL_SITE_ADAPTER", "novel")
+
+tracker = ProgressTracker("NovelLinks")
+crawler = None  # Created by main()
+
+
+def page_number(url):
+    return int(url.split("-")[-1].replace(".html", "")) if "-" in url and url.endswith(".html") else 0
+
+
+def migrate_progress():
+    """Rewrite a progress file from before the checkpoint log as checkpoint records."""
+    if not os.path.exists(PROGRESS_FILE):
+        return
+    with open(PROGRESS_FILE, "r") as f:
+        if f.read(1) != "{":
+            return
+        f.seek(0)
+        progress = json.load(f)
+    processed = progress.get("processed_urls", [])
+    records = [{"url": url, "novels": [], "next_page": None} for url in processed]
+    if records:
+        records[0]["novels"] = progress.get("novel_links", [])
+        # Continue after the highest numbered page, as the old resume did
+        last = max(range(len(processed)), key=lambda i: page_number(processed[i]))
+        records[last]["next_page"] = processed[last].rsplit("-", 1)[0] + f"-{page_number(processed[last]) + 1}.html"
+    else:
+        # No page recorded: keep the links and start over from the first page, as the old resume did
+        records = [{"url": None, "novels": progress.get("novel_links", []), "next_page": START_URL}]
+    Checkpoint(PROGRESS_FILE, PROGRESS_LOG_FILE, "url").save(records)
+
 
-def get_soup(url):
-    """Fetches and parses the URL content using BeautifulSoup."""
+def process_url(current_url):
+    """Read one listing page; returns its checkpoint record, or None if it could not be read."""
+    tracker.start(current_url)
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return BeautifulSoup(response.text, "html.parser")
+        page = crawler.page("listing", current_url)
+        if page is None:
+            print(f"Error fetching {current_url}: page not found")
     except requests.RequestException as e:
-        print(f"Error fetching {url}: {e}")
-        return None
-
-
-def extract_novel_links(soup):
-    """Extracts and returns a list of novel links from the parsed page."""
-    links = []
-    if soup is None:
-        return links
-    for a_tag in soup.select('a[href^="/novel/"]'):
-        href = a_tag.get("href")
-        if href not in links:
-            links.append(href)
-    return links
-
-
-def get_next_page(soup):
-    """Finds and returns the URL for the next page, or None if there is no next page."""
-    if soup is None:
-        return None
-    next_page = soup.find("a", string=">")
-    if next_page:
-        return BASE_URL + next_page.get("href")
-    return None
-
-
-def load_progress():
-    """Loads the last saved progress from the progress file."""
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, "r") as f:
-            return json.load(f)
-    return {"processed_urls": [], "novel_links": []}
-
-
-def save_progress(processed_urls, novel_links):
-    """Saves the current progress to a file."""
-    with open(PROGRESS_FILE, "w", encoding="utf-8") as f:
-        json.dump({"processed_urls": list(processed_urls), "novel_links": list(novel_links)}, f)
-
-
-def process_url(current_url, processed_urls, novel_links):
-    """Processes a single URL and updates the progress and links."""
-    if current_url in processed_urls:  # Skip if this URL is already processed
-        return None
-
-    print(f"Processing: {current_url}")
-    soup = get_soup(current_url)
-    if not soup:
+        print(f"Error fetching {current_url}: {e}")
+        page = None
+    if page is None:
+        tracker.incr("errors")
         return None
 
-    page_links = extract_novel_links(soup)
-    
-    # Add the novel links to the set if they are not already present
-    for link in page_links:
-        if link not in novel_links:
-            novel_links.add(link)
-
-    next_page = get_next_page(soup)
-    processed_urls.add(current_url)
-    return next_page
+    return {
+        "url": current_url,
+        "novels": list(dict.fromkeys(href for href in page["novels"] if href)),
+        "next_page": BASE_URL + page["next_page"] if page["next_page"] else None,
+    }
 
 
 def main():
-    progress = load_progress()
-    processed_urls = set(progress.get("processed_urls", []))
-    novel_links = set(progress.get("novel_links", []))
-
-    if processed_urls:
-        max_url = max(processed_urls, key=lambda url: int(url.split("-")[-1].replace(".html", "")) if "-" in url and url.endswith(".html") else 0)
-        next_url_num = int(max_url.split("-")[-1].replace(".html", "")) + 1
-        task_urls = [max_url.rsplit("-", 1)[0] + f"-{next_url_num}.html"]
+    global crawler
+    crawler = Crawler(load_adapter(SITE_ADAPTER), timeout=10, workers=NUM_WORKERS)
+    migrate_progress()
+    checkpoint = Checkpoint(PROGRESS_FILE, PROGRESS_LOG_FILE, "url")
+    checkpoint.compact()
+    records = list(checkpoint)
+    processed_urls = {record["url"] for record in records if record["url"]}
+    novel_links = {link for record in records for link in record["novels"]}
+
+    if records:
+        task_urls = list(dict.fromkeys(
+            record["next_page"] for record in records
+            if record["next_page"] and record["next_page"] not in processed_urls
+        ))
     else:
         task_urls = [START_URL]
-    
-    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
-        while task_urls:
-            future_to_url = {executor.submit(process_url, url, processed_urls, novel_links): url for url in task_urls}
-            task_urls = []  # Reset task URLs
-
-            for future in as_completed(future_to_url):
-                next_page = future.result()
-                if next_page and next_page not in processed_urls:
-                    task_urls.append(next_page)
-            
-            save_progress(processed_urls, novel_links)
+    scheduled = processed_urls | set(task_urls)
+
+    tracker.set_total(len(processed_urls) + len(task_urls), done=len(processed_urls))
+    start_status_server(tracker)
+    reporter = start_reporter(tracker)
+
+    def save_page(url, future):
+        record = future.result()
+        if record is None:
+            return None
+        checkpoint.append(record)
+        processed_urls.add(url)
+        new_links = [link for link in record["novels"] if link not in novel_links]
+        novel_links.update(new_links)
+        tracker.incr("novel_links", len(new_links))
+        tracker.incr("listing_pages")
+        tracker.item_done()
+        next_page = record["next_page"]
+        if next_page and next_page not in scheduled:
+            scheduled.add(next_page)
+            tracker.add_total()
+            return [next_page]
+        return None
+
+    schedule(task_urls, process_url, save_page, workers=NUM_WORKERS)
+    checkpoint.compact()
+
+    reporter.set()
+    print(tracker.summary())
 
     # Save final results
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
@@ -117,4 +127,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
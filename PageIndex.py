@@ -0,0 +1,91 @@
+import json
+import os
+import re
+import time
+
+# Cached page tables, one per image directory, kept next to the directory
+# (a file inside it would change the mtime the cache is checked against)
+PAGE_INDEX_SUFFIX = ".pages.json"
+# Directories changed this recently are scanned but not cached: a file added
+# within the same mtime tick would not change the recorded mtime
+MTIME_SETTLE_SECONDS = 2
+PAGE_NAME_RE = re.compile(r"^(?P<prefix>.*) \((?P<number>\d+)\)(?P<cover>_1)?\.gif$")
+
+
+def page_index_path(image_dir):
+    image_dir = os.path.normpath(image_dir)
+    return os.path.join(os.path.dirname(image_dir), f".{os.path.basename(image_dir)}{PAGE_INDEX_SUFFIX}")
+
+
+def scan_pages(image_dir, prefix=None):
+    """Read "{prefix} ({n}).gif" and "({n})_1.gif" names with one os.scandir pass.
+
+    Returns {"pages": [{"number", "image", "cover"}, ...], "gaps": [...]} with
+    pages sorted by number and file names relative to image_dir. image or
+    cover is None when that file is missing. gaps lists the numbers from 0 to
+    the last page that have no page image.
+    """
+    pages = {}
+    try:
+        with os.scandir(image_dir) as entries:
+            for entry in entries:
+                match = PAGE_NAME_RE.match(entry.name)
+                if not match or (prefix is not None and match["prefix"] != prefix):
+                    continue
+                if not entry.is_file():
+                    continue
+                page = pages.setdefault(
+                    int(match["number"]), {"number": int(match["number"]), "image": None, "cover": None}
+                )
+                page["cover" if match["cover"] else "image"] = entry.name
+    except FileNotFoundError:
+        pass
+
+    numbers = sorted(pages)
+    present = {n for n in numbers if pages[n]["image"]}
+    last = max(present, default=-1)
+    return {
+        "pages": [pages[n] for n in numbers],
+        "gaps": [n for n in range(last + 1) if n not in present],
+    }
+
+
+def load_page_table(image_dir, prefix=None, manifest_path=None):
+    """Page table of image_dir, rescanned only when the directory's mtime changed."""
+    manifest_path = manifest_path or page_index_path(image_dir)
+    try:
+        mtime_ns = os.stat(image_dir).st_mtime_ns
+    except FileNotFoundError:
+        return scan_pages(image_dir, prefix)
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("mtime_ns") == mtime_ns and cached.get("prefix") == prefix:
+            return cached["table"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    table = scan_pages(image_dir, prefix)
+    if time.time_ns() - mtime_ns > MTIME_SETTLE_SECONDS * 1_000_000_000:
+        temp_file = f"{manifest_path}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"mtime_ns": mtime_ns, "prefix": prefix, "table": table}, f)
+        os.replace(temp_file, manifest_path)  # Atomic write
+    return table
+
+
+def report_gaps(table):
+    """Print the page numbers missing from a table, as ranges."""
+    gaps = table["gaps"]
+    if not gaps:
+        return
+    ranges = []
+    start = previous = gaps[0]
+    for n in gaps[1:] + [None]:
+        if n is not None and n == previous + 1:
+            previous = n
+            continue
+        ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = n
+    print(f"Missing {len(gaps)} pages: {', '.join(ranges)}")
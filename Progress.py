@@ -0,0 +1,156 @@
+import html
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUS_PORT = int(os.getenv("STATUS_PORT", "8080"))
+ETA_WINDOW = 50  # Number of recent completions used for the moving-average ETA
+
+
+class ProgressTracker:
+    """Thread-safe counters for a crawl run, readable without touching the results file."""
+
+    def __init__(self, name, total=0, done=0):
+        self.name = name
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.total = total
+        self.done = done
+        self.done_at_start = done
+        self.counters = {}
+        self.recent = deque(maxlen=ETA_WINDOW)
+        self.current = None
+
+    def set_total(self, total, done=None):
+        """Set the number of items in this run, and optionally how many were already done."""
+        with self.lock:
+            self.total = total
+            if done is not None:
+                self.done = done
+                self.done_at_start = done
+
+    def add_total(self, count=1):
+        """Grow the total when work is discovered while crawling."""
+        with self.lock:
+            self.total += count
+
+    def start(self, item):
+        """Record the item currently being worked on."""
+        with self.lock:
+            self.current = item
+
+    def item_done(self):
+        """Mark one item (novel, listing page, ...) as completed."""
+        with self.lock:
+            self.done += 1
+            self.recent.append(time.time())
+
+    def incr(self, counter, count=1):
+        """Increment a named counter such as 'chapters' or 'llm_calls'."""
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + count
+
+    def snapshot(self):
+        """Return the current counters, rates and ETA as a dictionary."""
+        with self.lock:
+            now = time.time()
+            elapsed = max(now - self.started, 1e-9)
+            remaining = max(self.total - self.done, 0)
+
+            # Moving-average rate over the last ETA_WINDOW completions
+            eta = None
+            if len(self.recent) >= 2 and self.recent[-1] > self.recent[0]:
+                rate = (len(self.recent) - 1) / (self.recent[-1] - self.recent[0])
+                eta = remaining / rate
+            elif self.done > self.done_at_start:
+                eta = remaining * elapsed / (self.done - self.done_at_start)
+
+            return {
+                "name": self.name,
+                "done": self.done,
+                "total": self.total,
+                "remaining": remaining,
+                "elapsed_seconds": round(elapsed, 1),
+                "items_per_sec": round((self.done - self.done_at_start) / elapsed, 3),
+                "counters": dict(self.counters),
+                "per_sec": {
+                    key: round(value / elapsed, 3) for key, value in self.counters.items()
+                },
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+                "current": self.current,
+            }
+
+    def summary(self):
+        """Return a one-line human readable progress summary."""
+        snap = self.snapshot()
+        rates = ", ".join(f"{key} {value}/s" for key, value in snap["per_sec"].items())
+        eta = f"{snap['eta_seconds']}s" if snap["eta_seconds"] is not None else "unknown"
+        line = f"[{self.name}] {snap['done']}/{snap['total']} done"
+        if rates:
+            line += f", {rates}"
+        return f"{line}, ETA {eta}"
+
+
+def render_status_html(snap):
+    """Render a snapshot as a small auto-refreshing HTML page."""
+    rows = "".join(
+        f"<tr><td>{html.escape(key)}</td><td>{value}</td><td>{snap['per_sec'].get(key, 0)}/s</td></tr>"
+        for key, value in snap["counters"].items()
+    )
+    eta = f"{snap['eta_seconds']}s" if snap["eta_seconds"] is not None else "unknown"
+    # Names and current items are novel titles and URLs, which may contain < or &
+    name = html.escape(snap["name"])
+    return f"""<html><head><title>{name} progress</title>
+<meta http-equiv="refresh" content="5"></head><body>
+<h1>{name}</h1>
+<p>{snap['done']} / {snap['total']} done ({snap['remaining']} remaining)</p>
+<p>Elapsed {snap['elapsed_seconds']}s, ETA {eta}</p>
+<table><tr><th>Counter</th><th>Total</th><th>Rate</th></tr>{rows}</table>
+<p>Current: {html.escape(str(snap['current'] or ''))}</p>
+</body></html>"""
+
+
+def start_status_server(tracker, port=STATUS_PORT, host="0.0.0.0"):
+    """Serve the tracker on a background thread: HTML at '/', JSON at '/status'."""
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            snap = tracker.snapshot()
+            if self.path.startswith("/status"):
+                body = json.dumps(snap).encode("utf-8")
+                content_type = "application/json"
+            else:
+                body = render_status_html(snap).encode("utf-8")
+                content_type = "text/html; charset=utf-8"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console for crawl output
+
+    try:
+        server = ThreadingHTTPServer((host, port), StatusHandler)
+    except OSError as e:
+        print(f"Status page disabled, could not bind port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Status page at http://localhost:{server.server_address[1]}/ (JSON at /status)")
+    return server
+
+
+def start_reporter(tracker, interval=30):
+    """Print the tracker summary every `interval` seconds on a background thread."""
+    stop = threading.Event()
+
+    def report():
+        while not stop.wait(interval):
+            print(tracker.summary())
+
+    threading.Thread(target=report, daemon=True).start()
+    return stop
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from Storage import SqliteStore, hash_values
+
+RESULT_STORE_FILE = os.getenv("RESULT_STORE_FILE", os.path.join(os.getcwd(), "results.sqlite"))
+# Least recently used results are evicted once the stored JSON is larger than this,
+# and results unused for RESULT_MAX_AGE_DAYS are evicted whatever the size
+RESULT_STORE_MAX_BYTES = int(float(os.getenv("RESULT_STORE_MAX_MB", "512")) * 1024 * 1024)
+RESULT_MAX_AGE = float(os.getenv("RESULT_MAX_AGE_DAYS", "90")) * 86400
+
+
+class ResultStore(SqliteStore):
+    """SQLite store of API results as JSON, keyed by the hash of the media they came from and the API config.
+
+    Also records which content every gs:// URI holds, so files are uploaded
+    again only when their bytes change. With force=True nothing is read from
+    the store, but new results and uploads are still written to it.
+    """
+
+    def __init__(self, path=RESULT_STORE_FILE, max_bytes=RESULT_STORE_MAX_BYTES, max_age=RESULT_MAX_AGE, force=False):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.force = force
+        self.lock = threading.Lock()
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    result_key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    digest TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS uploads (uri TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+        self.evict()
+
+    def file_hash(self, path):
+        """SHA-256 of a file, reusing the recorded value while its size and mtime match."""
+        stat = os.stat(path)
+        conn = self.connect()
+        row = conn.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest.hexdigest()),
+            )
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(kind, content_hash, config):
+        """Key of the result of running `kind` with config on the media hashed to content_hash."""
+        return hash_values(kind, content_hash, config)
+
+    def get(self, result_key):
+        """The stored result, or None if there is none (or force is set)."""
+        if self.force:
+            return None
+        conn = self.connect()
+        row = conn.execute("SELECT result FROM results WHERE result_key = ?", (result_key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE results SET used = ? WHERE result_key = ?", (time.time(), result_key))
+        return json.loads(row[0])
+
+    def put(self, result_key, kind, result):
+        """Save a JSON-serialisable result, then evict what no longer fits."""
+        text = json.dumps(result)
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (result_key, kind, result, size, used) VALUES (?, ?, ?, ?, ?)",
+                (result_key, kind, text, len(text), time.time()),
+            )
+        self.evict()
+
+    def evict(self):
+        """Drop results unused for max_age, then the least recently used until they fit in max_bytes."""
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                conn.execute("DELETE FROM results WHERE used < ?", (time.time() - self.max_age,))
+                (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+                if total <= self.max_bytes:
+                    return
+                evicted = []
+                for result_key, size in conn.execute("SELECT result_key, size FROM results ORDER BY used"):
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((result_key,))
+                    total -= size
+                conn.executemany("DELETE FROM results WHERE result_key = ?", evicted)
+
+    def uploaded(self, uri):
+        """Content hash last uploaded to a gs:// URI, or None (always None with force)."""
+        if self.force:
+            return None
+        row = self.connect().execute("SELECT digest FROM uploads WHERE uri = ?", (uri,)).fetchone()
+        return row[0] if row else None
+
+    def record_upload(self, uri, digest):
+        conn = self.connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO uploads (uri, digest) VALUES (?, ?)", (uri, digest))
+
+    def __len__(self):
+        (count,) = self.connect().execute("SELECT COUNT(*) FROM results").fetchone()
+        return count
@@ -0,0 +1,77 @@
+import json
+
+# What the crawlers read from each kind of page, as selectors instead of code.
+# "pages" maps a page kind to its fields; a field is a selector spec, or a list
+# of specs whose values are joined (see Crawl.extract):
+#   css       CSS selector of the elements
+#   within    only search the first element matching this selector
+#   from      read the value from each element's first descendant matching
+#             this selector (None where there is none)
+#   get       "text" (stripped text), "content" (text with spaces between
+#             blocks), "background-image" (the //URL in an inline style), or
+#             the name of an attribute, read from the element or else (without
+#             "from") from its first descendant that has it
+#   text      only elements whose own string is exactly this
+#   contains  only values containing one of these strings; {name} is filled
+#             from the settings the crawler is given
+#   pick      "first" (default), "last" or "all"
+# "missing_status" lists the HTTP statuses that mean the page does not exist,
+# and "cache" the page kinds whose fields may be kept by the page cache.
+NOVEL_SITE = {
+    "pages": {
+        "listing": {
+            "novels": {"css": 'a[href^="/novel/"]', "get": "href", "pick": "all"},
+            "next_page": {"css": "a", "text": ">", "get": "href"},
+        },
+        "novel": {
+            "title": {"css": "h1.novel-title.text2row", "get": "text"},
+            "categories": {"css": "div.categories ul li", "get": "text", "pick": "all"},
+            "tags": {"css": "div.tags ul.content li", "get": "text", "pick": "all"},
+            # One value per <li> of the first list, so CHAPTER_LIMIT counts list items
+            "chapters": {
+                "within": "#chpagedlist ul.chapter-list",
+                "css": "li",
+                "from": "a",
+                "get": "href",
+                "pick": "all",
+            },
+        },
+        "chapter": {
+            "content": {"css": "div.chapter-content", "get": "content"},
+        },
+    },
+    "missing_status": [403, 404],
+    "cache": ["novel", "chapter"],
+}
+
+COMIC_SITE = {
+    "pages": {
+        "image": {
+            "images": [
+                {"css": "img[src]", "get": "src", "contains": ["{image_prefix}"], "pick": "all"},
+                {
+                    "css": '[style*="background-image"]',
+                    "get": "background-image",
+                    "contains": ["{image_prefix}", "{website}"],
+                    "pick": "all",
+                },
+            ],
+            "cover": {"css": "img[src]", "get": "src", "contains": ["{website}"], "pick": "last"},
+        },
+    },
+    "missing_status": [404],
+    "cache": [],
+}
+
+ADAPTERS = {
+    "novel": NOVEL_SITE,
+    "comic": COMIC_SITE,
+}
+
+
+def load_adapter(name):
+    """Return a built-in adapter by name, or read one from a JSON file with the same shape."""
+    if name in ADAPTERS:
+        return ADAPTERS[name]
+    with open(name, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,31 @@
+import hashlib
+import json
+import sqlite3
+import threading
+
+
+def hash_values(*values):
+    """Stable hash of JSON-serialisable values."""
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SqliteStore:
+    """Base of the SQLite-backed stores: gives each thread its own connection to path.
+
+    sqlite3 connections are not shared across threads. Subclasses that manage
+    transactions themselves set isolation_level to None (autocommit).
+    """
+
+    isolation_level = ""  # sqlite3's default: implicit transactions around writes
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connect(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=self.isolation_level)
+            self.local.conn = conn
+        return conn
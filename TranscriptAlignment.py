@@ -0,0 +1,166 @@
+import re
+
+# Seconds a sentence may start before or end after a label's segment and still describe it
+ALIGN_WINDOW = 5.0
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+NO_DESCRIPTION = "No relevant description found."
+
+
+def tokenize(text):
+    """Lowercase word tokens, with plural and possessive endings removed."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token.endswith("'s"):
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def timed_sentences(sentences, words):
+    """Give each sentence the start and end time of its words.
+
+    words are the transcript's words in order ({"word", "start_time",
+    "end_time"}), as returned by the transcription backends. When the words
+    do not line up with the sentences (or there are none), sentences get
+    None times and are matched by text alone.
+    """
+    counts = [len(sentence.split()) for sentence in sentences]
+    if not words or sum(counts) != len(words):
+        return [(sentence, None, None) for sentence in sentences]
+    timed = []
+    position = 0
+    for sentence, count in zip(sentences, counts):
+        if count == 0:
+            timed.append((sentence, None, None))
+            continue
+        first, last = words[position], words[position + count - 1]
+        timed.append((sentence, first["start_time"], last["end_time"]))
+        position += count
+    return timed
+
+
+class IntervalTree:
+    """Static interval tree: intervals sorted by start, with the largest end of every subtree.
+
+    The tree is an implicit balanced binary tree over the sorted array, so
+    an overlap query visits O(log n + matches) nodes.
+    """
+
+    def __init__(self, intervals):
+        # intervals: (start, end, value)
+        self.intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self.max_end = [0.0] * len(self.intervals)
+        if self.intervals:
+            self.build(0, len(self.intervals) - 1)
+
+    def build(self, low, high):
+        middle = (low + high) // 2
+        largest = self.intervals[middle][1]
+        if low < middle:
+            largest = max(largest, self.build(low, middle - 1))
+        if middle < high:
+            largest = max(largest, self.build(middle + 1, high))
+        self.max_end[middle] = largest
+        return largest
+
+    def overlapping(self, start, end):
+        """Values of the intervals that overlap [start, end], in start order."""
+        found = []
+        stack = [(0, len(self.intervals) - 1)]
+        while stack:
+            low, high = stack.pop()
+            if low > high:
+                continue
+            middle = (low + high) // 2
+            if self.max_end[middle] < start:
+                continue  # Everything in this subtree ends too early
+            interval_start, interval_end, value = self.intervals[middle]
+            if interval_start <= end:
+                # Right subtree starts later; it can only overlap if this node starts in time
+                stack.append((middle + 1, high))
+                if interval_end >= start:
+                    found.append((interval_start, value))
+            stack.append((low, middle - 1))
+        found.sort(key=lambda item: item[0])
+        return [value for _, value in found]
+
+
+class TokenIndex:
+    """Inverted index over sentence tokens for finding the sentences that name a label."""
+
+    def __init__(self, sentences):
+        self.postings = {}  # token -> ids of the sentences containing it, in order
+        self.phrases = []  # Each sentence's tokens, padded for whole-phrase checks
+        for i, (text, _, _) in enumerate(sentences):
+            tokens = tokenize(text)
+            self.phrases.append(f" {' '.join(tokens)} ")
+            for token in set(tokens):
+                self.postings.setdefault(token, []).append(i)
+
+    def mentions(self, description):
+        """Ids of the sentences that contain description's tokens as a phrase."""
+        tokens = tokenize(description)
+        postings = sorted((self.postings.get(token, []) for token in tokens), key=len)
+        if not postings:
+            return []
+        found = set(postings[0])
+        for posting in postings[1:]:
+            found.intersection_update(posting)
+            if not found:
+                return []
+        phrase = f" {' '.join(tokens)} "
+        return sorted(i for i in found if phrase in self.phrases[i])
+
+
+def align_steps(sentences, video_analysis, window=ALIGN_WINDOW):
+    """Turn video labels into steps described by the sentences spoken around them.
+
+    sentences are (text, start, end) from timed_sentences. Label and object
+    segments go into an interval tree; every timed sentence is joined to the
+    labels on screen while it is spoken, and an inverted index over sentence
+    tokens finds the sentences that name a label. A label is described by
+    the first sentence that both names it and is spoken while it is on
+    screen, else the mention closest in time, else the first sentence
+    spoken while it is on screen.
+    """
+    labels = video_analysis["labels"]
+    by_name = {}
+    intervals = []
+    for i, label in enumerate(labels):
+        by_name.setdefault(label["description"].lower(), []).append(i)
+        intervals.append((label["start_time"] - window, label["end_time"] + window, i))
+    # Tracked objects show where a labelled thing is on screen beyond its label segment
+    for obj in video_analysis.get("objects", []):
+        for i in by_name.get(obj["entity"].lower(), []):
+            intervals.append((obj["start_time"] - window, obj["end_time"] + window, i))
+    tree = IntervalTree(intervals)
+
+    on_screen = [[] for _ in labels]
+    for s, (_, start, end) in enumerate(sentences):
+        if start is None:
+            continue
+        for i in tree.overlapping(start, end):
+            if not on_screen[i] or on_screen[i][-1] != s:
+                on_screen[i].append(s)
+
+    index = TokenIndex(sentences)
+    starts = [start if start is not None else float("inf") for _, start, _ in sentences]
+    steps = []
+    for i, label in enumerate(labels):
+        named = index.mentions(label["description"])
+        overlapping = set(on_screen[i])
+        chosen = next((s for s in named if s in overlapping), None)
+        if chosen is None and named:
+            # The mention closest to the label's start; the first one if none are timed
+            chosen = min(named, key=lambda s: abs(starts[s] - label["start_time"]))
+        if chosen is None and on_screen[i]:
+            chosen = on_screen[i][0]
+        steps.append({
+            "action": label["description"],
+            "start_time": label["start_time"],
+            "end_time": label["end_time"],
+            "description": [sentences[chosen][0]] if chosen is not None else NO_DESCRIPTION,
+        })
+    return steps
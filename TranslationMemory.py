@@ -0,0 +1,54 @@
+import os
+
+from Storage import SqliteStore
+
+TRANSLATION_MEMORY_FILE = os.getenv(
+    "TRANSLATION_MEMORY_FILE", os.path.join(os.getcwd(), "translation_memory.sqlite")
+)
+
+
+class TranslationMemory(SqliteStore):
+    """Persistent cache of translated segments keyed by source text and target language."""
+
+    def __init__(self, path=TRANSLATION_MEMORY_FILE):
+        super().__init__(path)
+        self.connect().execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                translated TEXT NOT NULL,
+                PRIMARY KEY (source, target_language)
+            )
+            """
+        )
+
+    def lookup(self, sources, target_language):
+        """Return {source: translation} for the sources already in the memory."""
+        conn = self.connect()
+        found = {}
+        sources = list(sources)
+        # Stay under SQLite's limit on bound parameters
+        for i in range(0, len(sources), 500):
+            chunk = sources[i : i + 500]
+            rows = conn.execute(
+                "SELECT source, translated FROM translations WHERE target_language = ?"
+                f" AND source IN ({', '.join('?' * len(chunk))})",
+                [target_language, *chunk],
+            )
+            found.update(rows.fetchall())
+        return found
+
+    def store(self, translations, target_language):
+        """Save {source: translation} pairs."""
+        conn = self.connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations (source, target_language, translated)"
+                " VALUES (?, ?, ?)",
+                [(source, target_language, text) for source, text in translations.items()],
+            )
+
+    def __len__(self):
+        (count,) = self.connect().execute("SELECT COUNT(*) FROM translations").fetchone()
+        return count
@@ -1,44 +1,114 @@
+import argparse
+import json
 import os
-from googleapiclient.discovery import build
-from google.cloud import speech, storage, videointelligence
-from pydub import AudioSegment
 import subprocess
-from nltk.tokenize import sent_tokenize
-import nltk
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import re
+from ResultStore import ResultStore
+from TranscriptAlignment import align_steps, timed_sentences
+import YouTubeMetadata
 
-nltk.download("punkt")
-nltk.download("punkt_tab")
+# The Google client libraries and nltk are imported inside the functions that
+# use them: together they add seconds of start-up before any work is known.
 
 # Load the environment variables
 load_dotenv()
 
 # YouTube API setup
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+youtube = threading.local()  # googleapiclient clients are not thread-safe, so one per thread
+GCS_BUCKET = os.getenv("GCS_BUCKET", "bucket-for-video-analysis-viransh")
+# Videos in progress at the same time, and how many may be in each stage at once.
+# Transcription and annotation are long-running operations that mostly wait on
+# Google, so many can be in flight; downloads and audio extraction use the
+# local network and CPU.
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "4"))
+# Audio is sent at the rate Speech-to-Text models are trained on; more only adds bytes
+AUDIO_SAMPLE_RATE = 16000
+# LINEAR16 (WAV), FLAC (lossless, about half the bytes) or OGG_OPUS (lossy, about a twentieth)
+AUDIO_ENCODING = os.getenv("AUDIO_ENCODING", "LINEAR16")
+AUDIO_CODECS = {
+    "LINEAR16": (["-c:a", "pcm_s16le"], ".wav"),
+    "FLAC": (["-c:a", "flac"], ".flac"),
+    "OGG_OPUS": (["-c:a", "libopus", "-b:a", "24k"], ".ogg"),
+}
+# Audio longer than this is cut into segments that are transcribed in parallel; 0 keeps one file
+SEGMENT_SECONDS = int(os.getenv("SEGMENT_SECONDS", "600"))
+# "google" uploads segments to Speech-to-Text; "pocketsphinx" and "vosk" run on local CPUs
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "google")
+STT_PROCESSES = int(os.getenv("STT_PROCESSES", str(os.cpu_count() or 1)))
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", os.path.join("models", "vosk-model-small-en-us-0.15"))
+TRANSCRIBE_LANGUAGE = "en-US"
+ANALYSIS_FEATURES = ("OBJECT_TRACKING", "LABEL_DETECTION")
+STAGE_CONCURRENCY = {
+    stage: int(os.getenv(f"{stage.upper()}_WORKERS", default))
+    for stage, default in (
+        ("download", "2"),
+        ("extract", "2"),
+        ("upload", "4"),
+        ("transcribe", "4"),
+        ("analyze", "4"),
+    )
+}
+
+
+def get_youtube():
+    """Build this thread's YouTube API client on first use."""
+    if getattr(youtube, "client", None) is None:
+        from googleapiclient.discovery import build
+
+        youtube.client = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    return youtube.client
+
+
+def ensure_nltk_data():
+    """Download the sentence tokenizer data only if it is not installed yet."""
+    import nltk
+
+    for package in ("punkt", "punkt_tab"):
+        try:
+            nltk.data.find(f"tokenizers/{package}")
+        except LookupError:
+            nltk.download(package)
 
 
 # Google Cloud Storage setup
-def upload_to_gcs(bucket_name, source_file_name, blob_name):
-    client = storage.Client()
+def upload_to_gcs(bucket_name, source_file_name, blob_name, client=None, store=None):
+    """Upload a file and return its gs:// URI.
+
+    With a ResultStore the upload is skipped, without a request, when the
+    blob was last uploaded from the same content; a file that changed under
+    the same name is uploaded again. Without one, any existing blob of that
+    name is kept.
+    """
+    gcs_uri = f"gs://{bucket_name}/{blob_name}"
+    digest = store.file_hash(source_file_name) if store is not None else None
+    if digest and store.uploaded(gcs_uri) == digest:
+        return gcs_uri
+    if client is None:
+        from google.cloud import storage
+
+        client = storage.Client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_name)
-    if blob.exists():
-        return f"gs://{bucket_name}/{blob_name}"
+    if store is None and blob.exists():
+        return gcs_uri
     blob.upload_from_filename(source_file_name)
     print(f"File {source_file_name} uploaded to {blob_name}.")
-    return f"gs://{bucket_name}/{blob_name}"
+    if store is not None:
+        store.record_upload(gcs_uri, digest)
+    return gcs_uri
 
 
 # Fetch details of YouTube videos
-def fetch_video_details(video_ids):
-    request = youtube.videos().list(part="snippet", id=",".join(video_ids))
-    response = request.execute()
-    return [
-        {"title": item["snippet"]["title"], "video_id": item["id"]}
-        for item in response.get("items", [])
-    ]
+def fetch_video_details(video_ids, client=None, cache=None):
+    """Titles of any number of videos, batched 50 per request and cached (see YouTubeMetadata)."""
+    client_factory = (lambda: client) if client is not None else get_youtube
+    return YouTubeMetadata.fetch_video_details(video_ids, client_factory, cache)
 
 
 # Download video using youtube-dl
@@ -55,23 +125,57 @@ def download_video(video_url, output_path):
 
 
 # Convert video to audio for transcription
-def extract_audio(video_path, audio_path):
+def extract_audio(video_path, audio_path, encoding=AUDIO_ENCODING, segment_seconds=SEGMENT_SECONDS):
+    """Extract 16 kHz mono audio with ffmpeg, cut into segments for parallel transcription.
+
+    ffmpeg decodes and resamples the audio track as a stream, so memory use
+    does not grow with the video's length. Segments are written next to
+    audio_path as <name>_000<ext>, <name>_001<ext>, ... with the extension of
+    the encoding. Returns [(segment path, start offset in seconds), ...], or
+    None if ffmpeg failed.
+    """
+    codec, extension = AUDIO_CODECS[encoding]
+    base = os.path.splitext(audio_path)[0]
+    command = ["ffmpeg", "-y", "-v", "error", "-i", video_path, "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), *codec]
     try:
-        video = AudioSegment.from_file(video_path)
-        mono_audio = video.set_channels(1).set_sample_width(2)
-        mono_audio.export(audio_path, format="wav")
-        return audio_path
+        if not segment_seconds:
+            output_path = base + extension
+            subprocess.run([*command, output_path], check=True)
+            return [(output_path, 0.0)]
+
+        # The segment list records where each segment really starts
+        segment_list = f"{base}_segments.csv"
+        subprocess.run(
+            [
+                *command, "-f", "segment", "-segment_time", str(segment_seconds),
+                "-reset_timestamps", "1", "-segment_list", segment_list, "-segment_list_type", "csv",
+                f"{base}_%03d{extension}",
+            ],
+            check=True,
+        )
+        segments = []
+        with open(segment_list, "r", encoding="utf-8") as f:
+            for line in f:
+                name, start, _ = line.strip().rsplit(",", 2)
+                segments.append((os.path.join(os.path.dirname(base), os.path.basename(name)), float(start)))
+        return segments
     except Exception as e:
         print(f"Error extracting audio: {e}")
         return None
 
 
 # Transcribe audio using Google Speech-to-Text API
-def transcribe_audio(gcs_uri):
-    client = speech.SpeechClient()
+def transcribe_audio(gcs_uri, client=None, encoding=AUDIO_ENCODING, sample_rate=AUDIO_SAMPLE_RATE):
+    """Transcribe one audio file: {"transcript": text, "words": [{"word", "start_time", "end_time"}]}."""
+    from google.cloud import speech
+
+    client = client or speech.SpeechClient()
     audio = speech.RecognitionAudio(uri=gcs_uri)
     config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16, language_code="en-US"
+        encoding=speech.RecognitionConfig.AudioEncoding[encoding],
+        sample_rate_hertz=sample_rate,
+        language_code=TRANSCRIBE_LANGUAGE,
+        enable_word_time_offsets=True,
     )
     operation = client.long_running_recognize(config=config, audio=audio)
     print("Waiting for operation to complete...")
@@ -80,18 +184,200 @@ def transcribe_audio(gcs_uri):
     transcription = " ".join(
         [result.alternatives[0].transcript for result in response.results]
     )
-    return transcription
+    words = [
+        {
+            "word": word.word,
+            "start_time": word.start_time.total_seconds(),
+            "end_time": word.end_time.total_seconds(),
+        }
+        for result in response.results
+        for word in result.alternatives[0].words
+    ]
+    return {"transcript": transcription, "words": words}
+
+
+def stitch_transcripts(parts, offsets):
+    """Join segment transcripts, moving each segment's word times by its start offset."""
+    words = []
+    for part, offset in zip(parts, offsets):
+        words += [
+            {
+                **word,
+                "start_time": round(word["start_time"] + offset, 3),
+                "end_time": round(word["end_time"] + offset, 3),
+            }
+            for word in part["words"]
+        ]
+    transcript = " ".join(part["transcript"] for part in parts if part["transcript"])
+    return {"transcript": transcript, "words": words}
+
+
+def transcribe_segments(segments, transcribe_segment, max_workers=STAGE_CONCURRENCY["transcribe"]):
+    """Transcribe (path, offset) segments in parallel and stitch them into one transcript."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parts = list(executor.map(lambda segment: transcribe_segment(segment[0]), segments))
+    return stitch_transcripts(parts, [offset for _, offset in segments])
+
+
+def google_transcribe(
+    segments, storage_client=None, speech_client=None, bucket_name=GCS_BUCKET, run_stage=None, store=None
+):
+    """Transcription backend using Speech-to-Text: segments are uploaded and recognized in parallel.
+
+    run_stage(stage, function, *args) wraps the "upload" and "transcribe"
+    calls, so the scheduler can apply its per-stage limits. store is the
+    ResultStore that lets unchanged segments skip their upload.
+    """
+    run_stage = run_stage or (lambda stage, function, *args: function(*args))
+
+    def transcribe_segment(segment_path):
+        gcs_uri = run_stage(
+            "upload", upload_to_gcs, bucket_name, segment_path, os.path.basename(segment_path),
+            storage_client, store,
+        )
+        return run_stage("transcribe", transcribe_audio, gcs_uri, speech_client)
+
+    return transcribe_segments(segments, transcribe_segment)
+
+
+# Models loaded by this process; a pool worker loads each one once and keeps it for every segment
+stt_models = {}
+stt_pool = None
+
+
+def get_stt_pool(processes=STT_PROCESSES):
+    """Process pool shared by the local transcription of every video, started on first use."""
+    global stt_pool
+    if stt_pool is None:
+        stt_pool = ProcessPoolExecutor(max_workers=processes)
+    return stt_pool
+
+
+def read_pcm(path, frame_bytes):
+    """Yield frame_bytes-sized chunks of 16-bit mono PCM from a WAV segment."""
+    with wave.open(path, "rb") as f:
+        if f.getnchannels() != 1 or f.getsampwidth() != 2 or f.getframerate() != AUDIO_SAMPLE_RATE:
+            raise ValueError(f"{path} is not 16-bit mono audio at {AUDIO_SAMPLE_RATE} Hz")
+        while True:
+            data = f.readframes(frame_bytes // 2)
+            if not data:
+                return
+            yield data
+
+
+def pocketsphinx_transcribe_file(path):
+    """Transcribe one WAV segment with PocketSphinx and the English model bundled with it.
+
+    Voice activity detection splits the audio into utterances, which are
+    decoded one at a time.
+    """
+    from pocketsphinx import Decoder, Endpointer
+
+    decoder = stt_models.get("pocketsphinx")
+    if decoder is None:
+        decoder = stt_models["pocketsphinx"] = Decoder(samprate=AUDIO_SAMPLE_RATE, loglevel="FATAL")
+    else:
+        # Forget the previous segment's feature normalization, so results do not depend on order
+        decoder.reinit_feat()
+    frame_rate = decoder.config["frate"]
+    endpointer = Endpointer(sample_rate=AUDIO_SAMPLE_RATE)
+
+    texts, words = [], []
+    utterance_start = 0.0
+
+    def end_utterance():
+        decoder.end_utt()
+        if decoder.hyp() is not None and decoder.hyp().hypstr:
+            texts.append(decoder.hyp().hypstr)
+        for segment in decoder.seg():
+            # Skip silences, fillers and sentence markers; "word(2)" is an alternate pronunciation
+            if segment.word.startswith(("<", "[")):
+                continue
+            words.append({
+                "word": segment.word.split("(")[0],
+                "start_time": round(utterance_start + segment.start_frame / frame_rate, 3),
+                "end_time": round(utterance_start + (segment.end_frame + 1) / frame_rate, 3),
+            })
+
+    for frame in read_pcm(path, endpointer.frame_bytes):
+        was_in_speech = endpointer.in_speech
+        if len(frame) < endpointer.frame_bytes:
+            speech = endpointer.end_stream(frame)
+        else:
+            speech = endpointer.process(frame)
+        if speech is None:
+            continue
+        if not was_in_speech:
+            utterance_start = endpointer.speech_start
+            decoder.start_utt()
+        decoder.process_raw(speech)
+        if not endpointer.in_speech:
+            end_utterance()
+    if endpointer.in_speech:  # The segment ended mid-utterance
+        end_utterance()
+    return {"transcript": " ".join(texts), "words": words}
+
+
+def vosk_transcribe_file(path, model_path=VOSK_MODEL_PATH):
+    """Transcribe one WAV segment with a Vosk (Kaldi) model from model_path."""
+    from vosk import KaldiRecognizer, Model, SetLogLevel
+
+    model = stt_models.get(("vosk", model_path))
+    if model is None:
+        SetLogLevel(-1)
+        model = stt_models[("vosk", model_path)] = Model(model_path)
+    recognizer = KaldiRecognizer(model, AUDIO_SAMPLE_RATE)
+    recognizer.SetWords(True)
+
+    results = []
+    for data in read_pcm(path, 8000):
+        if recognizer.AcceptWaveform(data):
+            results.append(json.loads(recognizer.Result()))
+    results.append(json.loads(recognizer.FinalResult()))
+    words = [
+        {"word": word["word"], "start_time": round(word["start"], 3), "end_time": round(word["end"], 3)}
+        for result in results
+        for word in result.get("result", [])
+    ]
+    return {"transcript": " ".join(result["text"] for result in results if result.get("text")), "words": words}
+
+
+def local_transcribe(segments, transcribe_file, executor=None, **options):
+    """Transcribe (path, offset) WAV segments across a process pool and stitch them.
+
+    Nothing is uploaded, so long videos and bulk backfills do not depend on
+    the Speech-to-Text operation timeout.
+    """
+    executor = executor or get_stt_pool()
+    futures = [executor.submit(transcribe_file, path, **options) for path, _ in segments]
+    return stitch_transcripts([future.result() for future in futures], [offset for _, offset in segments])
+
+
+def pocketsphinx_transcribe(segments, executor=None):
+    """Local transcription backend using PocketSphinx."""
+    return local_transcribe(segments, pocketsphinx_transcribe_file, executor)
+
+
+def vosk_transcribe(segments, model_path=VOSK_MODEL_PATH, executor=None):
+    """Local transcription backend using Vosk."""
+    return local_transcribe(segments, vosk_transcribe_file, executor, model_path=model_path)
+
+
+TRANSCRIBE_BACKENDS = {
+    "google": google_transcribe,
+    "pocketsphinx": pocketsphinx_transcribe,
+    "vosk": vosk_transcribe,
+}
 
 
 # Analyze video using Google Video Intelligence API
-def analyze_video(gcs_uri):
-    client = videointelligence.VideoIntelligenceServiceClient()
+def analyze_video(gcs_uri, client=None):
+    from google.cloud import videointelligence
+
+    client = client or videointelligence.VideoIntelligenceServiceClient()
 
     # Specify the features to analyze
-    features = [
-        videointelligence.Feature.OBJECT_TRACKING,
-        videointelligence.Feature.LABEL_DETECTION,
-    ]
+    features = [videointelligence.Feature[feature] for feature in ANALYSIS_FEATURES]
 
     # Start video annotation
     operation = client.annotate_video(
@@ -133,85 +419,230 @@ def analyze_video(gcs_uri):
 
 # Combine transcription and video analysis
 def combine_results(transcription, video_analysis):
-    sentences = sent_tokenize(transcription)
-    steps = []
-    for label in video_analysis["labels"]:
-        step = {
-            "action": label["description"],
-            "start_time": label["start_time"],
-            "end_time": label["end_time"],
-        }
-        relevant_sentences = [
-            s for s in sentences if label["description"].lower() in s.lower()
-        ]
-        step["description"] = (
-            relevant_sentences[:1]
-            if relevant_sentences
-            else "No relevant description found."
-        )
-        steps.append(step)
+    """Describe each video label with the sentence spoken about it (see TranscriptAlignment)."""
+    from nltk.tokenize import sent_tokenize
+
+    ensure_nltk_data()
+    words = []
+    if isinstance(transcription, dict):
+        transcription, words = transcription["transcript"], transcription["words"]
+    sentences = timed_sentences(sent_tokenize(transcription), words)
+    return align_steps(sentences, video_analysis)
 
-    return steps
 
 def sanitize_filename(filename):
     # Replace invalid characters with an underscore
     return re.sub(r'[<>:"/\\|?*]', '_', filename)
 
 
-# Main function
-def main():
-    # Replace with actual video IDs
-    video_ids = [os.getenv(f"YOUTUBE_ID_{i}") for i in range(1, 4)]
-    video_details = fetch_video_details(video_ids)
+def steps_path(video):
+    return f"Steps/{sanitize_filename(video['title'])}.txt"
 
-    print("Fetched video details:")
-    for video in video_details:
-        print(f"{video['title']}")
 
-    for video in video_details:
-        video_url = f"https://www.youtube.com/watch?v={video['video_id']}"
-        output_dir = "Videos"
-        video_path = f"{output_dir}/{video['video_id']}.mkv"
-        audio_path = f"{output_dir}/{video['video_id']}.wav"
-
-        print(f"Downloading video: {video['title']}")
-        downloaded_path = download_video(video_url, video_path)
-
-        if downloaded_path:
-            print(f"Extracting audio from video: {video['title']}")
-            extracted_audio = extract_audio(downloaded_path, audio_path)
-
-            print(f"Uploading audio to Google Cloud Storage: {video['title']}")
-            gcs_uri_audio = upload_to_gcs(
-                "bucket-for-video-analysis-viransh",
-                extracted_audio,
-                f"{video['video_id']}.wav",
+def write_steps(video, steps):
+    """Write the steps of a video to Steps/<title>.txt."""
+    os.makedirs("Steps", exist_ok=True)
+    with open(steps_path(video), "w+") as f:
+        f.write(f"Steps for '{video['title']}':\n")
+        for step in steps:
+            f.write(
+                f"- Action: {step['action']} (Time: {step['start_time']}s to {step['end_time']}s)\n"
             )
+            f.write(f"  Description: {step['description']}\n")
+
+
+class StageLimits:
+    """Per-stage semaphores that also record how long each stage took."""
+
+    def __init__(self, concurrency=None):
+        concurrency = {**STAGE_CONCURRENCY, **(concurrency or {})}
+        self.semaphores = {stage: threading.BoundedSemaphore(n) for stage, n in concurrency.items()}
+        self.lock = threading.Lock()
+        self.timings = []  # (video id, stage, start, end) in time.monotonic() seconds
+
+    def run(self, stage, video, function, *args):
+        with self.semaphores[stage]:
+            started = time.monotonic()
+            try:
+                return function(*args)
+            finally:
+                with self.lock:
+                    self.timings.append((video["video_id"], stage, started, time.monotonic()))
+
+
+def transcription_config(backend):
+    """Settings that change a transcript, so they are part of its ResultStore key."""
+    config = {"backend": backend, "sample_rate": AUDIO_SAMPLE_RATE, "segment_seconds": SEGMENT_SECONDS}
+    if backend == "google":
+        config.update(encoding=AUDIO_ENCODING, language=TRANSCRIBE_LANGUAGE)
+    elif backend == "vosk":
+        config["model"] = VOSK_MODEL_PATH
+    return config
+
+
+def analysis_config():
+    return {"features": list(ANALYSIS_FEATURES)}
+
+
+def process_video(video, limits, branches, clients, backend=TRANSCRIBE_BACKEND, store=None):
+    """Download one video, then transcribe and annotate it in parallel and combine the results.
+
+    Transcripts and annotations already in the store for the same video
+    content and config are reused, so only combine_results runs again.
+    """
+    if store is None:
+        store = ResultStore()
+    video_url = f"https://www.youtube.com/watch?v={video['video_id']}"
+    output_dir = "Videos"
+    video_path = f"{output_dir}/{video['video_id']}.mkv"
+    audio_path = f"{output_dir}/{video['video_id']}.wav"
+
+    print(f"Downloading video: {video['title']}")
+    downloaded_path = limits.run("download", video, download_video, video_url, video_path)
+    if not downloaded_path:
+        return None
+    video_hash = store.file_hash(downloaded_path)
+
+    def stored(kind, config, compute):
+        key = store.key(kind, video_hash, config)
+        result = store.get(key)
+        if result is not None:
+            print(f"Using stored {kind}: {video['title']}")
+            return result
+        result = compute()
+        if result is not None:
+            store.put(key, kind, result)
+        return result
+
+    def transcription_branch():
+        print(f"Extracting audio from video: {video['title']}")
+        # Local engines read WAV; only uploads benefit from a smaller encoding
+        encoding = AUDIO_ENCODING if backend == "google" else "LINEAR16"
+        segments = limits.run("extract", video, extract_audio, downloaded_path, audio_path, encoding)
+        if not segments:
+            return None
+
+        print(f"Transcribing {len(segments)} audio segments with {backend}: {video['title']}")
+        if backend == "google":
+            return google_transcribe(
+                segments, clients.get("storage"), clients.get("speech"),
+                run_stage=lambda stage, function, *args: limits.run(stage, video, function, *args),
+                store=store,
+            )
+        return limits.run("transcribe", video, TRANSCRIBE_BACKENDS[backend], segments)
 
-            print(f"Transcribing audio: {video['title']}")
-            transcription = transcribe_audio(gcs_uri_audio)
+    def analysis_branch():
+        print(f"Uploading Video to Google Cloud Storage: {video['title']}")
+        gcs_uri_video = limits.run(
+            "upload", video, upload_to_gcs, GCS_BUCKET, downloaded_path,
+            f"{video['video_id']}.mkv", clients.get("storage"), store,
+        )
+        print(f"Analyzing video: {video['title']}")
+        return limits.run("analyze", video, analyze_video, gcs_uri_video, clients.get("video"))
+
+    # The two long-running operations wait on Google side by side
+    transcription_future = branches.submit(stored, "transcription", transcription_config(backend), transcription_branch)
+    analysis_future = branches.submit(stored, "annotation", analysis_config(), analysis_branch)
+    transcription = transcription_future.result()
+    video_analysis = analysis_future.result()
+    if transcription is None:
+        return None
+
+    print(f"Combining results for: {video['title']}")
+    steps = combine_results(transcription, video_analysis)
+    write_steps(video, steps)
+    return steps
+
+
+def process_videos(
+    video_details, video_workers=VIDEO_WORKERS, concurrency=None, clients=None, backend=TRANSCRIBE_BACKEND,
+    skip_existing=True, store=None,
+):
+    """Run several videos through the pipeline at once.
+
+    Up to video_workers videos are in progress together, so the next videos
+    download while earlier ones wait on transcription and annotation. Each
+    stage is capped separately by concurrency (stage name -> limit, over
+    STAGE_CONCURRENCY). clients may hold shared "storage", "speech" and
+    "video" API clients, and backend names an entry of TRANSCRIBE_BACKENDS.
+    Videos whose Steps file already exists are skipped unless skip_existing
+    is False. store is the ResultStore of earlier transcripts, annotations
+    and uploads. Returns {video id: steps or None} and the StageLimits with
+    the stage timings.
+    """
+    if skip_existing:
+        pending = []
+        for video in video_details:
+            if os.path.exists(steps_path(video)):
+                print(f"Steps already written: {video['title']}")
+            else:
+                pending.append(video)
+        video_details = pending
+    limits = StageLimits(concurrency)
+    clients = clients or {}
+    if store is None:
+        store = ResultStore()
+    results = {}
+    with ThreadPoolExecutor(max_workers=video_workers) as videos, ThreadPoolExecutor(
+        max_workers=2 * video_workers
+    ) as branches:
+        futures = {
+            videos.submit(process_video, video, limits, branches, clients, backend, store): video
+            for video in video_details
+        }
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                results[video["video_id"]] = future.result()
+            except Exception as e:
+                print(f"Error processing video {video['title']}: {e}")
+                results[video["video_id"]] = None
+    return results, limits
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Summarize YouTube videos into steps.")
+    parser.add_argument("videos", nargs="*", help="Video IDs or URLs")
+    parser.add_argument("--ids-file", help="File with one video ID or URL per line")
+    parser.add_argument("--playlist", help="Playlist ID whose videos are added")
+    parser.add_argument(
+        "--recombine", action="store_true",
+        help="Rewrite existing Steps files from the stored transcripts and annotations",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Ignore stored results and uploads and call the APIs again",
+    )
+    return parser.parse_args()
 
-            print(f"Uploading Video to Google Cloud Storage: {video['title']}")
-            gcs_uri_video = upload_to_gcs(
-                "bucket-for-video-analysis-viransh",
-                downloaded_path,
-                f"{video['video_id']}.mkv",
-            )
 
-            print(f"Analyzing video: {video['title']}")
-            video_analysis = analyze_video(gcs_uri_video)
+def collect_video_ids(args):
+    """Video IDs from the command line, an IDs file and a playlist, else YOUTUBE_ID_1, _2, ..."""
+    video_ids = [video_id for video_id in map(YouTubeMetadata.parse_video_id, args.videos) if video_id]
+    if args.ids_file:
+        video_ids += YouTubeMetadata.read_video_ids(args.ids_file)
+    if args.playlist:
+        video_ids += YouTubeMetadata.playlist_video_ids(get_youtube(), args.playlist)
+    if not (args.videos or args.ids_file or args.playlist):
+        i = 1
+        while os.getenv(f"YOUTUBE_ID_{i}"):
+            video_ids.append(os.getenv(f"YOUTUBE_ID_{i}"))
+            i += 1
+    return video_ids
 
-            print(f"Combining results for: {video['title']}")
-            steps = combine_results(transcription, video_analysis)
 
-            # Write the steps to a file
-            with open(f"Steps/{sanitize_filename(video['title'])}.txt", "w+") as f:
-                f.write(f"Steps for '{video['title']}':\n")
-                for step in steps:
-                    f.write(
-                        f"- Action: {step['action']} (Time: {step['start_time']}s to {step['end_time']}s)\n"
-                    )
-                    f.write(f"  Description: {step['description']}\n")
+# Main function
+def main():
+    args = parse_args()
+    video_details = fetch_video_details(collect_video_ids(args))
+
+    print("Fetched video details:")
+    for video in video_details:
+        print(f"{video['title']}")
+
+    process_videos(
+        video_details, skip_existing=not (args.recombine or args.force), store=ResultStore(force=args.force)
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+import json
+import os
+import socket
+import threading
+import time
+
+from Storage import SqliteStore
+
+QUEUE_FILE = os.getenv("QUEUE_FILE", os.path.join(os.getcwd(), "queue.sqlite"))
+LEASE_SECONDS = float(os.getenv("LEASE_SECONDS", "120"))
+
+
+def default_worker_id():
+    """Identify a worker by host and process so container replicas never collide."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue(SqliteStore):
+    """SQLite-backed queue of novel URLs with leased claims and a shared result store.
+
+    Any number of worker processes can point at the same database file (e.g. a
+    shared volume). A claimed task is leased for `lease_seconds`; workers renew
+    leases with heartbeat(), and a lease that expires goes back to pending so
+    another worker picks the task up.
+    """
+
+    isolation_level = None  # Transactions are opened explicitly with BEGIN IMMEDIATE
+
+    def __init__(self, path=QUEUE_FILE, lease_seconds=LEASE_SECONDS):
+        super().__init__(path)
+        self.lease_seconds = lease_seconds
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    url TEXT PRIMARY KEY,
+                    position INTEGER,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    claimed REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, position);
+                CREATE TABLE IF NOT EXISTS results (
+                    url TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    worker TEXT,
+                    finished REAL
+                );
+                """
+            )
+
+    def enqueue(self, urls):
+        """Add URLs as pending tasks, ignoring ones already queued. Returns the number added."""
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (position,) = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM tasks").fetchone()
+            added = 0
+            for url in urls:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO tasks (url, position) VALUES (?, ?)",
+                    (url, position),
+                )
+                if cursor.rowcount:
+                    added += 1
+                    position += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def requeue_expired(self, conn=None):
+        """Return tasks whose lease ran out to pending. Returns the number requeued."""
+        conn = conn or self.connect()
+        cursor = conn.execute(
+            "UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL"
+            " WHERE status = 'leased' AND lease_expires < ?",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    def claim(self, worker):
+        """Lease the next pending task to worker. Returns its URL, or None if nothing is pending."""
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.requeue_expired(conn)
+            row = conn.execute(
+                "SELECT url FROM tasks WHERE status = 'pending' ORDER BY position LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?,"
+                " claimed = ?, attempts = attempts + 1 WHERE url = ?",
+                (worker, now + self.lease_seconds, now, row[0]),
+            )
+            conn.execute("COMMIT")
+            return row[0]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def heartbeat(self, worker, urls):
+        """Extend the leases worker still holds on urls. Returns the URLs it no longer owns."""
+        conn = self.connect()
+        lost = []
+        expires = time.time() + self.lease_seconds
+        for url in urls:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?"
+                " WHERE url = ? AND worker = ? AND status = 'leased'",
+                (expires, url, worker),
+            )
+            if not cursor.rowcount:
+                lost.append(url)
+        return lost
+
+    def complete(self, worker, url, result):
+        """Store the result for url and mark the task done, if worker still holds its lease.
+
+        Returns False, storing nothing, when the lease expired or the task went
+        to another worker; the task is then redone by whoever claims it.
+        """
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', lease_expires = NULL"
+                " WHERE url = ? AND worker = ? AND status = 'leased' AND lease_expires > ?",
+                (url, worker, now),
+            )
+            if not cursor.rowcount:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO results (url, result, worker, finished) VALUES (?, ?, ?, ?)",
+                (url, json.dumps(result), worker, now),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, worker, url):
+        """Give a leased task back to the queue, e.g. after an error."""
+        self.connect().execute(
+            "UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL"
+            " WHERE url = ? AND worker = ? AND status = 'leased'",
+            (url, worker),
+        )
+
+    def counts(self):
+        """Return the number of tasks per status."""
+        rows = self.connect().execute("SELECT status, COUNT(*) FROM tasks GROUP BY status")
+        counts = {"pending": 0, "leased": 0, "done": 0}
+        counts.update(dict(rows.fetchall()))
+        return counts
+
+    def iter_results(self):
+        """Yield stored results in the order their URLs were enqueued."""
+        rows = self.connect().execute(
+            "SELECT results.result FROM results JOIN tasks ON tasks.url = results.url"
+            " ORDER BY tasks.position"
+        )
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def timings(self):
+        """Return (first claim time, last finish time) for throughput measurements."""
+        conn = self.connect()
+        (first,) = conn.execute("SELECT MIN(claimed) FROM tasks").fetchone()
+        (last,) = conn.execute("SELECT MAX(finished) FROM results").fetchone()
+        return first, last
+
+
+class Heartbeat:
+    """Background thread that renews a worker's leases every third of the lease period."""
+
+    def __init__(self, queue, worker):
+        self.queue = queue
+        self.worker = worker
+        self.held = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def add(self, url):
+        with self.lock:
+            self.held.add(url)
+
+    def remove(self, url):
+        with self.lock:
+            self.held.discard(url)
+
+    def run(self):
+        while not self.stop_event.wait(self.queue.lease_seconds / 3):
+            with self.lock:
+                held = list(self.held)
+            for url in self.queue.heartbeat(self.worker, held):
+                print(f"Lost lease on {url}, another worker will redo it")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
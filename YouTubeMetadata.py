@@ -0,0 +1,193 @@
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Storage import SqliteStore
+
+YOUTUBE_CACHE_FILE = os.getenv("YOUTUBE_CACHE_FILE", os.path.join(os.getcwd(), "youtube_cache.sqlite"))
+# Cached snippets younger than this are used without calling the API at all;
+# older ones are revalidated with the ETag of the batch they came in
+METADATA_TTL = float(os.getenv("METADATA_TTL_HOURS", "168")) * 3600
+METADATA_WORKERS = int(os.getenv("METADATA_WORKERS", "4"))  # videos.list pages in flight
+MAX_IDS_PER_REQUEST = 50  # Limit of videos.list and playlistItems.list
+VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|shorts/|^)([A-Za-z0-9_-]{11})(?:$|[&?#/])")
+
+
+def parse_video_id(text):
+    """Video ID from a bare ID or a watch/short/youtu.be URL, else None."""
+    match = VIDEO_ID_RE.search(text.strip())
+    return match.group(1) if match else None
+
+
+def read_video_ids(path):
+    """Video IDs from a file with one ID or URL per line; blank lines and # comments are skipped."""
+    ids = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            video_id = parse_video_id(line)
+            if video_id:
+                ids.append(video_id)
+            else:
+                print(f"Not a video ID or URL: {line}")
+    return ids
+
+
+def playlist_video_ids(client, playlist_id):
+    """Video IDs of a playlist, 50 per page."""
+    ids = []
+    page_token = None
+    while True:
+        response = client.playlistItems().list(
+            part="contentDetails", playlistId=playlist_id,
+            maxResults=MAX_IDS_PER_REQUEST, pageToken=page_token,
+        ).execute()
+        ids += [item["contentDetails"]["videoId"] for item in response.get("items", [])]
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return ids
+
+
+class MetadataCache(SqliteStore):
+    """SQLite cache of video snippets and of the ETags of the videos.list pages they came from."""
+
+    def __init__(self, path=YOUTUBE_CACHE_FILE, ttl=METADATA_TTL):
+        super().__init__(path)
+        self.ttl = ttl
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS videos (
+                    video_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    fetched REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    page_key TEXT PRIMARY KEY,
+                    etag TEXT NOT NULL
+                )
+                """
+            )
+
+    def lookup(self, video_ids):
+        """Return {video id: (title or None if the video does not exist, fetched)} for cached IDs."""
+        conn = self.connect()
+        found = {}
+        for start in range(0, len(video_ids), 500):
+            chunk = video_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT video_id, title, fetched FROM videos WHERE video_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update((video_id, (title, fetched)) for video_id, title, fetched in rows)
+        return found
+
+    def page_etag(self, page_key):
+        row = self.connect().execute("SELECT etag FROM pages WHERE page_key = ?", (page_key,)).fetchone()
+        return row[0] if row else None
+
+    def store(self, page_key, etag, titles):
+        """Save a fetched page: {video id: title, or None for IDs the API did not return}."""
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO videos (video_id, title, fetched) VALUES (?, ?, ?)",
+                [(video_id, title, now) for video_id, title in titles.items()],
+            )
+            if etag:
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (page_key, etag) VALUES (?, ?)", (page_key, etag)
+                )
+
+    def touch(self, video_ids):
+        """Mark cached snippets as current after the API answered 304 Not Modified."""
+        conn = self.connect()
+        with conn:
+            conn.executemany(
+                "UPDATE videos SET fetched = ? WHERE video_id = ?",
+                [(time.time(), video_id) for video_id in video_ids],
+            )
+
+
+def page_key(video_ids):
+    return hashlib.sha256(",".join(sorted(video_ids)).encode("utf-8")).hexdigest()
+
+
+def fetch_page(client, cache, video_ids):
+    """Fetch one videos.list page of up to 50 IDs, revalidating with its ETag when it is cached."""
+    from googleapiclient.errors import HttpError
+
+    key = page_key(video_ids)
+    # maxResults is not supported with id; callers keep pages to MAX_IDS_PER_REQUEST
+    request = client.videos().list(part="snippet", id=",".join(video_ids))
+    etag = cache.page_etag(key)
+    if etag and len(cache.lookup(video_ids)) == len(video_ids):
+        request.headers["If-None-Match"] = etag
+    try:
+        response = request.execute()
+    except HttpError as e:
+        if e.resp.status == 304:
+            cache.touch(video_ids)
+            return "not modified"
+        raise
+    titles = dict.fromkeys(video_ids)
+    for item in response.get("items", []):
+        titles[item["id"]] = item["snippet"]["title"]
+    cache.store(key, response.get("etag"), titles)
+    return "fetched"
+
+
+def fetch_video_details(video_ids, client_factory, cache=None, workers=METADATA_WORKERS):
+    """Titles of any number of videos, from the cache or from concurrent 50-ID pages.
+
+    client_factory() returns the YouTube client for the calling thread.
+    Snippets cached less than METADATA_TTL ago cost no request. The IDs are
+    sorted and split into fixed 50-ID pages, and every page holding a stale
+    snippet is asked for again with that page's If-None-Match, so a 304 only
+    refreshes it. Fixed pages keep their ETags from run to run, whichever of
+    their snippets went stale.
+    Returns [{"title", "video_id"}] in input order, without duplicates or
+    videos that do not exist.
+    """
+    cache = cache or MetadataCache()
+    video_ids = list(dict.fromkeys(video_ids))
+    cached = cache.lookup(video_ids)
+    now = time.time()
+    stale = {video_id for video_id in video_ids if video_id not in cached or now - cached[video_id][1] > cache.ttl}
+
+    ordered = sorted(video_ids)
+    pages = [
+        page
+        for page in (ordered[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(ordered), MAX_IDS_PER_REQUEST))
+        if not stale.isdisjoint(page)
+    ]
+    if pages:
+        print(f"Fetching details of {len(stale)} videos in {len(pages)} requests ({len(video_ids) - len(stale)} cached)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(lambda page: fetch_page(client_factory(), cache, page), page) for page in pages]
+            for page, future in zip(pages, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error fetching details of {page[0]} to {page[-1]}: {e}")
+        cached = cache.lookup(video_ids)
+
+    details = []
+    for video_id in video_ids:
+        title = cached.get(video_id, (None, None))[0]
+        if title is None:
+            if video_id in cached:
+                print(f"Video not found: {video_id}")
+            continue
+        details.append({"title": title, "video_id": video_id})
+    return details
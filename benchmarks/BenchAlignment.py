@@ -0,0 +1,139 @@
+"""Speed and accuracy of VideoSummary.combine_results' label alignment, old and new.
+
+Builds a synthetic hour-long transcript with word timestamps and thousands
+of video labels. Each label is named in a sentence spoken while it is on
+screen, and some are also named somewhere else in passing. Times the
+previous every-label-against-every-sentence substring scan against the
+interval tree and token index in TranscriptAlignment, and counts how many
+labels each describes with the sentence spoken while the label is shown.
+
+    python benchmarks/BenchAlignment.py --minutes 60 --labels 1000 3000
+"""
+
+import argparse
+import random
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+
+from TranscriptAlignment import align_steps, timed_sentences
+
+ADJECTIVES = (
+    "red blue green copper steel wooden glass ceramic small large round square sharp dull hot cold fresh dry "
+    "sweet sour bitter salty crisp soft heavy light tall short wide narrow thick thin bright dark old new clean "
+    "rough smooth plain fancy black white golden silver striped spotted frozen melted raw baked fried"
+).split()
+NOUNS = (
+    "whisk pan pot knife board bowl spoon fork ladle oven stove grill tray sheet jar lid cup plate tongs grater "
+    "peeler sieve colander mixer blender kettle skillet wok mortar pestle rolling-pin spatula thermometer scale "
+    "timer apron towel glove basket bottle can box bag napkin candle lamp chair table shelf drawer sink tap"
+).replace("-", "").split()
+FILLER = (
+    "now we take the and then carefully make sure it is ready before you move on to the next part of this "
+    "recipe so that everything comes together nicely at the end with a little patience and some practice"
+).split()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--labels", type=int, nargs="+", default=[1000, 3000])
+    parser.add_argument("--decoys", type=float, default=0.5, help="Share of labels also named elsewhere")
+    return parser.parse_args()
+
+
+def synthetic_video(minutes, label_count, decoy_rate, seed=0):
+    """Return (sentences, words, video analysis, expected sentence per label)."""
+    rng = random.Random(seed)
+    duration = minutes * 60
+    # Sentences of 8-16 filler words at about 2.5 words per second
+    sentences, t = [], 0.0
+    while t < duration:
+        length = rng.randrange(8, 17)
+        sentences.append({"tokens": [rng.choice(FILLER) for _ in range(length)], "start": t})
+        t += length / 2.5 + rng.uniform(0.2, 1.0)
+        sentences[-1]["end"] = t
+
+    names = [f"{a} {n}" for a in ADJECTIVES for n in NOUNS]
+    rng.shuffle(names)
+    names = names[:label_count]
+    labels, expected = [], []
+    for name in names:
+        start = rng.uniform(0, duration - 30)
+        end = start + rng.uniform(4, 20)
+        labels.append({"description": name, "start_time": round(start, 2), "end_time": round(end, 2)})
+        inside = [s for s, sentence in enumerate(sentences) if sentence["start"] >= start and sentence["end"] <= end]
+        target = rng.choice(inside) if inside else min(
+            range(len(sentences)), key=lambda s: abs(sentences[s]["start"] - start)
+        )
+        if rng.random() < decoy_rate:
+            # Mentioned in passing earlier on, like "we will need the copper pan later"
+            decoy = rng.randrange(0, max(1, target))
+            sentences[decoy]["tokens"] += name.split()
+        sentences[target]["tokens"] += name.split()
+        expected.append(target)
+
+    texts, words = [], []
+    for sentence in sentences:
+        tokens = sentence["tokens"]
+        step = (sentence["end"] - sentence["start"]) / len(tokens)
+        for k, token in enumerate(tokens):
+            words.append({
+                "word": token,
+                "start_time": round(sentence["start"] + k * step, 3),
+                "end_time": round(sentence["start"] + (k + 0.8) * step, 3),
+            })
+        texts.append(" ".join(tokens).capitalize() + ".")
+    return texts, words, {"labels": labels, "objects": []}, expected
+
+
+def previous_combine_results(sentences, video_analysis):
+    """The label loop of combine_results before TranscriptAlignment."""
+    steps = []
+    for label in video_analysis["labels"]:
+        step = {
+            "action": label["description"],
+            "start_time": label["start_time"],
+            "end_time": label["end_time"],
+        }
+        relevant_sentences = [
+            s for s in sentences if label["description"].lower() in s.lower()
+        ]
+        step["description"] = (
+            relevant_sentences[:1]
+            if relevant_sentences
+            else "No relevant description found."
+        )
+        steps.append(step)
+    return steps
+
+
+def accuracy(steps, sentences, expected):
+    return sum(step["description"] == [sentences[target]] for step, target in zip(steps, expected)) / len(steps)
+
+
+def main():
+    args = parse_args()
+    for label_count in args.labels:
+        sentences, words, analysis, expected = synthetic_video(args.minutes, label_count, args.decoys)
+        print(f"{args.minutes:g} minutes, {len(sentences)} sentences, {len(words)} words, {label_count} labels")
+
+        started = time.perf_counter()
+        old = previous_combine_results(sentences, analysis)
+        old_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        new = align_steps(timed_sentences(sentences, words), analysis)
+        new_time = time.perf_counter() - started
+
+        print(f"  substring scan          {old_time * 1000:8.1f} ms  correct sentence {accuracy(old, sentences, expected):6.1%}")
+        print(f"  interval tree + index   {new_time * 1000:8.1f} ms  correct sentence {accuracy(new, sentences, expected):6.1%}")
+
+        # Without word timestamps the index alone keeps the previous answers
+        untimed = align_steps(timed_sentences(sentences, []), analysis)
+        same = sum(a["description"] == b["description"] for a, b in zip(untimed, old)) / len(old)
+        print(f"  without timestamps, {same:.1%} of steps match the substring scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Peak memory and upload size of VideoSummary's audio extraction, old and new.
+
+Writes a synthetic 48 kHz stereo WAV soundtrack, then extracts its audio
+the old way (pydub decodes the whole track, then writes mono WAV) and with
+the ffmpeg extractor for each encoding. Each run is in its own process so
+peak RSS is measured separately; ffmpeg's own peak is counted too. Then
+uploads and transcribes the segments in parallel with FakeGcs and the
+FakeVideoApis Speech stand-in, and checks the stitched word timestamps.
+
+    python benchmarks/BenchAudioExtract.py --minutes 10 --segment 120
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+from BenchUtils import REPO_ROOT, peak_rss_mb
+from FakeGcs import FakeStorageClient
+from FakeVideoApis import FakeSpeechClient
+
+SOURCE_RATE = 48000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--segment", type=int, default=120, help="Seconds per segment")
+    parser.add_argument("--transcribe", type=float, default=1.0, help="Seconds per transcription operation")
+    parser.add_argument("--run", nargs=3, metavar=("MODE", "SOURCE", "OUTPUT"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def write_soundtrack(path, minutes):
+    """Stereo tones with a slow beat, written a second at a time."""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SOURCE_RATE)
+        second = []
+        for n in range(SOURCE_RATE):
+            left = int(8000 * math.sin(2 * math.pi * 220 * n / SOURCE_RATE))
+            right = int(6000 * math.sin(2 * math.pi * 330 * n / SOURCE_RATE))
+            second.append(struct.pack("<hh", left, right))
+        second = b"".join(second)
+        for s in range(int(minutes * 60)):
+            f.writeframes(second if s % 4 else bytes(len(second)))
+
+
+def previous_extract_audio(video_path, audio_path):
+    """VideoSummary.extract_audio before the ffmpeg extractor."""
+    from pydub import AudioSegment
+
+    video = AudioSegment.from_file(video_path)
+    mono_audio = video.set_channels(1).set_sample_width(2)
+    mono_audio.export(audio_path, format="wav")
+    return [(audio_path, 0.0)]
+
+
+def run_mode(args, mode, source, output):
+    """Child process: extract once, then report wall time, peak RSS and output bytes as JSON."""
+    import resource
+
+    import VideoSummary
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "pydub":
+            segments = previous_extract_audio(source, output)
+        else:
+            segments = VideoSummary.extract_audio(source, output, encoding=mode, segment_seconds=args.segment)
+    wall = time.perf_counter() - started
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps({
+        "wall": wall,
+        "peak": peak_rss_mb(),
+        "ffmpeg_peak": children,
+        "segments": len(segments),
+        "bytes": sum(os.path.getsize(path) for path, _ in segments),
+    }))
+
+
+def cut_segments(source, workdir, segment_seconds):
+    """Split a WAV into (path, offset) segments with the wave module."""
+    segments = []
+    with wave.open(source, "rb") as f:
+        frames = segment_seconds * f.getframerate()
+        while True:
+            data = f.readframes(frames)
+            if not data:
+                break
+            path = os.path.join(workdir, f"cut_{len(segments):03d}.wav")
+            with wave.open(path, "wb") as out:
+                out.setparams(f.getparams())
+                out.writeframes(data)
+            segments.append((path, float(len(segments) * segment_seconds)))
+    return segments
+
+
+def check_parallel_transcription(args, source, workdir):
+    import VideoSummary
+
+    segments = cut_segments(source, workdir, args.segment)
+    storage = FakeStorageClient(latency=0.02)
+    speech = FakeSpeechClient(args.transcribe)
+
+    def transcribe_segment(path):
+        uri = VideoSummary.upload_to_gcs("bench", path, os.path.basename(path), storage)
+        return VideoSummary.transcribe_audio(uri, speech)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        transcript = VideoSummary.transcribe_segments(segments, transcribe_segment)
+    wall = time.perf_counter() - started
+    words = transcript["words"]
+    starts = [word["start_time"] for word in words]
+    # Every segment gets the same fake transcript, which may run past a short segment,
+    # so the words are checked segment by segment: in order and shifted by the offset
+    per_segment = len(words) // len(segments)
+    assert per_segment * len(segments) == len(words)
+    for k, (_, offset) in enumerate(segments):
+        part = starts[k * per_segment:(k + 1) * per_segment]
+        assert part == sorted(part), f"word times of segment {k} are out of order"
+        assert part[0] == offset, f"segment {k} does not start at its offset {offset}"
+    assert len(transcript["transcript"].split()) == len(words)
+    print(
+        f"  {len(segments)} segments uploaded and transcribed in {wall:.2f}s"
+        f" ({len(segments) * args.transcribe:.0f}s of operations),"
+        f" {len(words)} words with stitched timestamps up to {starts[-1]:.0f}s"
+    )
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        run_mode(args, *args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "soundtrack.wav")
+        write_soundtrack(source, args.minutes)
+        print(
+            f"{args.minutes:g} minute 48 kHz stereo soundtrack,"
+            f" {os.path.getsize(source) / 1024 / 1024:.0f} MB, {args.segment}s segments"
+        )
+
+        modes = ["pydub"]
+        if shutil.which("ffmpeg"):
+            modes += ["LINEAR16", "FLAC", "OGG_OPUS"]
+        else:
+            print("  ffmpeg is not installed: only the previous pydub extraction is measured")
+        for mode in modes:
+            output = os.path.join(workdir, f"{mode}.wav")
+            result = subprocess.run(
+                [sys.executable, __file__, "--segment", str(args.segment), "--run", mode, source, output],
+                cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+            )
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            ffmpeg = f", ffmpeg {stats['ffmpeg_peak']:5.0f} MB" if mode != "pydub" else ""
+            print(
+                f"  {mode:<9} {stats['wall']:6.2f}s  peak RSS {stats['peak']:6.0f} MB{ffmpeg},"
+                f" upload {stats['bytes'] / 1024 / 1024:6.1f} MB in {stats['segments']} files"
+            )
+
+        check_parallel_transcription(args, source, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Wall time of ImageDownload.get_all_images with one browser versus a pool.
+
+Runs against FakeComicSite with FakeDriver, which sleeps per page load in
+place of Chrome's rendering. Checks that page loads respect the per-host
+interval, that output names match the serial run, and that a rerun skips
+every page whose image already exists.
+
+    python benchmarks/BenchBrowserPool.py --pages 24 --render 0.5 --interval 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from FakeComicSite import FakeComicSite
+from FakeDriver import FakeDriver
+
+os.environ.setdefault("IMAGE_PREFIX", "Image")
+os.environ.setdefault("WEBSITE_IMG", "/covers/")
+import ImageDownload
+
+ImageDownload.USE_IMAGE_INDEX = False  # Measure fetching, not reuse (see BenchImageIndex)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--tiles", type=int, default=8)
+    parser.add_argument("--render", type=float, default=0.5, help="Seconds per simulated page render")
+    parser.add_argument("--interval", type=float, default=0.2, help="Seconds between page loads per host")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per HTTP request")
+    parser.add_argument("--pool", type=int, nargs=2, default=[4, 4], metavar=("BROWSERS", "DOWNLOADS"))
+    return parser.parse_args()
+
+
+def run(args, site, output_dir, browsers, download_workers):
+    ImageDownload.dir_path = output_dir
+    FakeDriver.reset()
+    limiter = ImageDownload.HostRateLimiter(args.interval)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ImageDownload.get_all_images(
+            0, args.pages - 1, browsers, download_workers, limiter,
+            driver_factory=lambda: FakeDriver(args.render), fast_path=False,
+        )
+    wall = time.perf_counter() - started
+    # The first load of each browser opens BASE_URL for the cookies
+    loads = sorted(FakeDriver.page_loads)[FakeDriver.started:]
+    gaps = [b - a for a, b in zip(loads, loads[1:])]
+    image_dir = os.path.join(output_dir, "Images GIF")
+    names = sorted(os.listdir(image_dir)) if os.path.isdir(image_dir) else []
+    return wall, FakeDriver.started, len(loads), min(gaps) if gaps else 0.0, names
+
+
+def main():
+    args = parse_args()
+    with FakeComicSite(
+        pages=args.pages, tiles_per_page=args.tiles, tile_width=400, tile_height=600, latency=args.latency
+    ) as site, tempfile.TemporaryDirectory() as workdir:
+        cookies_path = os.path.join(workdir, "cookies.json")
+        with open(cookies_path, "w") as f:
+            json.dump([{"name": "session", "value": "bench", "domain": "127.0.0.1"}], f)
+        ImageDownload.cookies_file = cookies_path
+        ImageDownload.content_url = site.base_url + "/chapter/{}"
+        os.environ["BASE_URL"] = site.base_url + "/"
+
+        print(
+            f"{args.pages} pages of {args.tiles} tiles, {args.render:.2f}s render,"
+            f" {args.interval:.2f}s between page loads, {args.latency:.2f}s per request"
+        )
+        results = {}
+        for label, browsers, downloads in (("serial", 1, 1), ("pool", *args.pool)):
+            output_dir = os.path.join(workdir, label)
+            wall, drivers, loads, min_gap, names = run(args, site, output_dir, browsers, downloads)
+            results[label] = names
+            print(
+                f"  {label:<6} {browsers} browsers, {downloads} download workers: {wall:6.2f}s"
+                f" ({args.pages / wall:5.2f} pages/s), {drivers} drivers, {loads} page loads,"
+                f" closest loads {min_gap:.2f}s apart"
+            )
+            assert min_gap >= args.interval * 0.95, "page loads closer than the interval"
+
+        assert results["serial"] == results["pool"], "pool produced different file names"
+        assert len(results["pool"]) == 2 * args.pages
+        print(f"  both runs wrote the same {len(results['pool'])} files")
+
+        wall, drivers, loads, _, _ = run(args, site, os.path.join(workdir, "pool"), *args.pool)
+        assert loads == 0 and drivers == 0
+        print(f"  rerun: {wall:.2f}s, every page skipped, no browser started")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""End-to-end crawl benchmark against a local fake novel site and a fake LLM.
+
+Runs NovelLinks (listing pages -> novel_links.txt) and then NovelChapterCheck
+(novels -> chapters -> LLM) in a temporary directory and reports pages/sec,
+p50/p99 latency and peak RSS for each stage.
+
+    python benchmarks/BenchCrawl.py --pages 5 --novels-per-page 20 --latency 0.01
+"""
+
+import argparse
+import importlib
+import os
+import tempfile
+import time
+
+from BenchUtils import print_report, timed
+from FakeLLM import FakeGenerativeModel
+from FakeNovelSite import KEYWORDS, FakeNovelSite
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5, help="Listing pages on the fake site")
+    parser.add_argument("--novels-per-page", type=int, default=20)
+    parser.add_argument("--chapters", type=int, default=10, help="Chapters per novel")
+    parser.add_argument("--latency", type=float, default=0.005, help="Server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random server latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failing requests")
+    parser.add_argument("--error-status", type=int, default=404)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM latency")
+    parser.add_argument("--request-delay", type=float, default=0.0, help="Crawler REQUEST_DELAY")
+    return parser.parse_args()
+
+
+def configure_env(site, args):
+    os.environ["CRAWL_URL"] = site.base_url
+    os.environ["START_PAGE"] = site.start_page
+    os.environ["KEYWORDS"] = ",".join(KEYWORDS)
+    os.environ["PROMPT_QUESTION"] = "Does this chapter contain the keywords? Answer yes or no."
+    os.environ["REQUEST_DELAY"] = str(args.request_delay)
+    os.environ["STATUS_PORT"] = "0"
+
+
+def bench_novel_links(site):
+    import NovelLinks
+
+    latencies = []
+    NovelLinks.process_url = timed(NovelLinks.process_url, latencies)
+    requests_before = site.request_count
+    started = time.perf_counter()
+    NovelLinks.main()
+    wall = time.perf_counter() - started
+    print_report("NovelLinks", wall, site.request_count - requests_before, latencies)
+
+
+def bench_novel_chapter_check(site, args):
+    import NovelChapterCheck
+
+    FakeGenerativeModel.reset(latency=args.llm_latency)
+    NovelChapterCheck.model = FakeGenerativeModel(NovelChapterCheck.MODEL_NAME)
+    latencies = []
+    NovelChapterCheck.process_novel = timed(NovelChapterCheck.process_novel, latencies)
+    requests_before = site.request_count
+    started = time.perf_counter()
+    NovelChapterCheck.main()
+    wall = time.perf_counter() - started
+    print_report(
+        "NovelChapterCheck", wall, site.request_count - requests_before, latencies
+    )
+    print(f"  {len(latencies)} novels, {FakeGenerativeModel.calls} LLM calls")
+
+
+def main():
+    args = parse_args()
+    site = FakeNovelSite(
+        listing_pages=args.pages,
+        novels_per_page=args.novels_per_page,
+        chapters_per_novel=args.chapters,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    with site, tempfile.TemporaryDirectory() as workdir:
+        configure_env(site, args)
+        os.chdir(workdir)  # The crawlers read and write their files in the cwd
+        importlib.invalidate_caches()
+        bench_novel_links(site)
+        bench_novel_chapter_check(site, args)
+        print(f"\nServer: {site.request_count} requests, {site.error_count} errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Per-page latency of ImageDownload's browserless fast path versus Selenium.
+
+First checks that extract_image_urls returns exactly what the BeautifulSoup
+parse in fetch_image_url returns, on handwritten markup and on the fixture
+pages. Then times the image lookup per page against FakeComicSite, where a
+share of chapters only list their tiles in a script and need the browser
+fallback, and runs get_all_images end to end both ways.
+
+    python benchmarks/BenchFastPath.py --pages 40 --render 0.8 --js-rate 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT, percentile  # noqa: F401  (puts the scripts on sys.path)
+from FakeComicSite import FakeComicSite
+from FakeDriver import FakeDriver
+
+os.environ.setdefault("IMAGE_PREFIX", "Image")
+os.environ.setdefault("WEBSITE_IMG", "/covers/")
+import ImageDownload
+
+ImageDownload.USE_IMAGE_INDEX = False  # Measure fetching, not reuse (see BenchImageIndex)
+
+SAMPLES = [
+    "<img src='//cdn/Image_1.jpg'><img alt=x src=\"//cdn/Image_2.jpg?a=1&amp;b=2\"><IMG SRC=//cdn/Image_3.jpg>",
+    '<div style="background-image: url(&quot;//cdn/Image_bg.jpg&quot;)"></div><img src="//site/covers/1.jpg">',
+    "<section style='color: red; background-image: url(//cdn/covers/2.jpg)'></section><img src='/logo.png'>",
+    "<img data-src='//cdn/Image_lazy.jpg' src='//cdn/placeholder.gif'><img src='//cdn/covers/a.jpg'><img src='//cdn/covers/b.jpg'>",
+]
+
+
+class SourceDriver:
+    """Driver whose page is a fixed string, for feeding markup to fetch_image_url."""
+
+    def __init__(self, page_source):
+        self.page_source = page_source
+
+    def get(self, url):
+        pass
+
+    def find_elements(self, by, value):
+        return [None]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--render", type=float, default=0.8, help="Seconds per simulated browser render")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per HTTP request")
+    parser.add_argument("--js-rate", type=float, default=0.2, help="Share of pages built by scripts")
+    return parser.parse_args()
+
+
+def check_parity(site):
+    pages = SAMPLES + [site.chapter_page(page, rendered=True) for page in range(5)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for source in pages:
+            expected = ImageDownload.fetch_image_url(SourceDriver(source), "sample")
+            assert ImageDownload.extract_image_urls(source) == tuple(expected), source
+    print(f"  regex extraction matches BeautifulSoup on {len(pages)} pages")
+
+
+def summary(label, latencies):
+    print(
+        f"  {label:<24} mean {sum(latencies) / len(latencies) * 1000:6.0f} ms"
+        f"  p50 {percentile(latencies, 50) * 1000:6.0f} ms  p95 {percentile(latencies, 95) * 1000:6.0f} ms"
+    )
+
+
+def lookup_latencies(args, site):
+    urls = [f"{site.base_url}/chapter/{page}" for page in range(args.pages)]
+    session = ImageDownload.new_download_session()
+    driver = FakeDriver(args.render)
+    browser, fast = [], []
+    fallbacks = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for url in urls:
+            started = time.perf_counter()
+            ImageDownload.fetch_image_url(driver, url)
+            browser.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            if ImageDownload.fetch_image_url_fast(session, url) is None:
+                fallbacks += 1
+                ImageDownload.fetch_image_url(driver, url)
+            fast.append(time.perf_counter() - started)
+    driver.quit()
+    summary("selenium only", browser)
+    summary(f"fast path ({fallbacks} fallbacks)", fast)
+
+
+def end_to_end(args, site, workdir):
+    cookies_path = os.path.join(workdir, "cookies.json")
+    with open(cookies_path, "w") as f:
+        json.dump([{"name": "session", "value": "bench", "domain": "127.0.0.1"}], f)
+    ImageDownload.cookies_file = cookies_path
+    ImageDownload.content_url = site.base_url + "/chapter/{}"
+    os.environ["BASE_URL"] = site.base_url + "/"
+
+    outputs = {}
+    for fast_path in (False, True):
+        ImageDownload.dir_path = os.path.join(workdir, f"fast-{fast_path}")
+        FakeDriver.reset()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ImageDownload.get_all_images(
+                0, args.pages - 1, browsers=4, download_workers=4,
+                limiter=ImageDownload.HostRateLimiter(0.0),
+                driver_factory=lambda: FakeDriver(args.render), fast_path=fast_path,
+            )
+        wall = time.perf_counter() - started
+        outputs[fast_path] = sorted(os.listdir(os.path.join(ImageDownload.dir_path, "Images GIF")))
+        print(
+            f"  get_all_images, fast_path={fast_path!s:<5} {wall:6.2f}s,"
+            f" {FakeDriver.started} browsers started, {len(outputs[fast_path])} files"
+        )
+    assert outputs[False] == outputs[True], "fast path wrote different files"
+    assert len(outputs[True]) == 2 * args.pages, "some pages were not saved"
+
+
+def main():
+    args = parse_args()
+    with FakeComicSite(
+        pages=args.pages, tiles_per_page=4, tile_width=200, tile_height=300,
+        latency=args.latency, js_rate=args.js_rate,
+    ) as site, tempfile.TemporaryDirectory() as workdir:
+        print(
+            f"{args.pages} pages, {args.render:.2f}s browser render, {args.latency:.2f}s per request,"
+            f" {args.js_rate:.0%} of pages built by scripts"
+        )
+        check_parity(site)
+        lookup_latencies(args, site)
+        end_to_end(args, site, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark ImageToHtml.upload_to_gcs against an in-process fake GCS.
+
+Compares the old serial exists()-then-upload loop with the concurrent uploader
+on a cold bucket, a rerun where nothing changed, and a rerun with a few
+modified images.
+
+    python benchmarks/BenchGcsUpload.py --images 200 --latency 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from FakeGcs import FakeStorageClient
+
+import ImageToHtml
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=300, help="Size of each image")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per GCS request")
+    parser.add_argument("--bandwidth-mb", type=float, default=20, help="MB/s per upload stream")
+    parser.add_argument("--changed", type=int, default=5, help="Images modified before rerun")
+    parser.add_argument("--workers", type=int, default=ImageToHtml.UPLOAD_WORKERS)
+    return parser.parse_args()
+
+
+def serial_upload(client, bucket_name, image_paths):
+    """The previous upload_to_gcs loop: one exists() and one upload per image."""
+    bucket = client.bucket(bucket_name)
+    if not bucket.exists():
+        bucket = client.create_bucket(bucket_name)
+    for image in image_paths:
+        blob = bucket.blob(os.path.split(image)[1])
+        if blob.exists():
+            continue
+        blob.upload_from_filename(image)
+
+
+def run(name, func, client):
+    client.reset_counters()
+    started = time.perf_counter()
+    func()
+    wall = time.perf_counter() - started
+    print(
+        f"{name:<28} {wall:8.2f}s {client.request_count:>6} requests"
+        f" {client.uploads:>5} uploads {client.bytes_uploaded / 1e6:8.1f} MB"
+    )
+
+
+def main():
+    args = parse_args()
+    bandwidth = args.bandwidth_mb * 1e6 if args.bandwidth_mb else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        image_paths = []
+        for i in range(args.images):
+            path = os.path.join(workdir, f"Image ({i}).gif")
+            with open(path, "wb") as f:
+                f.write(os.urandom(args.size_kb * 1024))
+            image_paths.append(path)
+
+        def quiet_upload(client):
+            with contextlib.redirect_stdout(io.StringIO()):  # Silence per-file messages
+                ImageToHtml.upload_to_gcs("bench", image_paths, client, args.workers)
+
+        print(f"{args.images} images of {args.size_kb} KB, {args.latency * 1000:.0f} ms per request")
+        serial_client = FakeStorageClient(args.latency, bandwidth)
+        run("serial, cold bucket", lambda: serial_upload(serial_client, "bench", image_paths), serial_client)
+        run("serial, rerun", lambda: serial_upload(serial_client, "bench", image_paths), serial_client)
+
+        client = FakeStorageClient(args.latency, bandwidth)
+        run("concurrent, cold bucket", lambda: quiet_upload(client), client)
+        run("concurrent, rerun", lambda: quiet_upload(client), client)
+
+        for path in image_paths[: args.changed]:
+            with open(path, "ab") as f:
+                f.write(b"changed")
+        run(f"concurrent, {args.changed} changed", lambda: quiet_upload(client), client)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Repeated ImageDownload runs with and without the image fingerprint index.
+
+Downloads a chapter from FakeComicSite, then downloads part of it again
+under renumbered names in another directory, the way a changed start/end or
+dir_path does. Reports wall time, image bytes sent by the server, 304
+revalidations and pages stitched, and counts the re-encoded duplicate pages
+the index flags. Covers and pages that are saved again unchanged are linked,
+not flagged.
+
+    python benchmarks/BenchImageIndex.py --pages 20 --tiles 30
+"""
+
+import argparse
+import contextlib
+import filecmp
+import io
+import json
+import os
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from FakeComicSite import FakeComicSite
+from FakeDriver import FakeDriver
+
+os.environ.setdefault("IMAGE_PREFIX", "Image")
+os.environ.setdefault("WEBSITE_IMG", "/covers/")
+import ImageDownload
+from ImageIndex import ImageIndex
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--tiles", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per HTTP request")
+    parser.add_argument("--repeat-every", type=int, default=5, help="Every Nth page re-encodes the previous one")
+    return parser.parse_args()
+
+
+def run(site, output_dir, first, last, index):
+    ImageDownload.dir_path = output_dir
+    sent, not_modified = site.bytes_sent, site.not_modified
+    log = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        ImageDownload.get_all_images(
+            first, last, browsers=2, download_workers=4,
+            limiter=ImageDownload.HostRateLimiter(0.0),
+            driver_factory=lambda: FakeDriver(0.0), index=index,
+        )
+    wall = time.perf_counter() - started
+    lines = log.getvalue().splitlines()
+    return {
+        "wall": wall,
+        "bytes": site.bytes_sent - sent,
+        "304": site.not_modified - not_modified,
+        "stitched": sum(line.startswith(("Combined image saved", "Single image saved")) for line in lines),
+        "linked": sum(line.startswith("Identical page already saved") for line in lines),
+        "duplicates": [line for line in lines if line.startswith("Duplicate page:")],
+    }
+
+
+def report(label, stats):
+    print(
+        f"  {label:<28} {stats['wall']:6.2f}s {stats['bytes'] / 1024 / 1024:7.2f} MB sent"
+        f" {stats['304']:5} x 304 {stats['stitched']:4} stitched {stats['linked']:4} linked"
+    )
+
+
+def main():
+    args = parse_args()
+    with FakeComicSite(
+        pages=args.pages, tiles_per_page=args.tiles, tile_width=400, tile_height=600,
+        latency=args.latency, repeat_every=args.repeat_every,
+    ) as site, tempfile.TemporaryDirectory() as workdir:
+        cookies_path = os.path.join(workdir, "cookies.json")
+        with open(cookies_path, "w") as f:
+            json.dump([], f)
+        ImageDownload.cookies_file = cookies_path
+        ImageDownload.content_url = site.base_url + "/chapter/{}"
+        os.environ["BASE_URL"] = site.base_url + "/"
+        index = ImageIndex(os.path.join(workdir, "index.sqlite"), os.path.join(workdir, "store"))
+
+        print(f"{args.pages} pages of {args.tiles} tiles, {args.latency:.2f}s per request")
+        first = run(site, os.path.join(workdir, "first"), 0, args.pages - 1, index)
+        report("first run, empty index", first)
+
+        # The same pages again, renumbered from 0 in another directory
+        offset = args.pages // 4
+        ImageDownload.USE_IMAGE_INDEX = False
+        cold = run(site, os.path.join(workdir, "cold"), offset, args.pages - 1, None)
+        ImageDownload.USE_IMAGE_INDEX = True
+        report("renumbered rerun, no index", cold)
+        warm = run(site, os.path.join(workdir, "warm"), offset, args.pages - 1, index)
+        report("renumbered rerun, index", warm)
+
+        cold_dir = os.path.join(workdir, "cold", "Images GIF")
+        warm_dir = os.path.join(workdir, "warm", "Images GIF")
+        names = sorted(os.listdir(cold_dir))
+        assert names == sorted(os.listdir(warm_dir))
+        _, mismatch, errors = filecmp.cmpfiles(cold_dir, warm_dir, names, shallow=False)
+        assert not mismatch and not errors, f"index run wrote different files: {mismatch or errors}"
+        print(f"  both reruns wrote the same {len(names)} files")
+
+        expected = sum(
+            1 for page in range(1, args.pages) if args.repeat_every and page % args.repeat_every == args.repeat_every - 1
+        )
+        # Each re-encoded page comes with a re-encoded cover, but covers are shared images
+        print(
+            f"  first run flagged {len(first['duplicates'])} duplicate pages"
+            f" ({expected} pages are re-encoded in the fixture, with their covers)"
+        )
+        assert len(first["duplicates"]) == expected
+        assert not any("_1.gif" in line for line in first["duplicates"]), "a cover was flagged"
+        for line in first["duplicates"][:3]:
+            print(f"    {line.replace(workdir, '')}")
+        # The renumbered rerun saves the same pages and covers again: linked, not flagged.
+        # Only the re-encoded pairs are, within the rerun and against the first run
+        copies = {
+            f"warm/Images GIF/Image ({page - offset}).gif shows the same picture as"
+            f" {os.path.join(workdir, 'first')}/Images GIF/Image ({page}).gif"
+            for page in range(offset, args.pages)
+        }
+        assert not any("_1.gif" in line or line.split(f"{workdir}/", 1)[1] in copies for line in warm["duplicates"])
+        print(
+            f"  renumbered rerun linked {warm['linked']} unchanged copies and flagged none of them"
+            f" ({len(warm['duplicates'])} re-encoded pairs flagged)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Bytes and wall time of ImageVariants.build_variants on synthetic comic pages.
+
+Pages are saved the way ImageDownload stores them: PNG data under a .gif
+name, carrying EXIF and a text chunk that the variants must not keep.
+Reports the bytes a reader downloads per page for the original and for each
+format at each width, plus wall time per process count and for a rerun.
+
+    python benchmarks/BenchImageVariants.py --pages 24 --processes 1 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+
+from PIL import Image, ImageDraw, PngImagePlugin
+
+import ImageVariants
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--width", type=int, default=1080)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--processes", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    return parser.parse_args()
+
+
+def write_synthetic_pages(directory, count, width, height):
+    """Flat-coloured panels with gradients, speech bubbles and text, like a webcomic strip."""
+    rng = random.Random(0)
+    exif = Image.Exif()
+    exif[0x010F] = "Synthetic Camera"  # Make
+    metadata = PngImagePlugin.PngInfo()
+    metadata.add_text("Comment", "downloaded page " * 20)
+    paths = []
+    for i in range(count):
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        y = 0
+        while y < height:
+            panel = rng.randint(500, 900)
+            top = tuple(rng.randrange(256) for _ in range(3))
+            for row in range(0, panel, 4):
+                shade = tuple(int(c * (1 - row / panel / 2)) for c in top)
+                draw.rectangle([20, y + row, width - 20, y + row + 3], fill=shade)
+            for _ in range(rng.randint(1, 3)):
+                x0, y0 = rng.randrange(40, width - 360), y + rng.randrange(20, max(21, panel - 200))
+                draw.ellipse([x0, y0, x0 + 320, y0 + 160], fill="white", outline="black", width=3)
+                draw.text((x0 + 40, y0 + 70), f"Page {i}: the beast roared!", fill="black")
+            y += panel + 30
+        path = os.path.join(directory, f"Image ({i})_1.gif")
+        image.save(path, format="PNG", exif=exif, pnginfo=metadata)
+        paths.append(path)
+    return paths
+
+
+def has_metadata(path):
+    with Image.open(path) as image:
+        return bool(image.getexif()) or "icc_profile" in image.info or "Comment" in image.info
+
+
+def main():
+    args = parse_args()
+    formats = ImageVariants.available_formats()
+    print(f"{args.pages} pages of {args.width}x{args.height}, formats: {', '.join(formats) or 'none'}")
+    if not formats:
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        image_dir = os.path.join(workdir, "Images GIF")
+        os.makedirs(image_dir)
+        image_paths = write_synthetic_pages(image_dir, args.pages, args.width, args.height)
+        original = sum(os.path.getsize(path) for path in image_paths)
+
+        for processes in args.processes:
+            output_dir = os.path.join(workdir, f"Images Web {processes}")
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                manifest = ImageVariants.build_variants(image_paths, output_dir, processes=processes)
+            print(f"  {processes} processes: {time.perf_counter() - started:6.2f}s")
+        assert len(manifest) == args.pages
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ImageVariants.build_variants(image_paths, output_dir, processes=args.processes[-1])
+        print(f"  rerun, nothing changed: {time.perf_counter() - started:6.2f}s")
+
+        print("\nAverage bytes per page")
+        print(f"  {'original PNG':<14} {original / args.pages:>10,.0f}")
+        for image_format in formats:
+            widths = [width for _, width in manifest[os.path.basename(image_paths[0])]["variants"][image_format]]
+            for width in widths:
+                total = 0
+                for entry in manifest.values():
+                    name = dict((w, n) for n, w in entry["variants"][image_format])[width]
+                    path = os.path.join(output_dir, name)
+                    assert not has_metadata(path), f"{name} kept metadata"
+                    total += os.path.getsize(path)
+                print(
+                    f"  {image_format + ' ' + str(width) + 'w':<14} {total / args.pages:>10,.0f}"
+                    f" ({100 * (1 - total / original):.0f}% smaller)"
+                )
+        print("  metadata stripped from every variant")
+
+
+if __name__ == "__main__":
+    main()
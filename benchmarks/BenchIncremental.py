@@ -0,0 +1,117 @@
+"""Show that ImageToHtml's build graph redoes only the pages whose inputs changed.
+
+Builds a synthetic chapter with a counting OCR backend and a stub translation
+client, then rebuilds it unchanged, after editing one image, after an edited
+image's OCR fails once and then recovers, and after switching the OCR
+backend's configuration.
+
+    python benchmarks/BenchIncremental.py --pages 100
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["TRANSLATION_MEMORY_FILE"] = os.path.join(workdir, "tm.sqlite")
+        os.environ["IMAGE_PREFIX"] = "Image"
+        import ImageToHtml
+        from BenchTranslate import FakeTranslationClient
+
+        ocr_calls = []
+        failing = set()
+
+        def counting_ocr(image_paths, suffix=""):
+            """OCR stand-in: the 'text' of an image is derived from its bytes."""
+            for position, path in enumerate(image_paths):
+                ocr_calls.append(path)
+                if path in failing:
+                    continue  # as when a Vision batch fails: no text for the page
+                if path.endswith("(3).gif"):
+                    yield position, ""  # a page without text
+                    continue
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:12]
+                yield position, f"第一行 {digest}{suffix}\n罗峰\n轰！"
+
+        ImageToHtml.OCR_BACKENDS["bench"] = counting_ocr
+
+        output_dir = os.path.join(workdir, "Chapter")
+        image_dir = os.path.join(output_dir, "Images GIF")
+        os.makedirs(image_dir)
+        image_paths = []
+        for i in range(args.pages):
+            path = os.path.join(image_dir, f"Image ({i}).gif")
+            with open(path, "wb") as f:
+                f.write(f"image {i}".encode("utf-8") * 100)
+            image_paths.append(path)
+
+        def build(label, ocr_options=None):
+            ocr_calls.clear()
+            client = FakeTranslationClient()
+            started = time.perf_counter()
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                rebuilt = ImageToHtml.process_images_to_texts(
+                    image_paths, output_dir, "bench", ocr_options, client
+                )
+            wall = time.perf_counter() - started
+            rebuilt["log"] = log.getvalue()
+            counts = ", ".join(f"{stage} {len(outputs)}" for stage, outputs in rebuilt.items() if stage != "log")
+            print(
+                f"{label:<28} {wall:6.2f}s  rebuilt: {counts};"
+                f" {len(ocr_calls)} images OCRed, {client.segments} segments translated"
+            )
+            return rebuilt
+
+        rebuilt = build("initial build")
+        assert "No text extracted" in rebuilt["log"]
+        with open(os.path.join(output_dir, "manifest.json"), encoding="utf-8") as f:
+            assert json.load(f)["count"] == args.pages - 1  # the page without text is left out
+        rebuilt = build("no changes")
+        assert not any(rebuilt[stage] for stage in rebuilt if stage != "log")
+        assert "No text extracted" not in rebuilt["log"]  # its empty output counts as built
+
+        with open(image_paths[42 % args.pages], "ab") as f:
+            f.write(b"retouched")
+        rebuilt = build("one image changed")
+        assert len(rebuilt["ocr"]) == 1 and len(rebuilt["translate"]) == 1
+
+        # A changed page whose OCR fails keeps its old text, but not as current
+        changed = 7 % args.pages
+        with open(image_paths[changed], "ab") as f:
+            f.write(b"retouched")
+        failing.add(image_paths[changed])
+        rebuilt = build("changed page, OCR fails")
+        assert not rebuilt["ocr"] and not rebuilt["translate"]
+        failing.clear()
+        rebuilt = build("changed page, OCR recovers")
+        assert len(rebuilt["ocr"]) == 1 and len(rebuilt["translate"]) == 1
+        with open(image_paths[changed], "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with open(rebuilt["ocr"][0], encoding="utf-8") as f:
+            assert digest in f.read()
+
+        # New OCR settings redo OCR, but identical text does not reach translation
+        build("OCR config, same text", {"suffix": ""})
+        build("OCR config, new text", {"suffix": " v2"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Realtime factor per core of VideoSummary's local transcription backends.
+
+Synthesizes voiced, speech-like audio at 16 kHz mono (glottal pulse trains
+shaped into syllables and phrases), cuts it into segments like
+extract_audio does, and transcribes them on process pools of different
+sizes. A realtime factor below 1 means faster than the audio plays. Vosk is
+measured when a model is found at VOSK_MODEL_PATH.
+
+    python benchmarks/BenchLocalStt.py --minutes 2 --segment 30 --processes 1 2
+"""
+
+import argparse
+import math
+import os
+import random
+import struct
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+
+import VideoSummary
+
+RATE = VideoSummary.AUDIO_SAMPLE_RATE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=2)
+    parser.add_argument("--segment", type=int, default=30, help="Seconds per segment")
+    parser.add_argument("--processes", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    return parser.parse_args()
+
+
+def synthesize_speech(seconds, seed=0):
+    """16-bit samples of syllables with a wandering pitch, grouped into phrases."""
+    rng = random.Random(seed)
+    samples = []
+    while len(samples) < seconds * RATE:
+        for _ in range(rng.randrange(4, 12)):  # One phrase
+            f0, duration = rng.uniform(90, 200), rng.uniform(0.12, 0.32)
+            harmonics = [rng.uniform(0.2, 1.0) / k for k in range(1, 16)]
+            n = int(RATE * duration)
+            for i in range(n):
+                t = i / RATE
+                pitch = f0 * (1 + 0.05 * math.sin(2 * math.pi * 3 * t))
+                value = sum(a * math.sin(2 * math.pi * pitch * (k + 1) * t) for k, a in enumerate(harmonics))
+                samples.append(int(2500 * value * math.sin(math.pi * i / n)))
+            samples += [0] * int(RATE * rng.uniform(0.02, 0.12))
+        samples += [rng.randrange(-50, 50) for _ in range(int(RATE * rng.uniform(0.4, 1.2)))]
+    return samples[: int(seconds * RATE)]
+
+
+def write_segments(workdir, samples, segment_seconds):
+    segments = []
+    step = segment_seconds * RATE
+    for start in range(0, len(samples), step):
+        path = os.path.join(workdir, f"audio_{len(segments):03d}.wav")
+        chunk = samples[start:start + step]
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(RATE)
+            f.writeframes(struct.pack(f"<{len(chunk)}h", *chunk))
+        segments.append((path, start / RATE))
+    return segments
+
+
+def check_shape(transcript, duration):
+    assert set(transcript) == {"transcript", "words"}
+    starts = [word["start_time"] for word in transcript["words"]]
+    assert starts == sorted(starts), "word times are out of order"
+    for word in transcript["words"]:
+        assert set(word) == {"word", "start_time", "end_time"}
+        assert 0 <= word["start_time"] <= word["end_time"] <= duration + 1
+
+
+def main():
+    args = parse_args()
+    duration = args.minutes * 60
+    engines = {"pocketsphinx": {}}
+    if os.path.isdir(VideoSummary.VOSK_MODEL_PATH):
+        engines["vosk"] = {"model_path": VideoSummary.VOSK_MODEL_PATH}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        segments = write_segments(workdir, synthesize_speech(duration), args.segment)
+        print(f"{args.minutes:g} minutes of synthetic speech in {len(segments)} segments of {args.segment}s")
+        if "vosk" not in engines:
+            print(f"  no Vosk model at {VideoSummary.VOSK_MODEL_PATH}: Vosk skipped")
+
+        for engine, options in engines.items():
+            backend = VideoSummary.TRANSCRIBE_BACKENDS[engine]
+            try:
+                __import__(engine)
+            except ImportError:
+                print(f"  {engine} is not installed: skipped")
+                continue
+            transcripts = []
+            for processes in args.processes:
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    started = time.perf_counter()
+                    transcript = backend(segments, executor=executor, **options)
+                    wall = time.perf_counter() - started
+                check_shape(transcript, duration)
+                transcripts.append(transcript)
+                print(
+                    f"  {engine:<12} {processes} processes {wall:6.1f}s  realtime factor {wall / duration:5.2f},"
+                    f" per core {wall * processes / duration:5.2f}; {len(transcript['words'])} words"
+                )
+            assert all(t == transcripts[0] for t in transcripts), "pool size changed the transcript"
+
+
+if __name__ == "__main__":
+    main()
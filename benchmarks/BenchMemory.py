@@ -0,0 +1,77 @@
+"""Peak memory of NovelChapterCheck.main as the novel_links.txt input grows.
+
+Each input size runs in a fresh subprocess with process_novel replaced by a
+synthetic one (five chapter results, no network), so the numbers isolate the
+orchestration: link reading, futures in flight and result persistence.
+
+    python benchmarks/BenchMemory.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT, peak_rss_mb
+
+CHAPTERS = 5
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--run-child", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def fake_process_novel(novel_url):
+    """Return a result shaped like process_novel's, with one keyword hit."""
+    results = [
+        {
+            "chapter_url": f"{novel_url}/chapter-{k}",
+            "found_terms": {"cultivation": k == 1, "system": False},
+        }
+        for k in range(1, CHAPTERS + 1)
+    ]
+    return results, f"Title of {novel_url}", ["Action", "Fantasy"], ["Magic"]
+
+
+def run_child(size):
+    """Run NovelChapterCheck.main over `size` synthetic links in the current directory."""
+    with open("novel_links.txt", "w") as f:
+        for i in range(size):
+            f.write(f"http://127.0.0.1:9/novel/novel-{i}\n")
+
+    import NovelChapterCheck
+
+    NovelChapterCheck.process_novel = fake_process_novel
+    started = time.perf_counter()
+    NovelChapterCheck.main()
+    wall = time.perf_counter() - started
+    print(f"RESULT {size} {wall:.2f} {peak_rss_mb():.1f}")
+
+
+def main():
+    args = parse_args()
+    if args.run_child:
+        run_child(args.run_child)
+        return
+
+    env = dict(os.environ, KEYWORDS="cultivation,system", STATUS_PORT="0", PYTHONPATH=REPO_ROOT)
+    print(f"{'novels':>8} {'wall s':>8} {'peak RSS MB':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-child", str(size)],
+                cwd=workdir, env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        _, novels, wall, rss = next(
+            line for line in output.splitlines() if line.startswith("RESULT")
+        ).split()
+        print(f"{novels:>8} {wall:>8} {rss:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark the OCR stage of ImageToHtml with a stubbed Vision client that adds latency.
+
+Runs process_images_to_texts (with a stub translation client) and reports
+pages/minute for different numbers of 16-image batches in flight, and checks
+that a rerun after a partial failure only OCRs the missing pages. When
+Tesseract is installed it also measures the local backend per core on
+synthetic page images.
+
+    python benchmarks/BenchOcr.py --pages 320 --latency 1.0 --in-flight 1 4 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from FakeVision import FakeImageAnnotatorClient
+
+# Translations are cached by the stub runs; keep them out of the working tree
+os.environ.setdefault("TRANSLATION_MEMORY_FILE", os.path.join(tempfile.mkdtemp(), "tm.sqlite"))
+os.environ.setdefault("IMAGE_PREFIX", "Image")
+import ImageToHtml
+from BenchTranslate import FakeTranslationClient
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=320)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per batch call")
+    parser.add_argument("--per-image", type=float, default=0.05, help="Extra seconds per image")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--local-pages", type=int, default=32, help="Pages for Tesseract")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    return parser.parse_args()
+
+
+def write_synthetic_pages(directory, count):
+    """Draw pages of text lines, roughly like a scanned comic page with captions."""
+    from PIL import Image, ImageDraw
+
+    paths = []
+    for i in range(count):
+        image = Image.new("RGB", (800, 1200), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(20):
+            draw.text((40, 40 + line * 55), f"Page {i} line {line}: the quick brown fox", fill="black")
+        path = os.path.join(directory, f"Image ({i}).gif")
+        image.save(path, format="PNG")
+        paths.append(path)
+    return paths
+
+
+def ocr_chapter(image_paths, output_dir, backend, client=None, **options):
+    """Build a chapter's texts and viewer; returns the wall time and the pages OCRed."""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rebuilt = ImageToHtml.process_images_to_texts(
+            image_paths, output_dir, backend, options, FakeTranslationClient(),
+            cover_paths=[None] * len(image_paths), ocr_client=client,
+        )
+    return time.perf_counter() - started, len(rebuilt["ocr"])
+
+
+def bench_local(args):
+    try:
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"  tesseract backend skipped: {e}")
+        return
+
+    with tempfile.TemporaryDirectory() as image_dir:
+        image_paths = write_synthetic_pages(image_dir, args.local_pages)
+        for processes in args.processes:
+            with tempfile.TemporaryDirectory() as output_dir:
+                wall, _ = ocr_chapter(image_paths, output_dir, "tesseract", languages="eng", processes=processes)
+            rate = args.local_pages / wall * 60
+            print(
+                f"  tesseract, {processes} processes: {wall:6.2f}s, {rate:8.0f} pages/min,"
+                f" {rate / processes:8.0f} pages/min per core"
+            )
+
+
+def run(image_uris, client, in_flight):
+    with tempfile.TemporaryDirectory() as output_dir:
+        wall, ocred = ocr_chapter(image_uris, output_dir, "vision", client=client, max_in_flight=in_flight)
+        assert ocred == len(image_uris)
+        return wall
+
+
+def main():
+    args = parse_args()
+    image_uris = [f"gs://bench/Image ({i}).gif" for i in range(args.pages)]
+
+    print(f"{args.pages} pages, {args.latency:.2f}s + {args.per_image:.2f}s/image per batch")
+    for in_flight in args.in_flight:
+        client = FakeImageAnnotatorClient(args.latency, args.per_image)
+        wall = run(image_uris, client, in_flight)
+        print(
+            f"  {in_flight} batches in flight: {wall:6.2f}s,"
+            f" {args.pages / wall * 60:8.0f} pages/min, {client.calls} calls"
+        )
+
+    # A batch that fails mid-run only costs its own pages on the rerun
+    with tempfile.TemporaryDirectory() as output_dir:
+        failing = FakeImageAnnotatorClient(0, 0)
+        real_call = failing.batch_annotate_images
+
+        def flaky(requests):
+            if failing.calls == 1:
+                failing.calls += 1
+                raise RuntimeError("simulated quota error")
+            return real_call(requests)
+
+        failing.batch_annotate_images = flaky
+        ocr_chapter(image_uris, output_dir, "vision", client=failing, max_in_flight=1)
+        rerun = FakeImageAnnotatorClient(0, 0)
+        _, ocred = ocr_chapter(image_uris, output_dir, "vision", client=rerun, max_in_flight=1)
+        assert ocred == rerun.images
+        print(f"  rerun after one failed batch OCRed {rerun.images} of {args.pages} pages")
+
+    print(f"\nLocal backend, {args.local_pages} synthetic pages")
+    bench_local(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Finding the pages of an image directory: os.walk plus probing versus PageIndex.
+
+Fills a directory with empty "{prefix} (n).gif" and "(n)_1.gif" files, with
+a few pages missing, then times what ImageToHtml used to do at startup (count
+the files with os.walk, stat every index up to the count, stat every cover)
+against one os.scandir pass and against the cached page table. Also checks
+which pages each approach finds.
+
+    python benchmarks/BenchPageIndex.py --pages 5000 --gaps 25
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from PageIndex import load_page_table, page_index_path, scan_pages
+
+PREFIX = "Image"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--gaps", type=int, default=25, help="Pages left out of the directory")
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def make_directory(image_dir, pages, gaps):
+    missing = set(random.Random(0).sample(range(pages), gaps))
+    for n in range(pages):
+        if n in missing:
+            continue
+        for name in (f"{PREFIX} ({n}).gif", f"{PREFIX} ({n})_1.gif"):
+            open(os.path.join(image_dir, name), "wb").close()
+    # Old enough for the page table to be cached
+    past = time.time() - 60
+    os.utime(image_dir, (past, past))
+    return missing
+
+
+def walk_and_probe(image_dir):
+    """The previous ImageToHtml startup: count, then probe each index and cover."""
+    count = 0
+    for _, _, files in os.walk(image_dir):
+        for file in files:
+            if not file.endswith("1.gif"):
+                count += 1
+    image_paths = [
+        os.path.join(image_dir, f"{PREFIX} ({i}).gif")
+        for i in range(count)
+        if os.path.exists(os.path.join(image_dir, f"{PREFIX} ({i}).gif"))
+    ]
+    covers = [os.path.exists(os.path.join(image_dir, f"{PREFIX} ({i})_1.gif")) for i in range(len(image_paths))]
+    return image_paths, covers
+
+
+def from_table(image_dir, table):
+    pages = [page for page in table["pages"] if page["image"]]
+    return [os.path.join(image_dir, page["image"]) for page in pages]
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        image_dir = os.path.join(workdir, "Images GIF")
+        os.makedirs(image_dir)
+        missing = make_directory(image_dir, args.pages, args.gaps)
+        print(f"{args.pages} pages with covers, {len(missing)} pages missing, best of {args.repeat}")
+
+        walk_time, (walk_paths, _) = timed(lambda: walk_and_probe(image_dir), args.repeat)
+        scan_time, table = timed(lambda: scan_pages(image_dir, PREFIX), args.repeat)
+        load_page_table(image_dir, PREFIX)  # Writes the cache
+        assert os.path.exists(page_index_path(image_dir))
+        cached_time, cached = timed(lambda: load_page_table(image_dir, PREFIX), args.repeat)
+        assert cached == table
+
+        print(f"  os.walk + probing     {walk_time * 1000:8.1f} ms")
+        print(f"  os.scandir page table {scan_time * 1000:8.1f} ms")
+        print(f"  cached page table     {cached_time * 1000:8.1f} ms")
+
+        expected = [os.path.join(image_dir, f"{PREFIX} ({n}).gif") for n in range(args.pages) if n not in missing]
+        assert from_table(image_dir, table) == expected
+        assert table["gaps"] == sorted(n for n in missing if n < max(set(range(args.pages)) - missing))
+        print(f"  page table finds all {len(expected)} pages and the {len(table['gaps'])} gaps")
+        # The count of files stops the probing early when pages are missing
+        print(f"  os.walk + probing finds {len(walk_paths)} pages")
+
+        # Adding a page changes the directory mtime, so the table is rebuilt
+        open(os.path.join(image_dir, f"{PREFIX} ({args.pages}).gif"), "wb").close()
+        assert load_page_table(image_dir, PREFIX)["pages"][-1]["number"] == args.pages
+        print("  a new page invalidates the cached table")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Wall time and API calls of VideoSummary reruns with the ResultStore.
+
+Runs a batch of videos through process_videos with the stubs of
+BenchVideoPipeline: once cold, once more rewriting the Steps files from
+stored results (as after a change to combine_results), after one video
+changed, with force, and with a store too small to keep every result.
+
+    python benchmarks/BenchResultStore.py --videos 6 --transcribe 2 --analyze 3
+"""
+
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from BenchVideoPipeline import stub_local_steps
+from FakeGcs import FakeStorageClient
+from FakeVideoApis import FakeSpeechClient, FakeVideoIntelligenceClient
+
+import VideoSummary
+from ResultStore import ResultStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=6)
+    parser.add_argument("--download", type=float, default=1.0, help="Seconds per video download")
+    parser.add_argument("--extract", type=float, default=0.3, help="Seconds per audio extraction")
+    parser.add_argument("--transcribe", type=float, default=2.0, help="Seconds per transcription operation")
+    parser.add_argument("--analyze", type=float, default=3.0, help="Seconds per annotation operation")
+    args = parser.parse_args()
+    if args.videos < 2:
+        parser.error("--videos must be at least 2: one video is changed and the store is made too small for the rest")
+    return args
+
+
+def stub_download(args, contents):
+    """Like yt-dlp: a video already in Videos/ is not downloaded again."""
+
+    def download_video(video_url, output_path):
+        os.makedirs("Videos", exist_ok=True)
+        if not os.path.exists(output_path):
+            time.sleep(args.download)
+            with open(output_path, "wb") as f:
+                f.write(contents.get(video_url, video_url.encode() * 64))
+        return output_path
+
+    VideoSummary.download_video = download_video
+
+
+def run(label, videos, args, store, skip_existing=False):
+    clients = {
+        "storage": FakeStorageClient(latency=0.02),
+        "speech": FakeSpeechClient(args.transcribe),
+        "video": FakeVideoIntelligenceClient(args.analyze),
+    }
+    started = time.perf_counter()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        results, _ = VideoSummary.process_videos(videos, clients=clients, skip_existing=skip_existing, store=store)
+    wall = time.perf_counter() - started
+    errors = [line for line in log.getvalue().splitlines() if "rror" in line]
+    assert all(results.values()), "some videos failed:\n" + "\n".join(errors)
+    print(
+        f"  {label:<38} {wall:6.2f}s  {clients['speech'].calls:2} transcriptions,"
+        f" {clients['video'].calls:2} annotations, {clients['storage'].uploads:2} uploads"
+    )
+    return clients
+
+
+def same_steps(first, second):
+    names = sorted(os.listdir(first))
+    _, mismatch, errors = filecmp.cmpfiles(first, second, names, shallow=False)
+    return not mismatch and not errors
+
+
+def main():
+    args = parse_args()
+    stub_local_steps(args)
+    contents = {}
+    stub_download(args, contents)
+    videos = [{"video_id": f"video{n:02d}", "title": f"Recipe {n}: bread"} for n in range(args.videos)]
+    print(
+        f"{args.videos} videos: download {args.download:.1f}s, extract {args.extract:.1f}s,"
+        f" transcribe {args.transcribe:.1f}s, analyze {args.analyze:.1f}s"
+    )
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        store_path = os.path.join(workdir, "results.sqlite")
+        run("cold", videos, args, ResultStore(store_path))
+        shutil.copytree("Steps", "Steps.cold")
+
+        clients = run("rewrite Steps from stored results", videos, args, ResultStore(store_path))
+        assert clients["speech"].calls == clients["video"].calls == clients["storage"].uploads == 0
+        assert same_steps("Steps.cold", "Steps")
+
+        run("existing Steps skipped", videos, args, ResultStore(store_path), skip_existing=True)
+
+        # A re-uploaded video keeps its ID but not its content
+        changed = videos[0]
+        os.remove(f"Videos/{changed['video_id']}.mkv")
+        contents[f"https://www.youtube.com/watch?v={changed['video_id']}"] = b"re-encoded" * 64
+        clients = run("one video changed", videos, args, ResultStore(store_path))
+        assert clients["speech"].calls == clients["video"].calls == 1
+
+        clients = run("force", videos, args, ResultStore(store_path, force=True))
+        assert clients["speech"].calls == clients["video"].calls == args.videos
+        assert same_steps("Steps.cold", "Steps")
+
+        store = ResultStore(store_path)
+        size = os.path.getsize(store_path)
+        sizes = [row[0] for row in store.connect().execute("SELECT size FROM results")]
+        print(f"  store: {len(store)} results, {sum(sizes) / 1024:.0f} KB of JSON, {size / 1024:.0f} KB on disk")
+
+        # Room for the results of about a third of the videos: the least recently
+        # used are evicted as new ones arrive, and the ones in use are kept
+        recent = videos[-max(1, args.videos // 3):]
+        max_bytes = sum(sorted(sizes, reverse=True)[:2 * len(recent)])
+        small = ResultStore(os.path.join(workdir, "small.sqlite"), max_bytes=max_bytes)
+        run("store too small for every result", videos, args, small)
+        run(f"last {len(recent)} videos with that store", recent, args, small)
+        clients = run("and once more", recent, args, small)
+        kept = len(small)
+        assert kept < 2 * args.videos and clients["speech"].calls == clients["video"].calls == 0
+        print(f"  small store kept {kept} of {2 * args.videos} results, the most recently used")
+        os.chdir(REPO_ROOT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Start-up time benchmark using `python -X importtime`.
+
+Imports each script in a fresh interpreter, reports total import time and the
+slowest top-level imports, then times `NovelChapterCheck.py --dry-run`.
+
+    python benchmarks/BenchStartup.py --modules NovelChapterCheck VideoSummary
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT
+
+DUMMY_ENV = {
+    "KEYWORDS": "cultivation,system",
+    "CRAWL_URL": "http://127.0.0.1:9",
+    "STATUS_PORT": "0",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["NovelChapterCheck", "VideoSummary"])
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module, best is kept")
+    return parser.parse_args()
+
+
+def import_times(module, env):
+    """Return (total seconds, [(cumulative seconds, package)]) for module's direct imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Lines are printed children first, indented two spaces per nesting level
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        level = (len(package) - len(package.lstrip()) - 1) // 2
+        seconds = int(cumulative) / 1e6
+        if level == 0:
+            if package.strip() == module:
+                return seconds, children
+            children = []
+        elif level == 1:
+            children.append((seconds, package.strip()))
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def main():
+    args = parse_args()
+    env = dict(os.environ, **DUMMY_ENV)
+
+    for module in args.modules:
+        try:
+            runs = [import_times(module, env) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"\n== import {module} == failed: {e}")
+            continue
+        total, top_level = min(runs, key=lambda run: run[0])
+        print(f"\n== import {module} == {total * 1000:.0f} ms")
+        for seconds, package in sorted(top_level, reverse=True)[: args.top]:
+            print(f"  {seconds * 1000:8.1f} ms  {package}")
+
+    # End-to-end start-up of a dry run that never needs the Vertex AI SDK
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "novel_links.txt"), "w") as f:
+            f.write("http://127.0.0.1:9/novel/example\n")
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, os.path.join(REPO_ROOT, "NovelChapterCheck.py"), "--dry-run"],
+                cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL,
+            )
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"\n== NovelChapterCheck.py --dry-run == {best * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
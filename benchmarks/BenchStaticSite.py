@@ -0,0 +1,121 @@
+"""Compare ImageToHtml's static site build with the runtime viewer.
+
+Builds both for a synthetic chapter and reports build time, the cost of a
+one-page edit, and bytes and requests per page view for a reader going
+through the whole chapter. Images are left out: both serve the same files.
+The viewer's files are counted raw and gzipped per response (what a server
+compressing on the fly would send); the static site is counted from its
+precompressed variants.
+
+    python benchmarks/BenchStaticSite.py --pages 1000
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import os
+import random
+import re
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+
+os.environ.setdefault("IMAGE_PREFIX", "Image")
+import ImageToHtml
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    return parser.parse_args()
+
+
+def chapter(directory, count):
+    """Translated pages of a few short paragraphs each, shaped like saved_files."""
+    rng = random.Random(0)
+    words = "Luo Feng looked up at the sky and said nothing Boom the beast roared".split()
+    text_dir = os.path.join(directory, "ExtractedTexts")
+    os.makedirs(text_dir)
+    file_paths = []
+    for i in range(count):
+        text_path = os.path.join(text_dir, f"Page_{i + 1}.txt")
+        lines = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 15))) for _ in range(8)]
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        image = f"{directory}/Images GIF/${{getImagePrefix()}} ({i})_1.gif"
+        file_paths.append([text_path, image])
+    return file_paths
+
+
+def sizes(paths):
+    raw = compressed = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        raw += len(data)
+        compressed += len(gzip.compress(data, mtime=0))
+    return raw, compressed
+
+
+def timed_build(build):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = build()
+    return time.perf_counter() - started, result
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        file_paths = chapter(workdir, args.pages)
+
+        viewer_time, _ = timed_build(lambda: ImageToHtml.generate_dynamic_html(file_paths, workdir))
+        static_time, rebuilt = timed_build(lambda: ImageToHtml.build_static_site(file_paths, workdir))
+        rerun_time, rerun = timed_build(lambda: ImageToHtml.build_static_site(file_paths, workdir))
+        assert not any(rerun.values())
+
+        with open(file_paths[args.pages // 2][0], "a", encoding="utf-8") as f:
+            f.write("\nA new line.")
+        edit_time, edited = timed_build(lambda: ImageToHtml.build_static_site(file_paths, workdir))
+        assert len(edited["site_pages"]) == 1 and not edited["site_index"]
+
+        print(f"{args.pages} pages, static chunks of {ImageToHtml.STATIC_CHUNK_SIZE}")
+        print(f"  viewer build:              {viewer_time:6.2f}s")
+        print(f"  static build:              {static_time:6.2f}s ({len(rebuilt['site_pages'])} chunk files)")
+        print(f"  static rebuild, unchanged: {rerun_time:6.2f}s")
+        print(f"  static rebuild, one edit:  {edit_time:6.2f}s ({len(edited['site_pages'])} chunk rebuilt)")
+
+        # The viewer: index.html, the manifests and one text fetch per page
+        viewer_files = [os.path.join(workdir, "index.html")]
+        viewer_files += [
+            os.path.join(workdir, n) for n in os.listdir(workdir) if re.fullmatch(r"manifest(-\d+)?\.json", n)
+        ]
+        viewer_files += [text_path for text_path, _ in file_paths]
+        viewer_raw, viewer_gz = sizes(viewer_files)
+
+        # The static site: the stylesheet and every chunk, as served precompressed
+        site_dir = os.path.join(workdir, ImageToHtml.SITE_DIR)
+        static_files = [os.path.join(site_dir, "site.css")]
+        static_files += [
+            os.path.join(site_dir, n) for n in os.listdir(site_dir) if re.fullmatch(r"pages-\d+\.html", n)
+        ]
+        static_raw = sum(os.path.getsize(path) for path in static_files)
+        static_gz = sum(os.path.getsize(f"{path}.gz") for path in static_files)
+
+        print("\nPer page view, reading the whole chapter (images excluded)")
+        print(f"  {'':<8} {'requests':>9} {'raw bytes':>10} {'gzip bytes':>11}")
+        for label, files, raw, compressed in (
+            ("viewer", viewer_files, viewer_raw, viewer_gz),
+            ("static", static_files, static_raw, static_gz),
+        ):
+            print(
+                f"  {label:<8} {len(files) / args.pages:>9.2f} {raw / args.pages:>10.0f}"
+                f" {compressed / args.pages:>11.0f}"
+            )
+        print(f"  brotli variants: {'written' if os.path.exists(static_files[0] + '.br') else 'brotli not installed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Peak RSS and wall time of ImageDownload.download_and_combine_images on tall pages.
+
+Serves pages of 60 JPEG tiles from a local server and stitches one page per
+run, each run in its own process so peak RSS is measured separately:
+
+  previous  serial downloads into BytesIO, every tile decoded, then one canvas
+  canvas    concurrent downloads to disk, tiles pasted one at a time
+  strips    concurrent downloads to disk, rows streamed to the PNG file
+
+All modes must produce the same pixels.
+
+    python benchmarks/BenchStitch.py --tiles 60 --latency 0.05
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT, peak_rss_mb
+from FakeComicSite import FakeComicSite
+
+MODES = ["previous", "canvas", "strips"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tiles", type=int, default=60)
+    parser.add_argument("--tile-width", type=int, default=800)
+    parser.add_argument("--tile-height", type=int, default=1200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per tile request")
+    parser.add_argument("--run", nargs=3, metavar=("MODE", "BASE_URL", "OUTPUT"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def previous_download_and_combine(image_urls, output_name, session):
+    """The stitcher as it was: all tiles in memory, decoded, then one canvas."""
+    from PIL import Image
+
+    images = []
+    for url in image_urls:
+        response = session.get(url, stream=True)
+        response.raise_for_status()
+        images.append(Image.open(io.BytesIO(response.content)))
+    combined_image = Image.new("RGB", (max(i.width for i in images), sum(i.height for i in images)))
+    y_offset = 0
+    for img in images:
+        combined_image.paste(img, (0, y_offset))
+        y_offset += img.height
+    combined_image.save(output_name, quality=95, format="PNG")
+
+
+def run_mode(args, mode, base_url, output):
+    """Child process: stitch one page, then report wall time and peak RSS as JSON."""
+    import ImageDownload
+
+    urls = [f"{base_url}/tiles/0/Image_{k}.jpg" for k in range(args.tiles)]
+    session = ImageDownload.new_download_session()
+    baseline_rss = peak_rss_mb()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "previous":
+            previous_download_and_combine(urls, output, session)
+        else:
+            ImageDownload.download_and_combine_images(urls, output, session, strips=mode == "strips")
+    wall = time.perf_counter() - started
+    print(json.dumps({"wall": wall, "peak": peak_rss_mb(), "baseline": baseline_rss}))
+
+
+def pixel_digest(path):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return image.size, hashlib.sha256(image.convert("RGB").tobytes()).hexdigest()
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        run_mode(args, *args.run)
+        return
+
+    raw_mb = args.tiles * args.tile_width * args.tile_height * 3 / 1024 / 1024
+    print(
+        f"{args.tiles} tiles of {args.tile_width}x{args.tile_height}"
+        f" ({raw_mb:.0f} MB of RGB pixels per page), {args.latency:.2f}s per tile request"
+    )
+    with FakeComicSite(
+        pages=1, tiles_per_page=args.tiles, tile_width=args.tile_width,
+        tile_height=args.tile_height, latency=args.latency,
+    ) as site, tempfile.TemporaryDirectory() as workdir:
+        for k in range(args.tiles):
+            site.tile(0, k)  # Draw the tiles before timing
+        digests = {}
+        for mode in MODES:
+            output = os.path.join(workdir, f"{mode}.gif")
+            result = subprocess.run(
+                [sys.executable, __file__, "--tiles", str(args.tiles), "--run", mode, site.base_url, output],
+                cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+            )
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            digests[mode] = pixel_digest(output)
+            print(
+                f"  {mode:<9} {stats['wall']:6.2f}s  peak RSS {stats['peak']:7.0f} MB"
+                f" ({stats['peak'] - stats['baseline']:+.0f} MB over import),"
+                f" {os.path.getsize(output) / 1024 / 1024:6.1f} MB file"
+            )
+        assert len(set(digests.values())) == 1, "stitched pixels differ between modes"
+        print("  all modes produced identical pixels")
+
+
+if __name__ == "__main__":
+    main()
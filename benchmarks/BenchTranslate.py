@@ -0,0 +1,125 @@
+"""Characters billed by ImageToHtml translation, before and after batching and caching.
+
+"Before" is what the per-page translate_text sent: every line of every page,
+blanks and repeats included, one request per page. "After" runs
+translate_pages over the same corpus with a stub client, then reruns it to
+show what the translation memory saves.
+
+    python benchmarks/BenchTranslate.py --raw-dir "Gao Wu, Swallowed Star CG/RawTexts"
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import threading
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+
+import ImageToHtml
+from TranslationMemory import TranslationMemory
+
+
+class FakeTranslation:
+    def __init__(self, text):
+        self.translated_text = text
+
+
+class FakeTranslateResponse:
+    def __init__(self, translations):
+        self.translations = translations
+
+
+class FakeTranslationClient:
+    """Counts requests, segments and billed characters instead of translating."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.segments = 0
+        self.characters = 0
+
+    def translate_text(self, contents, target_language_code, parent):
+        with self.lock:
+            self.requests += 1
+            self.segments += len(contents)
+            self.characters += sum(len(c) for c in contents)
+        return FakeTranslateResponse([FakeTranslation(f"[{target_language_code}] {c}") for c in contents])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--raw-dir", default=os.path.join(ImageToHtml.dir_path, "RawTexts"),
+        help="Directory of Page_N.txt OCR outputs",
+    )
+    parser.add_argument("--synthetic-pages", type=int, default=800, help="Used if raw-dir is missing")
+    return parser.parse_args()
+
+
+def synthetic_corpus(count):
+    """Pages with the repetition typical of comics: names, sound effects and headers."""
+    rng = random.Random(0)
+    names = ["罗峰", "徐欣", "洪", "雷神", "巴巴塔"]
+    effects = ["轰！", "砰！", "嗖——", "哈哈哈", "……"]
+    pages = []
+    for i in range(count):
+        lines = [f"第{i // 20 + 1}话", ""]
+        for _ in range(rng.randint(4, 12)):
+            kind = rng.random()
+            if kind < 0.3:
+                lines.append(rng.choice(effects))
+            elif kind < 0.5:
+                lines.append(rng.choice(names))
+            else:
+                lines.append("".join(chr(0x4E00 + rng.randrange(2000)) for _ in range(rng.randint(6, 30))))
+        lines.append("吞噬星空")
+        pages.append("\n".join(lines))
+    return pages
+
+
+def load_corpus(raw_dir):
+    files = [f for f in os.listdir(raw_dir) if re.fullmatch(r"Page_\d+\.txt", f)]
+    files.sort(key=lambda f: int(f[5:-4]))
+    corpus = []
+    for name in files:
+        with open(os.path.join(raw_dir, name), "r", encoding="utf-8") as f:
+            text = f.read()
+        if text:
+            corpus.append(text)
+    return corpus
+
+
+def main():
+    args = parse_args()
+    if os.path.isdir(args.raw_dir):
+        corpus = load_corpus(args.raw_dir)
+        print(f"{len(corpus)} pages from {args.raw_dir}")
+    else:
+        corpus = synthetic_corpus(args.synthetic_pages)
+        print(f"{args.raw_dir} not found, using {len(corpus)} synthetic pages")
+
+    before_chars = sum(len(line) for text in corpus for line in text.split("\n"))
+    before_segments = sum(len(text.split("\n")) for text in corpus)
+    print(f"  before:     {len(corpus):>6} requests {before_segments:>8} segments {before_chars:>10} chars")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        memory = TranslationMemory(os.path.join(workdir, "tm.sqlite"))
+        for run in ("batched", "rerun"):
+            client = FakeTranslationClient()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = ImageToHtml.translate_pages(corpus, "en", client, memory)
+            assert all(results), "every page should translate"
+            print(
+                f"  {run + ':':<11} {client.requests:>6} requests {client.segments:>8} segments"
+                f" {client.characters:>10} chars"
+                f" ({100 * (1 - client.characters / before_chars):.0f}% fewer billed)"
+            )
+        print(f"  translation memory holds {len(memory)} segments")
+
+
+if __name__ == "__main__":
+    main()
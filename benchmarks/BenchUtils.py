@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Make the top-level scripts importable when a benchmark is run directly
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def percentile(values, q):
+    """Return the q-th percentile (0-100) of values using nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or its waited-for children) in MB."""
+    if not children:
+        # ru_maxrss survives fork+exec, so a child started by a big parent
+        # reports the parent's peak; VmHWM belongs to this process alone
+        try:
+            with open("/proc/self/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def timed(func, latencies):
+    """Wrap func so each call's duration is appended to latencies."""
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    return wrapper
+
+
+def print_report(name, wall, count, latencies, unit="pages"):
+    """Print throughput, latency percentiles and peak RSS for one benchmark stage."""
+    rate = count / wall if wall else 0.0
+    print(f"\n== {name} ==")
+    print(f"  {count} {unit} in {wall:.2f}s -> {rate:.1f} {unit}/sec")
+    if latencies:
+        print(
+            f"  latency p50 {percentile(latencies, 50) * 1000:.1f} ms,"
+            f" p99 {percentile(latencies, 99) * 1000:.1f} ms"
+        )
+    print(f"  peak RSS {peak_rss_mb():.1f} MB")
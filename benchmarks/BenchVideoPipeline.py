@@ -0,0 +1,148 @@
+"""Wall time of VideoSummary's concurrent video scheduler against the old sequential loop.
+
+Runs a batch of videos through both with stub downloads and audio extraction
+(sleeps that write small files), FakeGcs for uploads, and the Speech and
+Video Intelligence stand-ins from FakeVideoApis. Checks that both write the
+same Steps files and shows how the stages overlapped.
+
+    python benchmarks/BenchVideoPipeline.py --videos 6 --transcribe 2 --analyze 3
+"""
+
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from FakeGcs import FakeStorageClient
+from FakeVideoApis import FakeSpeechClient, FakeVideoIntelligenceClient
+
+import VideoSummary
+from ResultStore import ResultStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=6)
+    parser.add_argument("--download", type=float, default=1.0, help="Seconds per video download")
+    parser.add_argument("--extract", type=float, default=0.3, help="Seconds per audio extraction")
+    parser.add_argument("--transcribe", type=float, default=2.0, help="Seconds per transcription operation")
+    parser.add_argument("--analyze", type=float, default=3.0, help="Seconds per annotation operation")
+    parser.add_argument("--video-workers", type=int, default=VideoSummary.VIDEO_WORKERS)
+    return parser.parse_args()
+
+
+def stub_local_steps(args):
+    """Replace yt-dlp and pydub with sleeps that write placeholder files."""
+
+    def download_video(video_url, output_path):
+        os.makedirs("Videos", exist_ok=True)
+        time.sleep(args.download)
+        with open(output_path, "wb") as f:
+            f.write(video_url.encode() * 64)
+        return output_path
+
+    def extract_audio(video_path, audio_path, *options):
+        time.sleep(args.extract)
+        with open(audio_path, "wb") as f:
+            f.write(b"RIFF" + video_path.encode() * 16)
+        return [(audio_path, 0.0)]
+
+    VideoSummary.download_video = download_video
+    VideoSummary.extract_audio = extract_audio
+
+    try:
+        import nltk
+
+        nltk.data.find("tokenizers/punkt_tab")
+    except LookupError:
+        # No tokenizer data offline: combine with a plain sentence split
+        combine_results = VideoSummary.combine_results
+
+        def combine_offline(transcription, video_analysis):
+            import nltk.tokenize
+
+            nltk.tokenize.sent_tokenize = lambda text: [s + "." for s in text.split(".") if s.strip()]
+            VideoSummary.ensure_nltk_data = lambda: None
+            return combine_results(transcription, video_analysis)
+
+        VideoSummary.combine_results = combine_offline
+
+
+def sequential(videos, clients):
+    """The previous VideoSummary.main loop, one stage after another."""
+    for video in videos:
+        video_path = f"Videos/{video['video_id']}.mkv"
+        audio_path = f"Videos/{video['video_id']}.wav"
+        downloaded_path = VideoSummary.download_video(video["video_id"], video_path)
+        ((extracted_audio, _),) = VideoSummary.extract_audio(downloaded_path, audio_path)
+        gcs_uri_audio = VideoSummary.upload_to_gcs(
+            VideoSummary.GCS_BUCKET, extracted_audio, f"{video['video_id']}.wav", clients["storage"]
+        )
+        transcription = VideoSummary.transcribe_audio(gcs_uri_audio, clients["speech"])
+        gcs_uri_video = VideoSummary.upload_to_gcs(
+            VideoSummary.GCS_BUCKET, downloaded_path, f"{video['video_id']}.mkv", clients["storage"]
+        )
+        video_analysis = VideoSummary.analyze_video(gcs_uri_video, clients["video"])
+        VideoSummary.write_steps(video, VideoSummary.combine_results(transcription, video_analysis))
+
+
+def overlap(timings):
+    """Largest number of stages running at the same moment, per stage name."""
+    events = sorted([(start, 1, stage) for _, stage, start, _ in timings] + [(end, -1, stage) for _, stage, _, end in timings])
+    running, peak = {}, {}
+    for _, delta, stage in events:
+        running[stage] = running.get(stage, 0) + delta
+        peak[stage] = max(peak.get(stage, 0), running[stage])
+    return peak
+
+
+def main():
+    args = parse_args()
+    stub_local_steps(args)
+    videos = [{"video_id": f"video{n:02d}", "title": f"Recipe {n}: bread"} for n in range(args.videos)]
+    print(
+        f"{args.videos} videos: download {args.download:.1f}s, extract {args.extract:.1f}s,"
+        f" transcribe {args.transcribe:.1f}s, analyze {args.analyze:.1f}s"
+    )
+
+    with tempfile.TemporaryDirectory() as workdir:
+        walls = {}
+        for mode in ("sequential", "scheduler"):
+            os.makedirs(os.path.join(workdir, mode))
+            os.chdir(os.path.join(workdir, mode))
+            clients = {
+                "storage": FakeStorageClient(latency=0.02),
+                "speech": FakeSpeechClient(args.transcribe),
+                "video": FakeVideoIntelligenceClient(args.analyze),
+            }
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if mode == "sequential":
+                    sequential(videos, clients)
+                else:
+                    results, limits = VideoSummary.process_videos(
+                        videos, video_workers=args.video_workers, clients=clients,
+                        store=ResultStore(os.path.join(workdir, "results.sqlite")),
+                    )
+            walls[mode] = time.perf_counter() - started
+            os.chdir(REPO_ROOT)
+            print(f"  {mode:<11} {walls[mode]:6.2f}s")
+
+        assert all(results.values()), "some videos failed"
+        names = sorted(os.listdir(os.path.join(workdir, "sequential", "Steps")))
+        assert len(names) == args.videos
+        _, mismatch, errors = filecmp.cmpfiles(
+            os.path.join(workdir, "sequential", "Steps"), os.path.join(workdir, "scheduler", "Steps"), names, shallow=False
+        )
+        assert not mismatch and not errors, f"scheduler wrote different steps: {mismatch or errors}"
+        print(f"  both wrote the same {len(names)} Steps files; {walls['sequential'] / walls['scheduler']:.1f}x faster")
+        peaks = overlap(limits.timings)
+        print("  most at once: " + ", ".join(f"{stage} {peaks[stage]}" for stage in VideoSummary.STAGE_CONCURRENCY))
+
+
+if __name__ == "__main__":
+    main()
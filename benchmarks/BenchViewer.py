@@ -0,0 +1,110 @@
+"""Check the size of the viewer ImageToHtml.generate_dynamic_html writes.
+
+Generates viewers for chapters of different lengths and compares index.html
+with the page list the previous generator inlined into it, as
+"let files = [...];", which alone grew with every page.
+index.html must stay small and the same size whatever the page count; the
+page list lives in manifest chunks fetched on demand. With node installed the
+viewer script is also syntax-checked.
+
+    python benchmarks/BenchViewer.py --pages 100 1000 10000
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+
+os.environ.setdefault("IMAGE_PREFIX", "Image")
+import ImageToHtml
+
+MAX_INDEX_BYTES = 16 * 1024
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--chunk-size", type=int, default=ImageToHtml.VIEWER_CHUNK_SIZE)
+    return parser.parse_args()
+
+
+def inline_list_size(file_paths):
+    """Bytes of the page list the previous generator wrote into index.html."""
+    return len(f"let files = {file_paths};".encode("utf-8"))
+
+
+def chapter(directory, count):
+    """Page entries shaped like process_images_to_texts builds them, with real text files."""
+    text_dir = os.path.join(directory, "Translated")
+    os.makedirs(text_dir)
+    file_paths = []
+    for i in range(count):
+        text_path = os.path.join(text_dir, f"Page_{i}.txt")
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(f"Page {i}\n\nLuo Feng looked up.\nBoom!\n" * 5)
+        image = f"{directory}/Images GIF/${{getImagePrefix()}} ({i})_1.gif"
+        file_paths.append([text_path, image])
+    return file_paths
+
+
+def directory_size(directory, pattern):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for name in os.listdir(directory)
+        if re.fullmatch(pattern, name)
+    )
+
+
+def check_script(html_path):
+    node = shutil.which("node")
+    if not node:
+        return "node not found, script not checked"
+    with open(html_path, "r", encoding="utf-8") as f:
+        script = re.findall(r"<script>(.*?)</script>", f.read(), re.S)[0]
+    with tempfile.NamedTemporaryFile("w", suffix=".js", delete=False) as f:
+        f.write(script)
+    try:
+        subprocess.run([node, "--check", f.name], check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise AssertionError(f"viewer script does not parse:\n{e.stderr}")
+    finally:
+        os.remove(f.name)
+    return "viewer script parses"
+
+
+def main():
+    args = parse_args()
+    index_sizes = set()
+    script_check = None
+
+    print(f"{'pages':>7} {'old list':>10} {'new index':>10} {'manifests':>10} {'bundles':>10}")
+    for count in args.pages:
+        with tempfile.TemporaryDirectory() as workdir:
+            file_paths = chapter(workdir, count)
+
+            old_size = inline_list_size(file_paths)
+
+            html_path = ImageToHtml.generate_dynamic_html(file_paths, workdir, args.chunk_size, bundle=True)
+            assert html_path, "generator failed"
+            index_size = os.path.getsize(html_path)
+            index_sizes.add(index_size)
+            manifests = directory_size(workdir, r"manifest(-\d+)?\.json")
+            bundles = directory_size(workdir, r"bundle-\d+\.json\.gz")
+            chunks = len([n for n in os.listdir(workdir) if re.fullmatch(r"manifest-\d+\.json", n)])
+            assert chunks == -(-count // args.chunk_size)
+
+            print(f"{count:>7} {old_size:>10,} {index_size:>10,} {manifests:>10,} {bundles:>10,}")
+            assert index_size < MAX_INDEX_BYTES, f"index.html is {index_size} bytes"
+            script_check = script_check or check_script(html_path)
+
+    # Page count only changes the manifest URL's digits, never the page itself
+    assert len(index_sizes) == 1, f"index.html size depends on page count: {sorted(index_sizes)}"
+    print(script_check)
+
+
+if __name__ == "__main__":
+    main()
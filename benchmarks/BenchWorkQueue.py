@@ -0,0 +1,143 @@
+"""Scaling benchmark for NovelChapterCheck's work-queue mode.
+
+Starts the fake novel site, queues its novels in a SQLite work queue and runs
+1..8 worker processes against it, reporting novels/sec and speedup per worker
+count. Each worker is a separate process, like a container replica. It first
+checks that a worker whose lease expired cannot complete the task.
+
+    python benchmarks/BenchWorkQueue.py --workers 1 2 4 8 --novels 80
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT
+from FakeLLM import FakeGenerativeModel
+from FakeNovelSite import KEYWORDS, FakeNovelSite
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--novels", type=int, default=80)
+    parser.add_argument("--chapters", type=int, default=5, help="Chapters per novel")
+    parser.add_argument("--latency", type=float, default=0.01, help="Server latency in seconds")
+    parser.add_argument("--request-delay", type=float, default=0.02, help="Crawler REQUEST_DELAY")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Fake LLM latency")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker process")
+    parser.add_argument("--run-worker", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_worker(args):
+    """Entry point of a worker subprocess: swap in the fake LLM and drain the queue."""
+    import NovelChapterCheck
+    from WorkQueue import WorkQueue
+
+    FakeGenerativeModel.reset(latency=args.llm_latency)
+    NovelChapterCheck.model = FakeGenerativeModel(NovelChapterCheck.MODEL_NAME)
+    NovelChapterCheck.run_worker(WorkQueue(args.run_worker), args.threads)
+
+
+def run_scenario(site, args, num_workers):
+    with tempfile.TemporaryDirectory() as workdir:
+        queue_path = os.path.join(workdir, "queue.sqlite")
+        with open(os.path.join(workdir, "novel_links.txt"), "w") as f:
+            for slug in site.novel_slugs()[: args.novels]:
+                f.write(f"{site.base_url}{slug}\n")
+
+        env = dict(os.environ)
+        env.update(
+            {
+                "CRAWL_URL": site.base_url,
+                "KEYWORDS": ",".join(KEYWORDS),
+                "PROMPT_QUESTION": "Does this chapter contain the keywords? Answer yes or no.",
+                "REQUEST_DELAY": str(args.request_delay),
+                "STATUS_PORT": "0",
+                "PYTHONPATH": os.pathsep.join([REPO_ROOT, os.path.dirname(__file__)]),
+            }
+        )
+        subprocess.run(
+            [sys.executable, os.path.join(REPO_ROOT, "NovelChapterCheck.py"),
+             "--queue", queue_path, "--enqueue"],
+            cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+
+        started = time.perf_counter()
+        workers = [
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--run-worker", queue_path,
+                 "--threads", str(args.threads), "--llm-latency", str(args.llm_latency)],
+                cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+            )
+            for _ in range(num_workers)
+        ]
+        for worker in workers:
+            worker.wait()
+        wall = time.perf_counter() - started
+
+        subprocess.run(
+            [sys.executable, os.path.join(REPO_ROOT, "NovelChapterCheck.py"),
+             "--queue", queue_path, "--merge"],
+            cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+
+        from WorkQueue import WorkQueue
+
+        queue = WorkQueue(queue_path)
+        first_claim, last_finish = queue.timings()
+        done = queue.counts()["done"]
+        # Measure from the first claim so interpreter start-up is not counted
+        return done, wall, last_finish - first_claim
+
+
+def check_lost_lease():
+    """A worker whose lease ran out and went to another worker cannot complete the task."""
+    from WorkQueue import WorkQueue
+
+    with tempfile.TemporaryDirectory() as workdir:
+        queue = WorkQueue(os.path.join(workdir, "queue.sqlite"), lease_seconds=0.05)
+        queue.enqueue(["novel"])
+        assert queue.claim("slow") == "novel"
+        time.sleep(0.1)
+        assert not queue.complete("slow", "novel", "expired"), "completed on an expired lease"
+        assert queue.claim("fast") == "novel"
+        assert not queue.complete("slow", "novel", "stale"), "completed another worker's task"
+        assert queue.complete("fast", "novel", "fresh")
+        assert list(queue.iter_results()) == ["fresh"] and queue.counts()["done"] == 1
+    print("expired leases cannot complete tasks")
+
+
+def main():
+    args = parse_args()
+    if args.run_worker:
+        run_worker(args)
+        return
+
+    check_lost_lease()
+
+    site = FakeNovelSite(
+        listing_pages=max(1, args.novels // 20 + 1),
+        novels_per_page=20,
+        chapters_per_novel=args.chapters,
+        latency=args.latency,
+    )
+    with site:
+        baseline = None
+        print(f"{'workers':>8} {'novels':>7} {'wall s':>8} {'work s':>8} {'novels/s':>9} {'speedup':>8}")
+        for num_workers in args.workers:
+            done, wall, work = run_scenario(site, args, num_workers)
+            rate = done / work if work else 0.0
+            baseline = baseline or rate
+            print(
+                f"{num_workers:>8} {done:>7} {wall:>8.2f} {work:>8.2f}"
+                f" {rate:>9.2f} {rate / baseline:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Requests and wall time of VideoSummary's YouTube metadata lookups.
+
+Looks up a few hundred videos, read from an IDs file and a playlist, with
+FakeYouTube: the previous single videos.list call, then cold, cached,
+partly expired and expired-cache runs of the batched lookups. Then checks that
+process_videos skips videos whose Steps file exists.
+
+    python benchmarks/BenchYouTubeMetadata.py --videos 400 --latency 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import string
+import tempfile
+import time
+
+from BenchUtils import REPO_ROOT  # noqa: F401  (puts the scripts on sys.path)
+from FakeYouTube import FakeYouTubeClient
+
+import VideoSummary
+import YouTubeMetadata
+from ResultStore import ResultStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per API request")
+    return parser.parse_args()
+
+
+def random_ids(count, seed=0):
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "-_"
+    return ["".join(rng.choice(alphabet) for _ in range(11)) for _ in range(count)]
+
+
+def previous_fetch_video_details(client, video_ids):
+    """fetch_video_details before YouTubeMetadata: one request for every ID."""
+    response = client.videos().list(part="snippet", id=",".join(video_ids)).execute()
+    return [{"title": item["snippet"]["title"], "video_id": item["id"]} for item in response.get("items", [])]
+
+
+def timed_lookup(label, client, video_ids, cache, workers):
+    client.reset_counters()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        details = YouTubeMetadata.fetch_video_details(video_ids, lambda: client, cache, workers)
+    wall = time.perf_counter() - started
+    print(
+        f"  {label:<30} {wall:6.2f}s {client.requests:4} requests ({client.not_modified} x 304),"
+        f" {client.max_in_flight} in flight, {len(details)} videos"
+    )
+    return details
+
+
+def main():
+    args = parse_args()
+    ids = random_ids(args.videos + 5)
+    titles = {video_id: f"How to bake bread, part {n}" for n, video_id in enumerate(ids[:args.videos])}
+    listed, playlist = ids[: args.videos // 2] + ids[-5:], ids[args.videos // 2:args.videos]
+    client = FakeYouTubeClient(titles, {"PLbread": playlist}, latency=args.latency)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ids_file = os.path.join(workdir, "ids.txt")
+        with open(ids_file, "w", encoding="utf-8") as f:
+            f.write("# Bread videos\n")
+            for n, video_id in enumerate(listed):
+                f.write(f"https://www.youtube.com/watch?v={video_id}&t=10\n" if n % 2 else f"{video_id}\n")
+        video_ids = YouTubeMetadata.read_video_ids(ids_file)
+        video_ids += YouTubeMetadata.playlist_video_ids(client, "PLbread")
+        assert video_ids == listed + playlist
+        print(f"{len(video_ids)} IDs from a file and a playlist (5 do not exist), {args.latency:.2f}s per request")
+
+        try:
+            previous_fetch_video_details(client, video_ids)
+        except Exception as e:
+            print(f"  previous single request: {e.reason}")
+
+        cache_path = os.path.join(workdir, "youtube_cache.sqlite")
+        sequential = timed_lookup(
+            "50-ID pages, one at a time", client, video_ids,
+            YouTubeMetadata.MetadataCache(os.path.join(workdir, "sequential.sqlite")), 1,
+        )
+        cache = YouTubeMetadata.MetadataCache(cache_path)
+        cold = timed_lookup("concurrent pages, empty cache", client, video_ids, cache, 4)
+        assert cold == sequential and len(cold) == args.videos
+        assert [video["video_id"] for video in cold] == [v for v in video_ids if v in titles]
+
+        warm = timed_lookup("rerun, cached", client, video_ids, cache, 4)
+        assert warm == cold and client.requests == 0
+
+        # A few snippets went stale: only their pages are revalidated, with the ETags of the cold run
+        conn = cache.connect()
+        with conn:
+            conn.executemany("UPDATE videos SET fetched = 0 WHERE video_id = ?", [(v,) for v in video_ids[::97]])
+        partial = timed_lookup("rerun, a few snippets expired", client, video_ids, cache, 4)
+        assert partial == cold and 0 < client.requests < len(video_ids) / 50
+        assert client.not_modified == client.requests, "unchanged pages should answer 304"
+
+        cache.ttl = 0  # Everything is stale: revalidate with ETags
+        client.titles[playlist[0]] = "How to bake bread, part 1 (updated)"
+        expired = timed_lookup("rerun, expired cache", client, video_ids, cache, 4)
+        changed = [video for video in expired if video["video_id"] == playlist[0]]
+        assert changed[0]["title"].endswith("(updated)")
+        assert client.not_modified == client.requests - 1, "only the changed page should be sent again"
+
+        # Downstream stages skip videos whose Steps file exists
+        os.chdir(workdir)
+        done = expired[:3]
+        for video in done:
+            VideoSummary.write_steps(video, [])
+        attempted = []
+        VideoSummary.download_video = lambda url, path: attempted.append(url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            VideoSummary.process_videos(expired[:10], store=ResultStore(os.path.join(workdir, "results.sqlite")))
+        os.chdir(REPO_ROOT)
+        assert len(attempted) == 7
+        print(f"  process_videos skipped the {len(done)} videos with Steps files and started the other 7")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+
+class FakeComicSite:
+    """Local HTTP server for ImageDownload: chapter pages made of JPEG tiles.
+
+    /chapter/N is an HTML page whose <img> tags point at the tiles of page N,
+    served from /tiles/N/K.jpg, and at a cover image /covers/N.jpg (the
+    "website" image ImageDownload saves as "_1.gif"). Images are drawn once
+    and cached, so every request for one returns the same bytes.
+
+    Images carry an ETag and answer If-None-Match with 304. With
+    repeat_every=N, every Nth page redraws the previous page's tiles at a
+    lower JPEG quality: a re-encoded duplicate under different URLs.
+
+    A js_rate share of chapters list their tiles only in a script, the way
+    pages that build the reader client-side do. FakeDriver sends an
+    X-Fake-Browser header and gets the DOM as it is after the script ran.
+    """
+
+    def __init__(
+        self,
+        pages=5,
+        tiles_per_page=60,
+        tile_width=800,
+        tile_height=1200,
+        latency=0.0,
+        js_rate=0.0,
+        repeat_every=0,
+        image_prefix="Image",
+        seed=0,
+        port=0,
+    ):
+        self.pages = pages
+        self.tiles_per_page = tiles_per_page
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.latency = latency
+        self.js_rate = js_rate
+        self.repeat_every = repeat_every
+        self.not_modified = 0
+        self.image_prefix = image_prefix
+        self.seed = seed
+        self.port = port
+        self.lock = threading.Lock()
+        self.tiles = {}
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tile_url(self, page, k):
+        return f"{self.base_url}/tiles/{page}/{self.image_prefix}_{k}.jpg"
+
+    def tile_urls(self, page):
+        return [self.tile_url(page, k) for k in range(self.tiles_per_page)]
+
+    def tile(self, page, k):
+        """JPEG bytes of one tile: a panel gradient with a speech bubble."""
+        key = (page, k)
+        with self.lock:
+            if key in self.tiles:
+                return self.tiles[key]
+        quality = 85
+        source_page = page
+        if self.repeat_every and page % self.repeat_every == self.repeat_every - 1 and page > 0:
+            source_page, quality = page - 1, 70
+        rng = random.Random(hash((self.seed, source_page, k)))
+        image = Image.new("RGB", (self.tile_width, self.tile_height), "white")
+        draw = ImageDraw.Draw(image)
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        for row in range(0, self.tile_height, 8):
+            shade = tuple(int(c * (1 - row / self.tile_height / 2)) for c in colour)
+            draw.rectangle([0, row, self.tile_width, row + 7], fill=shade)
+        for _ in range(6):
+            # Figures and scenery, so tiles differ in structure and not only in colour
+            w, h = rng.randrange(self.tile_width // 8, self.tile_width // 3), rng.randrange(self.tile_height // 8, self.tile_height // 3)
+            x, y = rng.randrange(self.tile_width - w), rng.randrange(self.tile_height - h)
+            fill = tuple(rng.randrange(256) for _ in range(3))
+            (draw.rectangle if rng.random() < 0.5 else draw.ellipse)([x, y, x + w, y + h], fill=fill)
+        bubble_width, bubble_height = min(300, self.tile_width // 2), min(150, self.tile_height // 2)
+        x = rng.randrange(self.tile_width - bubble_width)
+        y = rng.randrange(self.tile_height - bubble_height)
+        draw.ellipse([x, y, x + bubble_width, y + bubble_height], fill="white", outline="black", width=3)
+        draw.text((x + 10, y + bubble_height // 2 - 5), f"Page {source_page}, tile {k}", fill="black")
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        with self.lock:
+            self.tiles[key] = buffer.getvalue()
+        return self.tiles[key]
+
+    def cover_url(self, page):
+        return f"{self.base_url}/covers/{page}.jpg"
+
+    def needs_script(self, page):
+        return self.js_rate > 0 and random.Random(zlib.crc32(f"{self.seed}:js:{page}".encode("utf-8"))).random() < self.js_rate
+
+    def chapter_page(self, page, rendered=False):
+        if self.needs_script(page) and not rendered:
+            return (
+                "<html><body><div class='reader'></div><script>"
+                f"const tiles = {json.dumps(self.tile_urls(page))};"
+                "document.querySelector('.reader').innerHTML ="
+                " tiles.map(src => `<img src=\"${src}\">`).join('');"
+                "</script></body></html>"
+            )
+        images = "".join(f'<img src="{url}">' for url in self.tile_urls(page))
+        return (
+            f"<html><body><img class='cover' src='{self.cover_url(page)}'>"
+            f"<div class='reader'>{images}</div></body></html>"
+        )
+
+    def render(self, path, rendered=False):
+        """Return (status, content type, body) for a request path."""
+        parts = path.strip("/").split("/")
+        try:
+            if len(parts) == 2 and parts[0] == "chapter" and 0 <= int(parts[1]) < self.pages:
+                body = self.chapter_page(int(parts[1]), rendered)
+                return 200, "text/html; charset=utf-8", body.encode("utf-8")
+            if len(parts) == 2 and parts[0] == "covers" and 0 <= int(parts[1].split(".")[0]) < self.pages:
+                return 200, "image/jpeg", self.tile(int(parts[1].split(".")[0]), -1)
+            if len(parts) == 3 and parts[0] == "tiles":
+                page, k = int(parts[1]), int(parts[2].rsplit("_", 1)[1].split(".")[0])
+                if 0 <= page < self.pages and 0 <= k < self.tiles_per_page:
+                    return 200, "image/jpeg", self.tile(page, k)
+        except ValueError:
+            pass
+        return 404, "text/plain", b"Not found"
+
+    def start(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+                rendered = self.headers.get("X-Fake-Browser") == "1"
+                status, content_type, data = site.render(self.path.split("?")[0], rendered)
+                etag = f'"{zlib.crc32(data):08x}"' if content_type == "image/jpeg" else None
+                if etag and self.headers.get("If-None-Match") == etag:
+                    status, data = 304, b""
+                    with site.lock:
+                        site.not_modified += 1
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+                with site.lock:
+                    site.request_count += 1
+                    site.bytes_sent += len(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
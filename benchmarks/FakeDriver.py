@@ -0,0 +1,66 @@
+import threading
+import time
+
+import requests
+
+
+class FakeElement:
+    def __init__(self, tag):
+        self.tag_name = tag
+
+
+class FakeDriver:
+    """Chromium-less stand-in for a Selenium WebDriver.
+
+    Loads pages over HTTP and sleeps render_time per get() to stand for
+    Chrome's rendering. Supports what ImageDownload and WebDriverWait use:
+    get, page_source, find_elements, add_cookie, get_cookies and quit.
+    Instances are counted so benchmarks can check how many browsers started.
+    """
+
+    started = 0
+    page_loads = []  # Start times of page loads, across all instances
+    lock = threading.Lock()
+
+    def __init__(self, render_time=0.5):
+        self.render_time = render_time
+        self.session = requests.Session()
+        self.session.headers["X-Fake-Browser"] = "1"  # Ask fixtures for the rendered DOM
+        self.page_source = ""
+        self.current_url = None
+        self.cookies = []
+        self.closed = False
+        with FakeDriver.lock:
+            FakeDriver.started += 1
+
+    @classmethod
+    def reset(cls):
+        cls.started = 0
+        cls.page_loads = []
+
+    def get(self, url):
+        if self.closed:
+            raise RuntimeError("driver already quit")
+        if not url:
+            return
+        with FakeDriver.lock:
+            FakeDriver.page_loads.append(time.monotonic())
+        response = self.session.get(url)
+        time.sleep(self.render_time)
+        self.current_url = url
+        self.page_source = response.text
+
+    def find_elements(self, by, value):
+        # Only by tag name, which is all the page wait needs
+        return [FakeElement(value)] * self.page_source.count(f"<{value}")
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+        self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""))
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def quit(self):
+        self.closed = True
+        self.session.close()
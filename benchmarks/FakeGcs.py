@@ -0,0 +1,93 @@
+import base64
+import hashlib
+import threading
+import time
+
+import google_crc32c
+
+
+class FakeBlob:
+    def __init__(self, bucket, name, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.size = None
+        self.md5_hash = None
+        self.crc32c = None
+
+    def exists(self):
+        self.bucket.client.request()
+        return self.name in self.bucket.objects
+
+    def upload_from_filename(self, filename):
+        with open(filename, "rb") as f:
+            data = f.read()
+        client = self.bucket.client
+        # Resumable uploads pay one extra round trip to open the session
+        requests = 1 + (len(data) // self.chunk_size + 1 if self.chunk_size else 0)
+        for _ in range(requests):
+            client.request()
+        if client.bandwidth:
+            time.sleep(len(data) / client.bandwidth)
+        self.size = len(data)
+        self.md5_hash = base64.b64encode(hashlib.md5(data).digest()).decode("ascii")
+        self.crc32c = base64.b64encode(google_crc32c.Checksum(data).digest()).decode("ascii")
+        with client.lock:
+            self.bucket.objects[self.name] = (self.size, self.md5_hash, self.crc32c)
+            client.bytes_uploaded += len(data)
+            client.uploads += 1
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.objects = {}
+
+    def exists(self):
+        self.client.request()
+        return self.name in self.client.buckets
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self, name, chunk_size)
+
+
+class FakeStorageClient:
+    """In-process stand-in for google.cloud.storage.Client with per-request latency."""
+
+    def __init__(self, latency=0.02, bandwidth=None, page_size=1000):
+        self.latency = latency
+        self.bandwidth = bandwidth  # Bytes per second per upload, None for unlimited
+        self.page_size = page_size
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.bytes_uploaded = 0
+        self.uploads = 0
+
+    def request(self):
+        with self.lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counters(self):
+        self.request_count = self.bytes_uploaded = self.uploads = 0
+
+    def bucket(self, name):
+        return self.buckets.get(name) or FakeBucket(self, name)
+
+    def create_bucket(self, name):
+        self.request()
+        self.buckets[name] = FakeBucket(self, name)
+        return self.buckets[name]
+
+    def list_blobs(self, bucket_name):
+        bucket = self.buckets[bucket_name]
+        names = sorted(bucket.objects)
+        for start in range(0, max(len(names), 1), self.page_size):
+            self.request()
+            for name in names[start:start + self.page_size]:
+                blob = FakeBlob(bucket, name)
+                blob.size, blob.md5_hash, blob.crc32c = bucket.objects[name]
+                yield blob
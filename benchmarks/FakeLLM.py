@@ -0,0 +1,45 @@
+import threading
+import time
+import zlib
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Drop-in stand-in for vertexai's GenerativeModel with configurable latency.
+
+    Answers "Yes" for a deterministic `yes_rate` share of prompts and "No" otherwise.
+    Install an instance as NovelChapterCheck.model, which get_model() then returns
+    instead of creating the Vertex AI model; latency and yes_rate are set with
+    reset() and call counts are kept on the class.
+    """
+
+    latency = 0.0
+    yes_rate = 0.5
+    lock = threading.Lock()
+    calls = 0
+    latencies = []
+
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, safety_settings=None, **kwargs):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "".join(str(c) for c in contents)
+        answer = "Yes" if zlib.crc32(prompt.encode("utf-8")) % 1000 < self.yes_rate * 1000 else "No"
+        with FakeGenerativeModel.lock:
+            FakeGenerativeModel.calls += 1
+            FakeGenerativeModel.latencies.append(time.perf_counter() - started)
+        return FakeResponse(answer)
+
+    @classmethod
+    def reset(cls, latency=0.0, yes_rate=0.5):
+        cls.latency = latency
+        cls.yes_rate = yes_rate
+        cls.calls = 0
+        cls.latencies = []
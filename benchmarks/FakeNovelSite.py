@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Words used to build chapter text; KEYWORDS are the ones the crawlers search for
+FILLER_WORDS = "the of and a to in he was that it his with as for had on at by she".split()
+KEYWORDS = ["cultivation", "system", "reincarnation"]
+CATEGORIES = ["Action", "Fantasy", "Romance", "Sci-fi", "Comedy"]
+TAGS = ["Weak to Strong", "Male Protagonist", "Magic", "Harem", "Game Elements"]
+
+
+class FakeNovelSite:
+    """Local HTTP server that generates novel listing, novel and chapter pages.
+
+    The markup uses the same selectors NovelLinks and NovelChapterCheck depend on:
+    'a[href^="/novel/"]' and a '>' next link on listing pages, '#chpagedlist
+    ul.chapter-list', 'h1.novel-title.text2row', 'div.categories ul' and
+    'div.tags ul.content' on novel pages, and 'div.chapter-content' on chapters.
+    """
+
+    def __init__(
+        self,
+        listing_pages=10,
+        novels_per_page=20,
+        chapters_per_novel=10,
+        words_per_chapter=300,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=404,
+        keyword_rate=0.3,
+        seed=0,
+        port=0,
+    ):
+        self.listing_pages = listing_pages
+        self.novels_per_page = novels_per_page
+        self.chapters_per_novel = chapters_per_novel
+        self.words_per_chapter = words_per_chapter
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.keyword_rate = keyword_rate
+        self.seed = seed
+        self.port = port
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.request_latencies = []
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def start_page(self):
+        return "/list/all-1.html"
+
+    def novel_slugs(self):
+        """Return every novel path the listing pages link to, in listing order."""
+        return [
+            f"/novel/novel-{page}-{n}"
+            for page in range(1, self.listing_pages + 1)
+            for n in range(self.novels_per_page)
+        ]
+
+    def rng(self, path):
+        """Deterministic random generator per path so reruns see identical pages."""
+        return random.Random(zlib.crc32(path.encode("utf-8")) ^ self.seed)
+
+    def should_fail(self, path):
+        """Deterministically pick which paths return the injected error status."""
+        if self.error_rate <= 0:
+            return False
+        return (zlib.crc32(f"error:{path}".encode("utf-8")) ^ self.seed) % 10000 < self.error_rate * 10000
+
+    def listing_page(self, page):
+        links = "".join(
+            f'<li><a href="/novel/novel-{page}-{n}">Novel {page}-{n}</a></li>'
+            for n in range(self.novels_per_page)
+        )
+        next_link = (
+            f'<a href="/list/all-{page + 1}.html">&gt;</a>'
+            if page < self.listing_pages
+            else ""
+        )
+        return f"<html><body><ul class='novel-list'>{links}</ul><div class='pagination'>{next_link}</div></body></html>"
+
+    def novel_page(self, slug):
+        rng = self.rng(slug)
+        categories = "".join(f"<li>{c}</li>" for c in rng.sample(CATEGORIES, 2))
+        tags = "".join(f"<li>{t}</li>" for t in rng.sample(TAGS, 3))
+        chapters = "".join(
+            f'<li><a href="/novel/{slug}/chapter-{k}?">Chapter {k}</a></li>'
+            for k in range(1, self.chapters_per_novel + 1)
+        )
+        return (
+            f"<html><body><h1 class='novel-title text2row'>Title of {slug}</h1>"
+            f"<div class='categories'><ul>{categories}</ul></div>"
+            f"<div class='tags'><ul class='content'>{tags}</ul></div>"
+            f"<div id='chpagedlist'><ul class='chapter-list'>{chapters}</ul></div>"
+            "</body></html>"
+        )
+
+    def chapter_page(self, path):
+        rng = self.rng(path)
+        words = [rng.choice(FILLER_WORDS) for _ in range(self.words_per_chapter)]
+        if rng.random() < self.keyword_rate:
+            words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        paragraphs = "".join(
+            f"<p>{' '.join(words[i:i + 40])}</p>" for i in range(0, len(words), 40)
+        )
+        return f"<html><body><div class='chapter-content'>{paragraphs}</div></body></html>"
+
+    def render(self, path):
+        """Return (status, body) for a request path."""
+        if self.should_fail(path):
+            return self.error_status, "<html><body>Error</body></html>"
+        parts = path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "list" and parts[1].startswith("all-"):
+            page = int(parts[1][len("all-"):].replace(".html", ""))
+            if 1 <= page <= self.listing_pages:
+                return 200, self.listing_page(page)
+        if len(parts) == 2 and parts[0] == "novel":
+            return 200, self.novel_page(parts[1])
+        if len(parts) == 3 and parts[0] == "novel" and parts[2].startswith("chapter-"):
+            return 200, self.chapter_page(path)
+        return 404, "<html><body>Not found</body></html>"
+
+    def start(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                started = time.perf_counter()
+                delay = site.latency + (random.uniform(0, site.jitter) if site.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+                status, body = site.render(self.path.split("?")[0])
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                with site.lock:
+                    site.request_count += 1
+                    if status != 200:
+                        site.error_count += 1
+                    site.request_latencies.append(time.perf_counter() - started)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import timedelta
+
+LABELS = ["whisk", "flour", "oven", "dough", "knife", "pan"]
+
+
+class Namespace:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeOperation:
+    """Long-running operation whose result() takes `latency` seconds."""
+
+    def __init__(self, latency, result):
+        self.latency = latency
+        self.response = result
+
+    def result(self, timeout=None):
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Operation did not complete within {timeout}s")
+        time.sleep(self.latency)
+        return self.response
+
+
+class FakeSpeechClient:
+    """Stand-in for speech.SpeechClient: long_running_recognize takes latency seconds.
+
+    The transcript of a URI is a few sentences about cooking that mention
+    the fixture's labels, with one word per second of audio.
+    """
+
+    def __init__(self, latency=2.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def long_running_recognize(self, config=None, audio=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+        words = []
+        for label in LABELS:
+            words += f"Now take the {label} and use it carefully.".split()
+        results = []
+        for start in range(0, len(words), 8):
+            chunk = words[start:start + 8]
+            results.append(Namespace(alternatives=[Namespace(
+                transcript=" ".join(chunk),
+                confidence=0.9,
+                words=[
+                    Namespace(
+                        word=word,
+                        start_time=timedelta(seconds=start + i),
+                        end_time=timedelta(seconds=start + i + 0.8),
+                    )
+                    for i, word in enumerate(chunk)
+                ],
+            )]))
+        return FakeOperation(self.latency, Namespace(results=results))
+
+
+class FakeVideoIntelligenceClient:
+    """Stand-in for videointelligence.VideoIntelligenceServiceClient."""
+
+    def __init__(self, latency=3.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def annotate_video(self, request=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+
+        def segment(start, end):
+            return Namespace(
+                start_time_offset=timedelta(seconds=start), end_time_offset=timedelta(seconds=end)
+            )
+
+        labels = [
+            Namespace(entity=Namespace(description=label), segments=[Namespace(segment=segment(8 * n, 8 * n + 8))])
+            for n, label in enumerate(LABELS)
+        ]
+        objects = [
+            Namespace(entity=Namespace(description=label), segment=segment(8 * n + 1, 8 * n + 6))
+            for n, label in enumerate(LABELS)
+        ]
+        result = Namespace(annotation_results=[Namespace(segment_label_annotations=labels, object_annotations=objects)])
+        return FakeOperation(self.latency, result)
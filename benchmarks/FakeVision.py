@@ -0,0 +1,43 @@
+import threading
+import time
+
+
+class FakeAnnotation:
+    def __init__(self, description):
+        self.description = description
+
+
+class FakeImageResponse:
+    def __init__(self, text):
+        self.text_annotations = [FakeAnnotation(text)] if text else []
+
+
+class FakeBatchResponse:
+    def __init__(self, responses):
+        self.responses = responses
+
+
+class FakeImageAnnotatorClient:
+    """Stand-in for vision.ImageAnnotatorClient that adds latency per batch call.
+
+    Each image "contains" a line of text derived from its URI. A URI containing
+    "blank" yields no text, like a page without any lettering.
+    """
+
+    def __init__(self, latency=1.0, per_image=0.05):
+        self.latency = latency
+        self.per_image = per_image
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.images = 0
+
+    def batch_annotate_images(self, requests):
+        time.sleep(self.latency + self.per_image * len(requests))
+        with self.lock:
+            self.calls += 1
+            self.images += len(requests)
+        responses = []
+        for request in requests:
+            uri = request.image.source.image_uri
+            responses.append(FakeImageResponse(None if "blank" in uri else f"文字 {uri}"))
+        return FakeBatchResponse(responses)
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+import zlib
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+def http_error(status, message):
+    return HttpError(
+        httplib2.Response({"status": status}),
+        json.dumps({"error": {"message": message}}).encode("utf-8"),
+    )
+
+
+class FakeRequest:
+    def __init__(self, client, handler):
+        self.client = client
+        self.handler = handler
+        self.headers = {}
+
+    def execute(self):
+        client = self.client
+        with client.lock:
+            client.in_flight += 1
+            client.max_in_flight = max(client.max_in_flight, client.in_flight)
+        try:
+            if client.latency:
+                time.sleep(client.latency)
+            return self.handler(self.headers)
+        finally:
+            with client.lock:
+                client.in_flight -= 1
+                client.requests += 1
+
+
+class FakeCollection:
+    def __init__(self, client, handler):
+        self.client = client
+        self.handler = handler
+
+    def list(self, **params):
+        return FakeRequest(self.client, lambda headers: self.handler(params, headers))
+
+
+class FakeYouTubeClient:
+    """Stand-in for the discovery-built YouTube Data API client.
+
+    Supports videos().list with up to 50 IDs (ETags and If-None-Match with a
+    304 answer) and paged playlistItems().list. Every execute() is one
+    request of API quota and takes `latency` seconds.
+    """
+
+    def __init__(self, titles, playlists=None, latency=0.1):
+        self.titles = dict(titles)
+        self.playlists = playlists or {}
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def reset_counters(self):
+        self.requests = self.not_modified = self.max_in_flight = 0
+
+    def videos(self):
+        return FakeCollection(self, self.list_videos)
+
+    def playlistItems(self):
+        return FakeCollection(self, self.list_playlist_items)
+
+    def list_videos(self, params, headers):
+        ids = params["id"].split(",")
+        if "maxResults" in params:
+            raise http_error(400, "The maxResults parameter is not supported with the id parameter")
+        if len(ids) > 50:
+            raise http_error(400, "The request specifies more than 50 video IDs")
+        items = [
+            {"id": video_id, "snippet": {"title": self.titles[video_id]}}
+            for video_id in ids
+            if video_id in self.titles
+        ]
+        etag = f'"{zlib.crc32(json.dumps(items).encode("utf-8")):08x}"'
+        if headers.get("If-None-Match") == etag:
+            with self.lock:
+                self.not_modified += 1
+            raise http_error(304, "Not Modified")
+        return {"etag": etag, "items": items}
+
+    def list_playlist_items(self, params, headers):
+        ids = self.playlists[params["playlistId"]]
+        start = int(params.get("pageToken") or 0)
+        end = start + params.get("maxResults", 5)
+        response = {"items": [{"contentDetails": {"videoId": video_id}} for video_id in ids[start:end]]}
+        if end < len(ids):
+            response["nextPageToken"] = str(end)
+        return response
@@ -0,0 +1,29 @@
+"""index.html must stay under BenchViewer.MAX_INDEX_BYTES whatever the page count.
+
+    python -m pytest benchmarks
+"""
+
+import os
+
+import pytest
+
+from BenchViewer import MAX_INDEX_BYTES, ImageToHtml, chapter
+
+
+@pytest.mark.parametrize("count", [1, 100, 5000])
+def test_index_size_is_bounded(tmp_path, count):
+    file_paths = chapter(str(tmp_path), count)
+    html_path = ImageToHtml.generate_dynamic_html(file_paths, str(tmp_path))
+    assert html_path
+    assert os.path.getsize(html_path) < MAX_INDEX_BYTES
+
+
+def test_index_size_does_not_grow_with_pages(tmp_path):
+    sizes = set()
+    # Same-length directory names, as index.html holds the manifest URL
+    for name, count in (("small", 10), ("large", 1000)):
+        directory = tmp_path / name
+        directory.mkdir()
+        file_paths = chapter(str(directory), count)
+        sizes.add(os.path.getsize(ImageToHtml.generate_dynamic_html(file_paths, str(directory))))
+    assert len(sizes) == 1